@@ -0,0 +1,15 @@
+#!/bin/bash
+
+# Usage: sh scripts/run_benchmark.sh [--images N] [--resolution WxH] [--epochs N] [--trace-dir DIR] ...
+# Runs the training hot path on synthetic images, Postgres and RabbitMQ are not required.
+BENCHMARK_SCRIPT="$PWD/tests/benchmark/benchmark_training.py"
+
+if [ ! -f "$BENCHMARK_SCRIPT" ]; then
+    echo "Benchmark script not found!"
+    exit 1
+fi
+
+. .venv/bin/activate
+
+echo "Running training benchmark"
+python "$BENCHMARK_SCRIPT" "$@"
@@ -0,0 +1,38 @@
+#!/bin/bash
+
+# Usage: sh scripts/run_distributed_training.sh [train|fine-tune] [epochs]
+# Multi host: set NNODES, NODE_RANK and MASTER_ADDR (IP of the NODE_RANK=0 host) on every host.
+TASK="${1:-train}"
+EPOCHS="${2:-250}"
+NNODES="${NNODES:-1}"
+NODE_RANK="${NODE_RANK:-0}"
+NPROC_PER_NODE="${NPROC_PER_NODE:-2}"
+MASTER_ADDR="${MASTER_ADDR:-127.0.0.1}"
+MASTER_PORT="${MASTER_PORT:-29500}"
+
+# Ensure distributed training entrypoint exists
+TRAINING_SCRIPT="$PWD/utils/resnet/train_distributed.py"
+
+if [ ! -f "$TRAINING_SCRIPT" ]; then
+    echo "Training script not found!"
+    exit 1
+fi
+
+. .venv/bin/activate
+
+# Split the cores of this host between its training processes, at least one thread each
+THREADS_PER_PROCESS=$(( $(nproc) / NPROC_PER_NODE ))
+if [ "$THREADS_PER_PROCESS" -lt 1 ]; then
+    THREADS_PER_PROCESS=1
+fi
+export TORCH_INTRA_OP_THREADS="${TORCH_INTRA_OP_THREADS:-$THREADS_PER_PROCESS}"
+export OMP_NUM_THREADS="$TORCH_INTRA_OP_THREADS"
+
+echo "Running $TASK on node $NODE_RANK/$NNODES with $NPROC_PER_NODE processes ($TORCH_INTRA_OP_THREADS threads each)."
+torchrun \
+    --nnodes="$NNODES" \
+    --node_rank="$NODE_RANK" \
+    --nproc_per_node="$NPROC_PER_NODE" \
+    --master_addr="$MASTER_ADDR" \
+    --master_port="$MASTER_PORT" \
+    "$TRAINING_SCRIPT" "$TASK" --epochs "$EPOCHS"
@@ -1,6 +1,7 @@
 import sys
 import logging
 from pathlib import Path
+from typing import Literal
 
 sys.path.append(str(Path(__file__).resolve().parents[2]))
 from services.celery.worker import app
@@ -9,12 +10,39 @@ from utils.resnet.execute_model import (
     custom_resnet50_fine_tuner,
 )
 from utils.query.model_card import extract_models_card_entry
+from utils.resnet.inference import auto_tag_images
+from utils.clip.indexer import index_image_embeddings
+from utils.clip.index_snapshot import refresh_index_snapshot
+from src.secret import Config
+
+config = Config()
 
 
 @app.task(bind=True)
-def train_finetune_custom_resnet50(self) -> None:
+def train_finetune_custom_resnet50(
+    self, fine_tune_mode: Literal["full", "head"] | None = None
+) -> None:
     cls_model_available = extract_models_card_entry(model_type="classification")
     if not cls_model_available:
         logging.info("Initialize custom ResNet50.")
         custom_resnet50_trainer()
-    custom_resnet50_fine_tuner()
+    custom_resnet50_fine_tuner(mode=fine_tune_mode or config.FINE_TUNE_MODE)
+
+
+@app.task(bind=True)
+def auto_tag_image_tag(self, restart: bool = False) -> dict:
+    def report_progress(progress: dict) -> None:
+        self.update_state(state="PROGRESS", meta=progress)
+
+    return auto_tag_images(restart=restart, on_progress=report_progress)
+
+
+@app.task(bind=True)
+def index_clip_embeddings(self) -> dict:
+    def report_progress(progress: dict) -> None:
+        self.update_state(state="PROGRESS", meta=progress)
+
+    progress = index_image_embeddings(on_progress=report_progress)
+    # Compacting the index here keeps the API workers loading a ready snapshot.
+    progress["index_snapshot"] = refresh_index_snapshot()
+    return progress
@@ -1,5 +1,13 @@
+import asyncio
 from celery import Celery
+from celery.signals import worker_process_init, worker_process_shutdown
 from src.secret import Config
+from services.postgres.connection import (
+    database_connection,
+    dispose_engines,
+    reset_engines,
+)
+from utils.resnet.runtime import apply_thread_settings
 
 config = Config()
 
@@ -10,3 +18,16 @@ app = Celery(
 )
 
 app.autodiscover_tasks(["services.celery.tasks"])
+
+
+@worker_process_init.connect
+def init_database_engine(**kwargs) -> None:
+    # Pooled connections must not be shared with the parent process across the fork.
+    reset_engines()
+    database_connection()
+    apply_thread_settings()
+
+
+@worker_process_shutdown.connect
+def close_database_engine(**kwargs) -> None:
+    asyncio.run(dispose_engines())
@@ -1,16 +1,75 @@
 from typing import Literal
+from threading import Lock
 from src.secret import Config
-from sqlalchemy import create_engine, Engine
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
+from sqlalchemy import create_engine, event, Engine
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 
 config = Config()
 
+_engines: dict[str, AsyncEngine | Engine] = {}
+_pool_statistics: dict[str, "PoolStatistics"] = {}
+_session_factory: async_sessionmaker[AsyncSession] | None = None
+_engines_lock = Lock()
+
+
+class PoolStatistics:
+    """Counters of a connection pool, updated by its pool events.
+
+    `connects` counts the connections opened to Postgres, with a warm pool it stays at most
+    `pool_size + max_overflow` while `checkouts` grows with every query.
+    """
+
+    def __init__(self) -> None:
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self._lock = Lock()
+
+    def increment(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def listen(self, engine: Engine) -> "PoolStatistics":
+        """The function `listen` counts the events of the pool of `engine`."""
+        for name, counter in (
+            ("connect", "connects"),
+            ("checkout", "checkouts"),
+            ("checkin", "checkins"),
+            ("invalidate", "invalidations"),
+        ):
+            event.listen(
+                engine.pool,
+                name,
+                lambda *args, counter=counter: self.increment(counter),
+            )
+        return self
+
+
+def pool_options() -> dict:
+    return {
+        "pool_size": config.PGSQL_POOL_SIZE,
+        "max_overflow": config.PGSQL_MAX_OVERFLOW,
+        "pool_timeout": config.PGSQL_POOL_TIMEOUT,
+        "pool_recycle": config.PGSQL_POOL_RECYCLE,
+        "pool_pre_ping": config.PGSQL_POOL_PRE_PING,
+    }
+
 
 def database_connection(
     connection_type: Literal["sync", "async"] = "sync",
 ) -> AsyncEngine | Engine:
-    """The function `database_connection` creates and returns either a synchronous or asynchronous database
-    engine based on the specified connection type.
+    """The function `database_connection` returns the synchronous or asynchronous database engine of the
+    process, creating it on first use.
+
+    Both engines keep a pool of `PGSQL_POOL_SIZE` connections, up to `PGSQL_MAX_OVERFLOW` more under
+    load, recycled after `PGSQL_POOL_RECYCLE` seconds and pinged before use when `PGSQL_POOL_PRE_PING`
+    is set. Every caller shares them, a query only checks a connection out of the pool.
 
     Parameters
     ----------
@@ -24,6 +83,96 @@ def database_connection(
     is set to "async", or an `Engine` object if the `connection_type` is set to "sync".
 
     """
-    if connection_type == "async":
-        return create_async_engine(url=config.ASYNC_PGSQL_CONNECTION)
-    return create_engine(url=config.SYNC_PGSQL_CONNECTION, pool_pre_ping=True)
+    engine = _engines.get(connection_type)
+    if engine is not None:
+        return engine
+
+    with _engines_lock:
+        if connection_type not in _engines:
+            if connection_type == "async":
+                engine = create_async_engine(
+                    url=config.ASYNC_PGSQL_CONNECTION, **pool_options()
+                )
+                sync_engine = engine.sync_engine
+            else:
+                engine = create_engine(
+                    url=config.SYNC_PGSQL_CONNECTION, **pool_options()
+                )
+                sync_engine = engine
+            _pool_statistics[connection_type] = PoolStatistics().listen(
+                engine=sync_engine
+            )
+            _engines[connection_type] = engine
+        return _engines[connection_type]
+
+
+def session_factory() -> async_sessionmaker[AsyncSession]:
+    """The function `session_factory` returns the session factory bound to the asynchronous engine,
+    created once next to the engine and shared by every caller.
+    """
+    global _session_factory
+    if _session_factory is not None:
+        return _session_factory
+
+    engine = database_connection(connection_type="async")
+    with _engines_lock:
+        if _session_factory is None:
+            _session_factory = async_sessionmaker(
+                bind=engine, class_=AsyncSession, expire_on_commit=False
+            )
+        return _session_factory
+
+
+def pool_statistics() -> dict:
+    """The function `pool_statistics` returns the status and the event counters of every engine created
+    by the process.
+
+    Returns
+    -------
+        A dictionary keyed by connection type with the "size", "checked_out", "overflow", "connects",
+    "checkouts", "checkins" and "invalidations" of the pool.
+
+    """
+    statistics = {}
+    for connection_type, engine in list(_engines.items()):
+        pool = engine.pool if isinstance(engine, Engine) else engine.sync_engine.pool
+        counters = _pool_statistics[connection_type]
+        statistics[connection_type] = {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "connects": counters.connects,
+            "checkouts": counters.checkouts,
+            "checkins": counters.checkins,
+            "invalidations": counters.invalidations,
+        }
+    return statistics
+
+
+def reset_engines() -> None:
+    """The function `reset_engines` forgets the engines inherited from a parent process without closing
+    their connections, which still belong to the parent. Call it in forked workers before any query.
+    """
+    global _session_factory
+    with _engines_lock:
+        for engine in _engines.values():
+            sync_engine = engine if isinstance(engine, Engine) else engine.sync_engine
+            sync_engine.dispose(close=False)
+        _engines.clear()
+        _pool_statistics.clear()
+        _session_factory = None
+
+
+async def dispose_engines() -> None:
+    """The function `dispose_engines` closes the pooled connections of the engines of the process."""
+    global _session_factory
+    with _engines_lock:
+        engines = list(_engines.values())
+        _engines.clear()
+        _pool_statistics.clear()
+        _session_factory = None
+    for engine in engines:
+        if isinstance(engine, AsyncEngine):
+            await engine.dispose()
+        else:
+            engine.dispose()
@@ -1,4 +1,5 @@
 from datetime import datetime
+from sqlalchemy import BigInteger, Dialect, Index, text
 from utils.helper import local_time
 from sqlmodel import SQLModel, Field, Relationship
 from services.postgres.connection import database_connection
@@ -140,9 +141,17 @@ class ModelCard(SQLModel, table=True):
     model_path: str = Field(default=None)
     model_type: ModelType = Field(default=None)
     trained_image: int = Field(default=None)
+    precision: str = Field(default=None)
+    channels_last: bool = Field(default=None)
+    compiled: bool = Field(default=None)
+    intra_op_threads: int = Field(default=None)
+    inter_op_threads: int = Field(default=None)
     model_details: list["ModelAccuracy"] = Relationship(
         back_populates="information", cascade_delete=True
     )
+    training_runs: list["ModelTrainingRun"] = Relationship(
+        back_populates="information", cascade_delete=True
+    )
 
 
 class ModelAccuracy(SQLModel, table=True):
@@ -157,8 +166,58 @@ class ModelAccuracy(SQLModel, table=True):
     information: ModelCard = Relationship(back_populates="model_details")
 
 
+class ModelTrainingRun(SQLModel, table=True):
+    __tablename__ = "model_training_run"
+    id: int = Field(primary_key=True)
+    created_at: datetime = Field(default=local_time())
+    run_id: str = Field(unique=True, default=None)
+    unique_id: str = Field(
+        foreign_key="model_card.unique_id",
+        ondelete="CASCADE",
+    )
+    run_type: str = Field(default=None)
+    device: str = Field(default=None)
+    world_size: int = Field(default=None)
+    batch_size: int = Field(default=None)
+    precision: str = Field(default=None)
+    intra_op_threads: int = Field(default=None)
+    inter_op_threads: int = Field(default=None)
+    trained_image: int = Field(default=None)
+    epochs: int = Field(default=None)
+    duration_seconds: float = Field(default=None)
+    images_per_sec: float = Field(default=None)
+    peak_rss_mb: float = Field(default=None)
+    peak_allocated_mb: float = Field(default=None, nullable=True)
+    information: ModelCard = Relationship(back_populates="training_runs")
+    epoch_details: list["ModelEpochTelemetry"] = Relationship(
+        back_populates="information", cascade_delete=True
+    )
+
+
+class ModelEpochTelemetry(SQLModel, table=True):
+    __tablename__ = "model_epoch_telemetry"
+    id: int = Field(primary_key=True)
+    created_at: datetime = Field(default=local_time())
+    run_id: str = Field(
+        foreign_key="model_training_run.run_id",
+        ondelete="CASCADE",
+    )
+    epoch: int = Field(default=None)
+    duration_seconds: float = Field(default=None)
+    images_per_sec: float = Field(default=None)
+    train_loss: float = Field(default=None)
+    val_loss: float = Field(default=None)
+    learning_rate: float = Field(default=None)
+    peak_rss_mb: float = Field(default=None)
+    information: ModelTrainingRun = Relationship(back_populates="epoch_details")
+
+
 class ImageTag(SQLModel, table=True):
     __tablename__ = "image_tag"
+    # Keyset pagination of the label distribution seeks on this index, see `utils/query/pagination.py`.
+    __table_args__ = (
+        Index("ix_image_tag_labeler_page", "ip_address", "is_validated", "id"),
+    )
     id: int = Field(primary_key=True)
     created_at: datetime = Field(default=local_time())
     updated_at: datetime = Field(default=None, nullable=True)
@@ -189,9 +248,79 @@ class ImageTag(SQLModel, table=True):
     is_validated: bool = Field(default=False)
     is_trained: bool = Field(default=False)
     ip_address: str = Field(default=None)
+    confidence: float | None = Field(default=None, nullable=True)
+    auto_tagged_at: datetime | None = Field(default=None, nullable=True)
+    label_bitmask: int | None = Field(default=None, nullable=True, sa_type=BigInteger)
+    phash: int | None = Field(default=None, nullable=True, sa_type=BigInteger)
+
+
+# Filled by the auto-tagging task and left out of the training rows, so that
+# `list(entry.values())[5:-2]` keeps matching the outputs of the trained classifiers.
+AUTO_TAG_COLUMNS = ("confidence", "auto_tagged_at")
+# Derived from the label columns for filtered search and from the image for near-duplicate
+# detection, left out of the training rows as well.
+SEARCH_COLUMNS = ("label_bitmask", "phash")
+TRAINING_COLUMNS = [
+    column
+    for column in ImageTag.__table__.columns
+    if column.name not in AUTO_TAG_COLUMNS + SEARCH_COLUMNS
+]
+# Boolean label columns, bit `i` of `ImageTag.label_bitmask` is set when `LABEL_COLUMNS[i]` is.
+LABEL_COLUMNS = [
+    column.name for column in TRAINING_COLUMNS[5:-2] if column.name != "is_validated"
+]
+
+
+def label_bitmask(labels: dict) -> int:
+    """The function `label_bitmask` packs the truthy `LABEL_COLUMNS` of `labels` into an integer."""
+    return sum(1 << bit for bit, label in enumerate(LABEL_COLUMNS) if labels.get(label))
+
+
+class AutoTagWatermark(SQLModel, table=True):
+    __tablename__ = "auto_tag_watermark"
+    id: int = Field(primary_key=True)
+    created_at: datetime = Field(default=local_time())
+    updated_at: datetime | None = Field(default=None)
+    model_name: str = Field(unique=True, default=None)
+    last_image_id: int = Field(default=0)
+    tagged_image: int = Field(default=0)
+
+
+# `create_all` skips existing tables, columns added to them later are listed here and added by
+# `database_migration`. They stay nullable, the rows written before them have no value.
+ADDED_COLUMNS = {
+    "model_card": (
+        "precision",
+        "channels_last",
+        "compiled",
+        "intra_op_threads",
+        "inter_op_threads",
+    ),
+    "image_tag": ("confidence", "auto_tagged_at", "label_bitmask", "phash"),
+}
+
+
+def added_column_statements(dialect: Dialect) -> list[str]:
+    """The function `added_column_statements` returns an `ALTER TABLE` statement per `ADDED_COLUMNS` entry."""
+    preparer = dialect.identifier_preparer
+    statements = []
+    for table_name, column_names in ADDED_COLUMNS.items():
+        table = SQLModel.metadata.tables[table_name]
+        for column_name in column_names:
+            column_type = table.c[column_name].type.compile(dialect=dialect)
+            statements.append(
+                f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN IF NOT EXISTS "
+                f"{preparer.quote(column_name)} {column_type}"
+            )
+    return statements
 
 
 async def database_migration():
     engine = database_connection(connection_type="async")
     async with engine.begin() as conn:
         await conn.run_sync(SQLModel.metadata.create_all)
+        for statement in added_column_statements(dialect=conn.dialect):
+            await conn.execute(text(statement))
+        # `create_all` skips existing tables, indexes added to them later are created here.
+        for index in ImageTag.__table__.indexes:
+            await conn.run_sync(index.create, checkfirst=True)
@@ -1,18 +1,33 @@
+import asyncio
 from src.secret import Config
 from fastapi import FastAPI, status
+from fastapi.concurrency import run_in_threadpool
 from src.routers import health_check
 from fastapi.middleware.cors import CORSMiddleware
 from services.postgres.models import database_migration
-from services.postgres.connection import database_connection
+from services.postgres.connection import dispose_engines
 from starlette.middleware.sessions import SessionMiddleware
 from utils.query.labels_documentation import initialize_labels_documentation
-from utils.query.image_tag import initialize_image_tag_preparation
-from src.routers.enrich_knowledge import train_models
+from utils.query.image_tag import (
+    backfill_label_bitmask,
+    initialize_image_tag_preparation,
+)
+from utils.clip.search import warm_up_search
+from utils.query.pagination import labeler_counts, reconcile_labeler_counts
+from utils.query.labels_validator import validation_buffer
+from src.routers.enrich_knowledge import (
+    train_models,
+    model_telemetry,
+    auto_tag,
+    index_embeddings,
+)
 from src.routers.monitor_task import monitor_task
+from src.routers.search import duplicates, similar_images, text_search
 from src.routers.classification import (
     labels_documentation,
     pagination,
     labels_validator,
+    predict,
 )
 from src.routers.nas_directory_manager import (
     create_directory,
@@ -27,6 +42,7 @@ from utils.custom_errors import (
     DatabaseQueryError,
     NasIntegrationError,
     AccessUnauthorized,
+    InvalidRequestError,
     create_exception_handler,
 )
 
@@ -46,11 +62,22 @@ async def startup():
     await database_migration()
     await initialize_labels_documentation()
     await initialize_image_tag_preparation()
+    await backfill_label_bitmask()
+    await labeler_counts.reconcile()
+    app.state.reconcile_labeler_counts = asyncio.create_task(reconcile_labeler_counts())
+    if config.VALIDATION_WRITE_BEHIND:
+        validation_buffer.start()
+    if config.SEARCH_WARM_UP:
+        await run_in_threadpool(warm_up_search)
 
 
 @app.on_event("shutdown")
 async def shutdown():
-    await database_connection(connection_type="async").dispose()
+    reconcile_task = getattr(app.state, "reconcile_labeler_counts", None)
+    if reconcile_task is not None:
+        reconcile_task.cancel()
+    await validation_buffer.stop()
+    await dispose_engines()
 
 
 app.add_middleware(
@@ -72,7 +99,14 @@ app.include_router(move_directory.router)
 app.include_router(labels_documentation.router)
 app.include_router(pagination.router)
 app.include_router(labels_validator.router)
+app.include_router(predict.router)
 app.include_router(train_models.router)
+app.include_router(model_telemetry.router)
+app.include_router(auto_tag.router)
+app.include_router(index_embeddings.router)
+app.include_router(similar_images.router)
+app.include_router(text_search.router)
+app.include_router(duplicates.router)
 app.include_router(monitor_task.router)
 
 app.add_exception_handler(
@@ -123,3 +157,11 @@ app.add_exception_handler(
         detail_message="Blacklist certain IP address to access the service.",
     ),
 )
+
+app.add_exception_handler(
+    exc_class_or_status_code=InvalidRequestError,
+    handler=create_exception_handler(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail_message="Request payload not eligible.",
+    ),
+)
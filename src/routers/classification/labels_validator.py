@@ -1,10 +1,16 @@
 from utils.logger import logging
 from fastapi import APIRouter, status, Request
+from src.secret import Config
 from src.schema.response import ResponseDefault
-from src.schema.request_format import LabelsValidator, AllowedIpAddress
-from utils.query.labels_validator import update_labels
+from src.schema.request_format import (
+    AllowedIpAddress,
+    LabelsValidator,
+    LabelsValidatorBulk,
+)
+from utils.query.labels_validator import update_labels, validation_buffer
 from utils.custom_errors import AccessUnauthorized
 
+config = Config()
 router = APIRouter(tags=["Classification"])
 
 
@@ -22,6 +28,11 @@ async def labels_validator(
             "IP Address blacklisted. Please ask IT Team for add IP as whitelist."
         )
 
+    if config.VALIDATION_WRITE_BEHIND:
+        validation_buffer.submit(validation=schema.model_dump(), ip_address=ip_address)
+        response.message = f"Entry {schema.image_id} queued for validation."
+        return response
+
     await update_labels(
         image_id=schema.image_id,
         ip_address=ip_address,
@@ -52,6 +63,32 @@ async def labels_validator(
     return response
 
 
+async def labels_validator_bulk(
+    request: Request, schema: LabelsValidatorBulk
+) -> ResponseDefault:
+    logging.info("Endpoint Labels Validator Bulk.")
+
+    response = ResponseDefault()
+    allow_ips = AllowedIpAddress()
+
+    ip_address = request.client.host
+    if ip_address not in allow_ips.ip_address:
+        raise AccessUnauthorized(
+            "IP Address blacklisted. Please ask IT Team for add IP as whitelist."
+        )
+
+    # Written through the buffer, so older queued validations cannot overwrite these.
+    results = await validation_buffer.write(
+        validations=[validation.model_dump() for validation in schema.validations],
+        ip_address=ip_address,
+    )
+
+    validated = sum(1 for result in results if result["status"] == "validated")
+    response.message = f"{validated} of {len(results)} entries validated."
+    response.data = results
+    return response
+
+
 router.add_api_route(
     methods=["PATCH"],
     path="/classification/label-validator",
@@ -59,3 +96,11 @@ router.add_api_route(
     summary="Validate image labels.",
     status_code=status.HTTP_200_OK,
 )
+
+router.add_api_route(
+    methods=["PATCH"],
+    path="/classification/label-validator/bulk",
+    endpoint=labels_validator_bulk,
+    summary="Validate the labels of many images in one transaction.",
+    status_code=status.HTTP_200_OK,
+)
@@ -1,9 +1,12 @@
 from utils.logger import logging
 from fastapi import APIRouter, status, Request, Query
+from fastapi.concurrency import run_in_threadpool
 from src.schema.response import ResponseDefault
 from src.schema.request_format import AllowedIpAddress
 from utils.custom_errors import AccessUnauthorized
 from utils.query.pagination import extract_distributed_entries
+from utils.query.labels_documentation import retrieve_labels_documentation
+from utils.clip.zero_shot import zero_shot_labeler
 
 router = APIRouter(tags=["Classification"])
 
@@ -17,6 +20,14 @@ async def labels_distribution(
         default=10, ge=1, description="Splitted total image into current chunk data."
     ),
     is_validated: bool = False,
+    cursor: str = Query(
+        default=None,
+        description="next_cursor or prev_cursor of a previous page, replaces page.",
+    ),
+    suggestions: bool = Query(
+        default=False,
+        description="Attach zero-shot CLIP label suggestions to every indexed image.",
+    ),
 ) -> ResponseDefault:
     logging.info("Endpoint Labels Distribution.")
 
@@ -34,7 +45,23 @@ async def labels_distribution(
         image_per_page=image_per_page,
         ip_address=ip_address,
         is_validated=is_validated,
+        cursor=cursor,
     )
+
+    if suggestions and pagination.images:
+        docs = await retrieve_labels_documentation()
+        if docs:
+            # Encoding the prompts (first call only) and scoring are blocking.
+            await run_in_threadpool(
+                zero_shot_labeler.load, documentation=docs["documentation"]
+            )
+            zero_shot = await run_in_threadpool(
+                zero_shot_labeler.suggest,
+                image_ids=[image["id"] for image in pagination.images],
+            )
+            for image in pagination.images:
+                image["zero_shot"] = zero_shot.get(image["id"])
+
     response.message = "Retrieved labels distribution."
     response.data = pagination
     return response
@@ -0,0 +1,105 @@
+from utils.logger import logging
+from src.secret import Config
+from fastapi import APIRouter, status, Request, File, Form, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from src.schema.response import ResponseDefault
+from src.schema.request_format import AllowedIpAddress
+from utils.custom_errors import (
+    AccessUnauthorized,
+    DataNotFoundError,
+    InvalidRequestError,
+)
+from utils.query.image_tag import extract_image_tag_filepaths
+from utils.query.model_card import extract_models_card_entry
+from utils.resnet.inference import classify_images
+
+config = Config()
+
+router = APIRouter(tags=["Classification"])
+
+
+async def predict_labels(
+    request: Request,
+    files: list[UploadFile] = File(
+        default=None, description="Images to classify, uploaded as multipart files."
+    ),
+    image_ids: list[int] = Form(
+        default=None, description="ImageTag ids of the images to classify."
+    ),
+    threshold: float = Form(
+        default=config.INFERENCE_THRESHOLD,
+        ge=0,
+        le=1,
+        description="Probability above which a label is predicted.",
+    ),
+) -> ResponseDefault:
+    logging.info("Endpoint Predict Labels.")
+
+    response = ResponseDefault()
+    allow_ips = AllowedIpAddress()
+
+    ip_address = request.client.host
+    if ip_address not in allow_ips.ip_address:
+        raise AccessUnauthorized(
+            "IP Address blacklisted. Please ask IT Team for add IP as whitelist."
+        )
+
+    files = files or []
+    image_ids = image_ids or []
+    if not files and not image_ids:
+        raise InvalidRequestError(detail="Upload an image or give an image id.")
+    if len(files) + len(image_ids) > config.INFERENCE_MAX_IMAGES:
+        raise InvalidRequestError(
+            detail=f"At most {config.INFERENCE_MAX_IMAGES} images per request."
+        )
+
+    sources = [("upload", file.filename, await file.read()) for file in files]
+    filepaths = (
+        await extract_image_tag_filepaths(image_ids=image_ids) if image_ids else {}
+    )
+    sources.extend(
+        ("image_tag", image_id, filepaths[image_id])
+        for image_id in image_ids
+        if image_id in filepaths
+    )
+
+    classified = iter([])
+    if sources:
+        model_card = await run_in_threadpool(
+            extract_models_card_entry, model_type="classification"
+        )
+        if model_card is None:
+            raise DataNotFoundError(detail="No classification model trained yet.")
+
+        # Decoding and the forward pass are blocking, keep them off the event loop.
+        classified = iter(
+            await run_in_threadpool(
+                classify_images,
+                sources=sources,
+                model_name=model_card.model_name,
+                model_path=model_card.model_path,
+                threshold=threshold,
+            )
+        )
+
+    # One result per requested image, uploads then ids, in the order of the request.
+    results = [next(classified) for _ in files]
+    results.extend(
+        next(classified)
+        if image_id in filepaths
+        else {"source": "image_tag", "key": image_id, "error": "Image id not found."}
+        for image_id in image_ids
+    )
+
+    response.message = f"Classified {len(results)} images."
+    response.data = results
+    return response
+
+
+router.add_api_route(
+    methods=["POST"],
+    path="/classification/predict",
+    endpoint=predict_labels,
+    summary="Predict image labels with the trained classifier.",
+    status_code=status.HTTP_200_OK,
+)
@@ -0,0 +1,36 @@
+from utils.logger import logging
+from fastapi import APIRouter, status, Query
+from src.schema.response import ResponseDefault, TaskResultState
+from services.celery.tasks import auto_tag_image_tag
+
+router = APIRouter(tags=["Enrich Knowledge"])
+
+
+async def auto_tag(
+    restart: bool = Query(
+        default=False,
+        description="Tag every unvalidated image again instead of resuming after the last tagged id.",
+    ),
+) -> ResponseDefault:
+    logging.info("Endpoint Auto Tag.")
+
+    response = ResponseDefault()
+    task_state = TaskResultState()
+
+    task = auto_tag_image_tag.delay(restart=restart)
+    task_state.task_id = task.id
+
+    response.message = (
+        "Initialized auto tagging task, follow its progress with the task monitor."
+    )
+    response.data = task_state
+    return response
+
+
+router.add_api_route(
+    methods=["POST"],
+    path="/auto-tag",
+    endpoint=auto_tag,
+    summary="Pre-label unvalidated images with the latest classification model.",
+    status_code=status.HTTP_200_OK,
+)
@@ -0,0 +1,31 @@
+from utils.logger import logging
+from fastapi import APIRouter, status
+from src.schema.response import ResponseDefault, TaskResultState
+from services.celery.tasks import index_clip_embeddings
+
+router = APIRouter(tags=["Enrich Knowledge"])
+
+
+async def index_embeddings() -> ResponseDefault:
+    logging.info("Endpoint Index Embeddings.")
+
+    response = ResponseDefault()
+    task_state = TaskResultState()
+
+    task = index_clip_embeddings.delay()
+    task_state.task_id = task.id
+
+    response.message = (
+        "Initialized CLIP indexing task, follow its progress with the task monitor."
+    )
+    response.data = task_state
+    return response
+
+
+router.add_api_route(
+    methods=["POST"],
+    path="/index-embeddings",
+    endpoint=index_embeddings,
+    summary="Embed new and changed images with CLIP.",
+    status_code=status.HTTP_200_OK,
+)
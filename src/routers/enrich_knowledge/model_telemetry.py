@@ -0,0 +1,39 @@
+from typing import Literal
+from utils.logger import logging
+from fastapi import APIRouter, status, Query
+from src.schema.response import ResponseDefault
+from utils.query.model_telemetry import extract_training_telemetry
+
+router = APIRouter(tags=["Enrich Knowledge"])
+
+
+async def model_telemetry(
+    model_type: Literal["classification", "query"] | None = Query(
+        default=None, description="Only return the runs of this model type."
+    ),
+    limit: int = Query(
+        default=50, ge=1, le=500, description="Number of latest runs returned."
+    ),
+    include_epochs: bool = Query(
+        default=False, description="Include the per-epoch telemetry of every run."
+    ),
+) -> ResponseDefault:
+    logging.info("Endpoint Model Telemetry.")
+
+    response = ResponseDefault()
+    telemetry = await extract_training_telemetry(
+        model_type=model_type, limit=limit, include_epochs=include_epochs
+    )
+
+    response.message = "Retrieved training telemetry."
+    response.data = telemetry
+    return response
+
+
+router.add_api_route(
+    methods=["GET"],
+    path="/model-telemetry",
+    endpoint=model_telemetry,
+    summary="Retrieve training performance telemetry trends.",
+    status_code=status.HTTP_200_OK,
+)
@@ -1,5 +1,6 @@
+from typing import Literal
 from utils.logger import logging
-from fastapi import APIRouter, status
+from fastapi import APIRouter, status, Query
 from src.schema.response import ResponseDefault
 from services.celery.tasks import train_finetune_custom_resnet50
 from src.schema.response import (
@@ -9,14 +10,19 @@ from src.schema.response import (
 router = APIRouter(tags=["Enrich Knowledge"])
 
 
-async def labels_documentation() -> ResponseDefault:
+async def labels_documentation(
+    fine_tune_mode: Literal["full", "head"] | None = Query(
+        default=None,
+        description="Fine tune the whole ResNet50 or only its classifier head on cached features.",
+    ),
+) -> ResponseDefault:
     logging.info("Endpoint Enrich Knowledge.")
 
     response = ResponseDefault()
     task_state = TaskResultState()
 
     response.message = "Initiate model development task."
-    task = train_finetune_custom_resnet50.delay()
+    task = train_finetune_custom_resnet50.delay(fine_tune_mode=fine_tune_mode)
 
     task_state.task_id = task.id
 
@@ -1,6 +1,8 @@
 from utils.logger import logging
 from fastapi import APIRouter, status
 from fastapi.responses import JSONResponse
+from services.postgres.connection import pool_statistics
+from utils.query.labels_validator import validation_buffer
 
 router = APIRouter(tags=["Health Check"])
 
@@ -10,6 +12,16 @@ async def root():
     return JSONResponse(content={"status": "Server running!"})
 
 
+async def database_pool():
+    logging.info("Endpoint Database Pool.")
+    return JSONResponse(content=pool_statistics())
+
+
+async def validation_queue():
+    logging.info("Endpoint Validation Queue.")
+    return JSONResponse(content=validation_buffer.statistics())
+
+
 router.add_api_route(
     methods=["GET"],
     path="/",
@@ -17,3 +29,19 @@ router.add_api_route(
     summary="Health check.",
     status_code=status.HTTP_200_OK,
 )
+
+router.add_api_route(
+    methods=["GET"],
+    path="/database-pool",
+    endpoint=database_pool,
+    summary="Connection pool status and checkout counters of this worker.",
+    status_code=status.HTTP_200_OK,
+)
+
+router.add_api_route(
+    methods=["GET"],
+    path="/validation-queue",
+    endpoint=validation_queue,
+    summary="Depth and flush counters of the write-behind label validations of this worker.",
+    status_code=status.HTTP_200_OK,
+)
@@ -0,0 +1,98 @@
+from utils.logger import logging
+from src.secret import Config
+from fastapi import APIRouter, status, Query
+from fastapi.concurrency import run_in_threadpool
+from src.schema.response import ResponseDefault
+from utils.custom_errors import DataNotFoundError
+from utils.query.image_tag import extract_image_tag_filepaths
+from utils.dedup.duplicates import duplicate_index
+
+config = Config()
+
+router = APIRouter(tags=["Search"])
+
+
+async def near_duplicates(
+    image_id: int = Query(ge=1, description="ImageTag id of the image to compare."),
+    radius: int = Query(
+        default=config.DUPLICATE_HAMMING_RADIUS,
+        ge=0,
+        le=config.DUPLICATE_HAMMING_RADIUS,
+        description="Maximum number of differing perceptual hash bits.",
+    ),
+) -> ResponseDefault:
+    logging.info("Endpoint Near Duplicates.")
+
+    response = ResponseDefault()
+
+    # Loading the hashes and querying the index are blocking, keep them off the event loop.
+    results = await run_in_threadpool(
+        duplicate_index().near_duplicates, image_id=image_id, radius=radius
+    )
+    if results is None:
+        raise DataNotFoundError(detail="Image id not hashed yet.")
+
+    filepaths = await extract_image_tag_filepaths(
+        image_ids=[result["image_id"] for result in results]
+    )
+    results = [
+        {**result, "filepath": filepaths[result["image_id"]]}
+        for result in results
+        if result["image_id"] in filepaths
+    ]
+
+    response.message = f"Found {len(results)} near-duplicates."
+    response.data = results
+    return response
+
+
+async def duplicate_clusters(
+    page: int = Query(default=1, ge=1, description="Page of clusters, largest first."),
+    cluster_per_page: int = Query(
+        default=20, ge=1, le=100, description="Clusters returned per page."
+    ),
+) -> ResponseDefault:
+    logging.info("Endpoint Duplicate Clusters.")
+
+    response = ResponseDefault()
+
+    clusters = await run_in_threadpool(duplicate_index().clusters)
+    start = (page - 1) * cluster_per_page
+    page_clusters = [
+        cluster.tolist() for cluster in clusters[start : start + cluster_per_page]
+    ]
+
+    filepaths = await extract_image_tag_filepaths(
+        image_ids=[image_id for cluster in page_clusters for image_id in cluster]
+    )
+    response.message = f"Found {len(clusters)} duplicate clusters."
+    response.data = {
+        "total_cluster": len(clusters),
+        "total_duplicate": sum(cluster.shape[0] - 1 for cluster in clusters),
+        "clusters": [
+            [
+                {"image_id": image_id, "filepath": filepaths[image_id]}
+                for image_id in cluster
+                if image_id in filepaths
+            ]
+            for cluster in page_clusters
+        ],
+    }
+    return response
+
+
+router.add_api_route(
+    methods=["GET"],
+    path="/search/duplicates",
+    endpoint=near_duplicates,
+    summary="Find the near-duplicates of an image by perceptual hash.",
+    status_code=status.HTTP_200_OK,
+)
+
+router.add_api_route(
+    methods=["GET"],
+    path="/search/duplicate-clusters",
+    endpoint=duplicate_clusters,
+    summary="List the clusters of near-duplicate images, largest first.",
+    status_code=status.HTTP_200_OK,
+)
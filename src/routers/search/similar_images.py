@@ -0,0 +1,84 @@
+from utils.logger import logging
+from src.secret import Config
+from fastapi import APIRouter, status, File, Form, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from src.schema.response import ResponseDefault
+from utils.custom_errors import DataNotFoundError, InvalidRequestError
+from utils.query.image_tag import extract_image_tag_filepaths
+from utils.clip.label_filter import parse_label_filter
+from utils.clip.search import image_query_vector, similarity_index
+
+config = Config()
+
+router = APIRouter(tags=["Search"])
+
+
+async def similar_images(
+    file: UploadFile = File(default=None, description="Image to search with."),
+    image_id: int = Form(
+        default=None, ge=1, description="ImageTag id of the image to search with."
+    ),
+    top_k: int = Form(
+        default=20,
+        ge=1,
+        le=config.SEARCH_MAX_RESULTS,
+        description="Number of similar images returned.",
+    ),
+    nprobe: int = Form(
+        default=config.ANN_NPROBE,
+        ge=1,
+        description="Index lists scanned, higher values are slower but more accurate.",
+    ),
+    labels: list[str] = Form(
+        default=None, description="Labels every returned image must have."
+    ),
+    exclude_labels: list[str] = Form(
+        default=None, description="Labels no returned image may have."
+    ),
+) -> ResponseDefault:
+    logging.info("Endpoint Similar Images.")
+
+    response = ResponseDefault()
+    label_filter = parse_label_filter(labels=labels, exclude_labels=exclude_labels)
+
+    if (file is None) == (image_id is None):
+        raise InvalidRequestError(detail="Upload an image or give an image id.")
+
+    content = await file.read() if file is not None else None
+    # Encoding, the index scan and the rerank are blocking, keep them off the event loop.
+    query = await run_in_threadpool(
+        image_query_vector, image_id=image_id, content=content
+    )
+    if query is None:
+        raise DataNotFoundError(detail="Image id not indexed yet.")
+
+    results = await run_in_threadpool(
+        similarity_index().search,
+        query=query,
+        k=top_k,
+        nprobe=nprobe,
+        label_filter=label_filter,
+        exclude_ids=[image_id] if image_id is not None else None,
+    )
+
+    filepaths = await extract_image_tag_filepaths(
+        image_ids=[result["image_id"] for result in results]
+    )
+    results = [
+        {**result, "filepath": filepaths[result["image_id"]]}
+        for result in results
+        if result["image_id"] in filepaths
+    ]
+
+    response.message = f"Found {len(results)} similar images."
+    response.data = results
+    return response
+
+
+router.add_api_route(
+    methods=["POST"],
+    path="/search/similar-images",
+    endpoint=similar_images,
+    summary="Find the images most similar to an uploaded image or an indexed image.",
+    status_code=status.HTTP_200_OK,
+)
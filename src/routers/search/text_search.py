@@ -0,0 +1,74 @@
+from utils.logger import logging
+from src.secret import Config
+from fastapi import APIRouter, status, Query
+from fastapi.concurrency import run_in_threadpool
+from src.schema.response import ResponseDefault
+from utils.query.image_tag import extract_image_tag_filepaths
+from utils.clip.label_filter import parse_label_filter
+from utils.clip.search import similarity_index, text_embedding_cache
+
+config = Config()
+
+router = APIRouter(tags=["Search"])
+
+
+async def text_search(
+    query: str = Query(
+        min_length=1,
+        max_length=300,
+        description='Description of the wanted images, e.g. "gold art deco ballroom at night".',
+    ),
+    top_k: int = Query(
+        default=20,
+        ge=1,
+        le=config.SEARCH_MAX_RESULTS,
+        description="Number of images returned.",
+    ),
+    nprobe: int = Query(
+        default=config.ANN_NPROBE,
+        ge=1,
+        description="Index lists scanned, higher values are slower but more accurate.",
+    ),
+    labels: list[str] = Query(
+        default=None, description="Labels every returned image must have."
+    ),
+    exclude_labels: list[str] = Query(
+        default=None, description="Labels no returned image may have."
+    ),
+) -> ResponseDefault:
+    logging.info("Endpoint Text Search.")
+
+    response = ResponseDefault()
+    label_filter = parse_label_filter(labels=labels, exclude_labels=exclude_labels)
+
+    # Encoding a new query and the index scan are blocking, keep them off the event loop.
+    embedding = await run_in_threadpool(text_embedding_cache.get, text=query)
+    results = await run_in_threadpool(
+        similarity_index().search,
+        query=embedding,
+        k=top_k,
+        nprobe=nprobe,
+        label_filter=label_filter,
+    )
+
+    filepaths = await extract_image_tag_filepaths(
+        image_ids=[result["image_id"] for result in results]
+    )
+    results = [
+        {**result, "filepath": filepaths[result["image_id"]]}
+        for result in results
+        if result["image_id"] in filepaths
+    ]
+
+    response.message = f"Found {len(results)} images matching the query."
+    response.data = results
+    return response
+
+
+router.add_api_route(
+    methods=["GET"],
+    path="/search/text",
+    endpoint=text_search,
+    summary="Find the images matching a text description.",
+    status_code=status.HTTP_200_OK,
+)
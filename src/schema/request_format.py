@@ -70,6 +70,15 @@ class LabelsValidator(BaseModel):
     european: bool = False
 
 
+class LabelsValidatorBulk(BaseModel):
+    # 23 bind parameters per image, 1000 images stay under the 32767 accepted by asyncpg.
+    validations: list[LabelsValidator] = Field(
+        min_length=1,
+        max_length=1000,
+        description="Validated labels of up to 1000 images, applied in one transaction.",
+    )
+
+
 class SynologyApiPath(BaseModel):
     api: Literal[
         "SYNO.API.Auth",
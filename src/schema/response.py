@@ -5,6 +5,8 @@ from pydantic import BaseModel
 class Pagination(BaseModel):
     available_page: int = None
     images: list = None
+    next_cursor: str | None = None
+    prev_cursor: str | None = None
 
 
 class TaskResultState(BaseModel):
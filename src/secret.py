@@ -20,6 +20,78 @@ class Config:
     RABBITMQ_DEFAULT_USER = os.getenv("RABBITMQ_DEFAULT_USER")
     RABBITMQ_DEFAULT_PASS = os.getenv("RABBITMQ_DEFAULT_PASS")
     RABBITMQ_DEFAULT_HOST = os.getenv("RABBITMQ_DEFAULT_HOST")
+    IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", "/project_utils/diva/image_cache")
+    IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(20 * 1024**3)))
+    IMAGE_DECODE_WORKERS = int(os.getenv("IMAGE_DECODE_WORKERS", str(os.cpu_count())))
+    TRAIN_BATCH_SIZE = int(os.getenv("TRAIN_BATCH_SIZE", "32"))
+    DATALOADER_NUM_WORKERS = int(os.getenv("DATALOADER_NUM_WORKERS", "4"))
+    DATALOADER_PREFETCH_FACTOR = int(os.getenv("DATALOADER_PREFETCH_FACTOR", "2"))
+    DATALOADER_PERSISTENT_WORKERS = (
+        os.getenv("DATALOADER_PERSISTENT_WORKERS", "true").lower() == "true"
+    )
+    DATALOADER_PIN_MEMORY = os.getenv("DATALOADER_PIN_MEMORY", "true").lower() == "true"
+    TRAIN_LEARNING_RATE = float(os.getenv("TRAIN_LEARNING_RATE", "1e-5"))
+    FINE_TUNE_LEARNING_RATE = float(os.getenv("FINE_TUNE_LEARNING_RATE", "1e-5"))
+    FINE_TUNE_MODE = os.getenv("FINE_TUNE_MODE", "full")
+    FEATURE_CACHE_DIR = os.getenv(
+        "FEATURE_CACHE_DIR", "/project_utils/diva/feature_cache"
+    )
+    HEAD_BATCH_SIZE = int(os.getenv("HEAD_BATCH_SIZE", "256"))
+    HEAD_LEARNING_RATE = float(os.getenv("HEAD_LEARNING_RATE", "1e-3"))
+    LR_SCHEDULER_FACTOR = float(os.getenv("LR_SCHEDULER_FACTOR", "0.1"))
+    LR_SCHEDULER_PATIENCE = int(os.getenv("LR_SCHEDULER_PATIENCE", "3"))
+    EARLY_STOPPING_PATIENCE = int(os.getenv("EARLY_STOPPING_PATIENCE", "10"))
+    EARLY_STOPPING_MIN_DELTA = float(os.getenv("EARLY_STOPPING_MIN_DELTA", "1e-4"))
+    TORCH_BF16_AUTOCAST = os.getenv("TORCH_BF16_AUTOCAST", "false").lower() == "true"
+    TORCH_CHANNELS_LAST = os.getenv("TORCH_CHANNELS_LAST", "false").lower() == "true"
+    TORCH_COMPILE = os.getenv("TORCH_COMPILE", "false").lower() == "true"
+    TORCH_INTRA_OP_THREADS = int(os.getenv("TORCH_INTRA_OP_THREADS", "0"))
+    TORCH_INTER_OP_THREADS = int(os.getenv("TORCH_INTER_OP_THREADS", "0"))
+    INFERENCE_MODEL_CACHE_SIZE = int(os.getenv("INFERENCE_MODEL_CACHE_SIZE", "2"))
+    INFERENCE_BATCH_SIZE = int(os.getenv("INFERENCE_BATCH_SIZE", "64"))
+    INFERENCE_MAX_IMAGES = int(os.getenv("INFERENCE_MAX_IMAGES", "256"))
+    INFERENCE_DECODE_THREADS = int(os.getenv("INFERENCE_DECODE_THREADS", "8"))
+    INFERENCE_THRESHOLD = float(os.getenv("INFERENCE_THRESHOLD", "0.5"))
+    AUTO_TAG_CHUNK_SIZE = int(os.getenv("AUTO_TAG_CHUNK_SIZE", "1024"))
+    CLIP_MODEL_NAME = os.getenv("CLIP_MODEL_NAME", "clip-ViT-B-32")
+    CLIP_BATCH_SIZE = int(os.getenv("CLIP_BATCH_SIZE", "64"))
+    CLIP_MAX_PENDING_IMAGES = int(os.getenv("CLIP_MAX_PENDING_IMAGES", "256"))
+    CLIP_CHECKPOINT_IMAGES = int(os.getenv("CLIP_CHECKPOINT_IMAGES", "50000"))
+    EMBEDDING_STORE_DIR = os.getenv(
+        "EMBEDDING_STORE_DIR", "/project_utils/diva/embeddings"
+    )
+    ANN_NLIST = int(os.getenv("ANN_NLIST", "0"))
+    ANN_NPROBE = int(os.getenv("ANN_NPROBE", "16"))
+    ANN_TRAIN_SAMPLE = int(os.getenv("ANN_TRAIN_SAMPLE", "65536"))
+    ANN_EXACT_THRESHOLD = int(os.getenv("ANN_EXACT_THRESHOLD", "20000"))
+    ANN_QUANTIZATION = os.getenv("ANN_QUANTIZATION", "int8")
+    ANN_PQ_SUBSPACES = int(os.getenv("ANN_PQ_SUBSPACES", "128"))
+    ANN_RESCORE = int(os.getenv("ANN_RESCORE", "100"))
+    ANN_DELTA_MAX_FRACTION = float(os.getenv("ANN_DELTA_MAX_FRACTION", "0.1"))
+    SEARCH_MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", "100"))
+    LABEL_BITMASK_TTL = int(os.getenv("LABEL_BITMASK_TTL", "60"))
+    TEXT_EMBEDDING_CACHE_SIZE = int(os.getenv("TEXT_EMBEDDING_CACHE_SIZE", "4096"))
+    SEARCH_WARM_UP = os.getenv("SEARCH_WARM_UP", "true").lower() == "true"
+    ZERO_SHOT_THRESHOLD = float(os.getenv("ZERO_SHOT_THRESHOLD", "0.6"))
+    LABELER_COUNT_TTL = int(os.getenv("LABELER_COUNT_TTL", "300"))
+    LABELER_COUNT_RECONCILE_SECONDS = int(
+        os.getenv("LABELER_COUNT_RECONCILE_SECONDS", "60")
+    )
+    DUPLICATE_HAMMING_RADIUS = int(os.getenv("DUPLICATE_HAMMING_RADIUS", "4"))
+    DUPLICATE_INDEX_TTL = int(os.getenv("DUPLICATE_INDEX_TTL", "300"))
+    TRAINING_SKIP_DUPLICATES = (
+        os.getenv("TRAINING_SKIP_DUPLICATES", "false").lower() == "true"
+    )
+    VALIDATION_WRITE_BEHIND = (
+        os.getenv("VALIDATION_WRITE_BEHIND", "false").lower() == "true"
+    )
+    VALIDATION_FLUSH_MS = int(os.getenv("VALIDATION_FLUSH_MS", "500"))
+    VALIDATION_FLUSH_MAX_ITEMS = int(os.getenv("VALIDATION_FLUSH_MAX_ITEMS", "500"))
+    PGSQL_POOL_SIZE = int(os.getenv("PGSQL_POOL_SIZE", "5"))
+    PGSQL_MAX_OVERFLOW = int(os.getenv("PGSQL_MAX_OVERFLOW", "10"))
+    PGSQL_POOL_TIMEOUT = int(os.getenv("PGSQL_POOL_TIMEOUT", "30"))
+    PGSQL_POOL_RECYCLE = int(os.getenv("PGSQL_POOL_RECYCLE", "1800"))
+    PGSQL_POOL_PRE_PING = os.getenv("PGSQL_POOL_PRE_PING", "true").lower() == "true"
     SYNC_PGSQL_CONNECTION = f"postgresql+psycopg2://{LOCAL_POSTGRESQL_USER}:{LOCAL_POSTGRESQL_PASSWORD}@{LOCAL_POSTGRESQL_HOST}/{LOCAL_POSTGRESQL_DATABASE}"
     ASYNC_PGSQL_CONNECTION = f"postgresql+asyncpg://{LOCAL_POSTGRESQL_USER}:{LOCAL_POSTGRESQL_PASSWORD}@{LOCAL_POSTGRESQL_HOST}/{LOCAL_POSTGRESQL_DATABASE}"
     PGSQL_BACKEND = f"db+postgresql://{LOCAL_POSTGRESQL_USER}:{LOCAL_POSTGRESQL_PASSWORD}@{LOCAL_POSTGRESQL_HOST}:5432/{LOCAL_POSTGRESQL_DATABASE}"
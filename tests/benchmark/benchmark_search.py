@@ -0,0 +1,148 @@
+"""Similarity search benchmark on synthetic embeddings.
+
+Builds the `IVFIndex` used by `/search/similar-images` over clustered random unit vectors shaped
+like CLIP embeddings and reports, for every quantization mode, the memory that has to stay
+resident, the recall@k against an exact scan and the p50/p99 query latency for every `nprobe`.
+
+Usage: python tests/benchmark/benchmark_search.py --images 1000000 --quantization none int8 pq
+"""
+
+import sys
+import json
+import time
+import argparse
+import numpy as np
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from utils.clip.ann_index import IVFIndex, top_k
+from utils.clip.quantization import train_quantizer
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def generate_embeddings(
+    total: int, dimension: int, clusters: int, seed: int = 0
+) -> np.ndarray:
+    """Unit vectors scattered around `clusters` random centers, like renders of similar scenes."""
+    rng = np.random.default_rng(seed=seed)
+    centers = normalize(rng.standard_normal((clusters, dimension), dtype=np.float32))
+    # Noise of norm ~0.6 around each center, independent of the dimension.
+    spread = 0.6 / np.sqrt(dimension)
+    embeddings = np.empty((total, dimension), dtype=np.float32)
+    for start in range(0, total, 65536):
+        size = min(65536, total - start)
+        noise = rng.standard_normal((size, dimension), dtype=np.float32)
+        embeddings[start : start + size] = normalize(
+            centers[rng.integers(clusters, size=size)] + spread * noise
+        )
+    return embeddings
+
+
+def percentile_ms(latencies: list[float], percentile: int) -> float:
+    return round(float(np.percentile(latencies, percentile)) * 1000, 3)
+
+
+def run(args: argparse.Namespace) -> dict:
+    embeddings = generate_embeddings(
+        total=args.images, dimension=args.dimension, clusters=args.clusters
+    )
+    rng = np.random.default_rng(seed=1)
+    queries = normalize(
+        embeddings[rng.integers(args.images, size=args.queries)]
+        + 0.3
+        / np.sqrt(args.dimension)
+        * rng.standard_normal((args.queries, args.dimension), dtype=np.float32)
+    )
+    exact = [set(top_k(embeddings @ query, k=args.top_k).tolist()) for query in queries]
+
+    started_at = time.perf_counter()
+    index = IVFIndex.build(embeddings=embeddings, nlist=args.nlist)
+    build_seconds = time.perf_counter() - started_at
+
+    report = {
+        "images": args.images,
+        "dimension": args.dimension,
+        "nlist": index.nlist,
+        "build_seconds": round(build_seconds, 2),
+        "float32_mb": round(embeddings.nbytes / 2**20, 1),
+        "modes": [],
+    }
+    sample = embeddings[
+        np.sort(rng.choice(args.images, size=min(args.images, 65536), replace=False))
+    ]
+    for mode in args.quantization:
+        started_at = time.perf_counter()
+        quantized = index.quantize(
+            embeddings=embeddings,
+            quantizer=train_quantizer(
+                mode=mode, sample=sample, subspaces=args.pq_subspaces
+            ),
+        )
+        # Without codes the float32 vectors are scanned and have to stay resident.
+        resident = quantized.nbytes + (embeddings.nbytes if mode == "none" else 0)
+        result = {
+            "quantization": mode,
+            "encode_seconds": round(time.perf_counter() - started_at, 2),
+            "resident_mb": round(resident / 2**20, 1),
+            "compression": round((embeddings.nbytes + index.nbytes) / resident, 2),
+            "nprobe": [],
+        }
+        for nprobe in args.nprobe:
+            latencies, hits = [], 0
+            for query, expected in zip(queries, exact):
+                started_at = time.perf_counter()
+                rows, _ = quantized.search(
+                    embeddings=embeddings,
+                    query=query,
+                    k=args.top_k,
+                    nprobe=nprobe,
+                    rescore=args.rescore,
+                )
+                latencies.append(time.perf_counter() - started_at)
+                hits += len(expected.intersection(rows.tolist()))
+            result["nprobe"].append(
+                {
+                    "nprobe": nprobe,
+                    f"recall@{args.top_k}": round(
+                        hits / (args.top_k * args.queries), 4
+                    ),
+                    "p50_ms": percentile_ms(latencies, 50),
+                    "p99_ms": percentile_ms(latencies, 99),
+                }
+            )
+        report["modes"].append(result)
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=int, default=1_000_000)
+    parser.add_argument("--dimension", type=int, default=512)
+    parser.add_argument("--clusters", type=int, default=5000)
+    parser.add_argument("--nlist", type=int, default=0)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32])
+    parser.add_argument(
+        "--quantization",
+        type=str,
+        nargs="+",
+        choices=["none", "int8", "pq"],
+        default=["none", "int8", "pq"],
+    )
+    parser.add_argument("--pq-subspaces", type=int, default=128)
+    parser.add_argument("--rescore", type=int, default=100)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--output", type=str, default=None)
+    args = parser.parse_args()
+
+    report = run(args=args)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
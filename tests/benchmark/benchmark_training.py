@@ -0,0 +1,160 @@
+"""Training throughput benchmark on synthetic images.
+
+Runs the same hot path as `custom_resnet50_trainer` (decoding, caching, `build_dataloaders`,
+`train_validate_resnet` and `predicting_resnet`) without Postgres or RabbitMQ and reports
+images/sec, per-stage wall time, peak RSS and allocator statistics.
+
+Usage: python tests/benchmark/benchmark_training.py --images 256 --resolution 1920x1080
+"""
+
+import sys
+import json
+import time
+import torch
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from torch.optim import Adam
+from utils.resnet.custom_model import CustomDataLoader, CustomResNet50Classifier
+from utils.resnet.image_cache import PreprocessedImageCache
+from utils.resnet.execute_model import (
+    build_dataloaders,
+    config,
+    predicting_resnet,
+    train_validate_resnet,
+)
+from utils.resnet.profiler import StageProfiler, torch_trace
+from utils.resnet.runtime import (
+    apply_thread_settings,
+    optimize_model,
+    runtime_settings,
+)
+from tests.factories import generate_entries
+
+
+def apply_dataloader_options(args: argparse.Namespace) -> None:
+    """Override the production `DataLoader` settings with the options given on the command line."""
+    if args.batch_size is not None:
+        config.TRAIN_BATCH_SIZE = args.batch_size
+    if args.num_workers is not None:
+        config.DATALOADER_NUM_WORKERS = args.num_workers
+
+
+def run(args: argparse.Namespace) -> dict:
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    settings = runtime_settings(device=device)
+    profiler = StageProfiler()
+    width, height = (int(value) for value in args.resolution.split("x"))
+
+    with tempfile.TemporaryDirectory() as directory:
+        directory = Path(directory)
+        with profiler.stage(name="generate_images", images=args.images):
+            entries = generate_entries(
+                directory=directory,
+                total=args.images,
+                resolution=(width, height),
+                labels=tuple(f"label_{label}" for label in range(args.labels)),
+            )
+
+        cache = PreprocessedImageCache(
+            cache_dir=directory / "cache", max_bytes=args.cache_bytes
+        )
+        with profiler.stage(name="decode_cold_cache", images=args.images):
+            dataset = CustomDataLoader(
+                entries=entries,
+                lazy=True,
+                cache=cache,
+                decode_workers=args.decode_workers,
+            )
+        with profiler.stage(name="decode_warm_cache", images=args.images):
+            dataset = CustomDataLoader(
+                entries=entries,
+                lazy=True,
+                cache=cache,
+                decode_workers=args.decode_workers,
+            )
+        dataset.splitter(random_state=0)
+        apply_dataloader_options(args=args)
+        dataloaders = build_dataloaders(dataset=dataset, device=device)
+
+        model = CustomResNet50Classifier(
+            num_labels=dataset.label_details(), pretrained=False
+        ).to(device=device)
+        optimized_model = optimize_model(model=model, settings=settings)
+        optimizer = Adam(params=model.parameters(), lr=1e-4)
+
+        with torch_trace(trace_dir=args.trace_dir):
+            with profiler.stage(name="train_validate"):
+                train_validate_resnet(
+                    device=device,
+                    train_dataloader=dataloaders["train"],
+                    val_dataloader=dataloaders["valid"],
+                    model=optimized_model,
+                    epochs=args.epochs,
+                    optimizer=optimizer,
+                    patience=0,
+                    settings=settings,
+                    profiler=profiler,
+                )
+            predicting_resnet(
+                device=device,
+                dataloader=dataloaders["test"],
+                model=optimized_model,
+                settings=settings,
+                profiler=profiler,
+            )
+
+        with profiler.stage(name="save_model"):
+            torch.save(model.state_dict(), directory / "model.pth")
+
+    trained_images = dataset.train_size * args.epochs
+    return {
+        "images": args.images,
+        "resolution": args.resolution,
+        "epochs": args.epochs,
+        "batch_size": config.TRAIN_BATCH_SIZE,
+        "num_workers": config.DATALOADER_NUM_WORKERS,
+        "runtime_settings": settings.model_dump(),
+        "train_images_per_sec": round(
+            trained_images / profiler.durations["train_validate"], 2
+        ),
+        "epoch_details": profiler.epochs,
+        **profiler.summary(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="ResNet50 training benchmark.")
+    parser.add_argument("--images", type=int, default=256)
+    parser.add_argument("--resolution", default="1920x1080", help="WIDTHxHEIGHT")
+    parser.add_argument("--labels", type=int, default=21)
+    parser.add_argument("--epochs", type=int, default=1)
+    parser.add_argument(
+        "--batch-size", type=int, default=None, help="Overrides TRAIN_BATCH_SIZE"
+    )
+    parser.add_argument(
+        "--num-workers",
+        type=int,
+        default=None,
+        help="Overrides DATALOADER_NUM_WORKERS",
+    )
+    parser.add_argument("--decode-workers", type=int, default=None)
+    parser.add_argument("--cache-bytes", type=int, default=4 * 1024**3)
+    parser.add_argument("--trace-dir", default=None, help="torch.profiler output")
+    parser.add_argument("--output", default=None, help="Write the report as JSON")
+    args = parser.parse_args()
+
+    apply_thread_settings()
+    started_at = time.perf_counter()
+    report = run(args=args)
+    report["total_seconds"] = round(time.perf_counter() - started_at, 2)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import numpy as np
+
+from PIL import Image
+from pathlib import Path
+from datetime import datetime
+
+
+def generate_entries(
+    directory: Path,
+    total: int = 20,
+    resolution: tuple[int, int] = (320, 240),
+    labels: tuple[str, ...] = ("nature", "artifacts"),
+) -> list[dict]:
+    """Write `total` JPEG images to `directory` and return them as `ImageTag` shaped rows."""
+    rng = np.random.default_rng(seed=0)
+    entries = []
+    for idx in range(total):
+        filepath = directory / f"image_{idx:06d}.jpg"
+        # Upscaled noise compresses like a photograph rather than like a flat color.
+        noise = rng.integers(0, 255, size=(48, 64, 3), dtype=np.uint8)
+        Image.fromarray(noise).resize(resolution).save(filepath, quality=90)
+        entries.append(
+            {
+                "id": idx + 1,
+                "created_at": datetime.now(),
+                "updated_at": None,
+                "filepath": str(filepath),
+                "filename": filepath.name,
+                # Alternating labels keep both classes of every label in each partition.
+                **{
+                    label: bool((idx + position) % 2)
+                    for position, label in enumerate(labels)
+                },
+                "is_validated": True,
+                "is_trained": False,
+                "ip_address": "127.0.0.1",
+            }
+        )
+    return entries
@@ -0,0 +1,56 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import QueuePool
+
+from services.postgres import connection
+from services.postgres.connection import (
+    PoolStatistics,
+    database_connection,
+    pool_statistics,
+    reset_engines,
+    session_factory,
+)
+
+
+@pytest.fixture
+def fresh_engines():
+    reset_engines()
+    yield
+    reset_engines()
+
+
+@pytest.mark.asyncio
+async def test_database_connection_reuses_one_engine_per_type(fresh_engines) -> None:
+    """Should create each engine once with the configured pool, without connecting."""
+    engine = database_connection()
+    async_engine = database_connection(connection_type="async")
+
+    assert database_connection() is engine
+    assert database_connection(connection_type="async") is async_engine
+    assert engine.pool.size() == connection.config.PGSQL_POOL_SIZE
+    assert async_engine.sync_engine.pool.size() == connection.config.PGSQL_POOL_SIZE
+    assert pool_statistics()["sync"]["connects"] == 0
+
+    factory = session_factory()
+    assert session_factory() is factory
+    assert factory.kw["bind"] is async_engine
+
+    reset_engines()
+    assert database_connection() is not engine
+    assert session_factory() is not factory
+
+
+@pytest.mark.asyncio
+async def test_pool_statistics_count_checkouts(tmp_path) -> None:
+    """Should open a single connection for repeated queries and count every checkout."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=QueuePool)
+    statistics = PoolStatistics().listen(engine=engine)
+
+    for _ in range(3):
+        with engine.connect() as session:
+            session.execute(text("SELECT 1"))
+
+    assert statistics.connects == 1
+    assert statistics.checkouts == 3
+    assert statistics.checkins == 3
+    engine.dispose()
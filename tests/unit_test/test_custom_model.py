@@ -0,0 +1,97 @@
+import pytest
+import multiprocessing
+import numpy as np
+
+from utils.resnet.custom_model import CustomDataLoader
+from PIL import Image
+from utils.resnet.preprocessing import decode_images, load_image
+from tests.factories import generate_entries
+
+
+def decode_in_worker(filepaths: list[str]) -> list[tuple[int, int, int] | None]:
+    return [
+        None if image is None else image.shape
+        for _, image in decode_images(filepaths=filepaths, max_workers=2)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_lazy_dataset_only_stores_filepaths(tmp_path) -> None:
+    """Should keep file paths instead of decoded images in lazy mode."""
+    entries = generate_entries(directory=tmp_path)
+    dataset = CustomDataLoader(entries=entries, lazy=True)
+    assert dataset.images.dtype.kind == "U"
+    assert dataset.label_details() == 3
+
+
+@pytest.mark.asyncio
+async def test_lazy_dataset_decodes_on_demand(tmp_path) -> None:
+    """Should decode float32 samples for every split in lazy mode."""
+    entries = generate_entries(directory=tmp_path)
+    dataset = CustomDataLoader(entries=entries, lazy=True)
+    dataset.splitter()
+
+    assert dataset.train_size + dataset.val_size + dataset.test_size == len(entries)
+    for mode in ("train", "valid", "test"):
+        dataset.mode = mode
+        sample = dataset[0]
+        assert sample["image"].shape == (3, 224, 224)
+        assert sample["image"].dtype == np.float32
+        assert sample["image"].max() <= 1.0
+
+
+@pytest.mark.asyncio
+async def test_lazy_dataset_matches_eager_dataset(tmp_path) -> None:
+    """Should return the same sample in lazy and eager mode."""
+    entries = generate_entries(directory=tmp_path)
+    eager = CustomDataLoader(entries=entries)
+    lazy = CustomDataLoader(entries=entries, lazy=True)
+
+    assert eager.images.dtype == np.float32
+    eager.x_train, eager.y_train = eager.images, eager.labels
+    lazy.x_train, lazy.y_train = lazy.images, lazy.labels
+    for idx in range(len(entries)):
+        np.testing.assert_array_equal(lazy[idx]["image"], eager[idx]["image"])
+        np.testing.assert_array_equal(lazy[idx]["labels"], eager[idx]["labels"])
+
+
+@pytest.mark.asyncio
+async def test_dataset_skips_corrupt_images(tmp_path) -> None:
+    """Should drop unreadable images together with their labels."""
+    entries = generate_entries(directory=tmp_path, total=5)
+    with open(entries[2]["filepath"], mode="wb") as file:
+        file.write(b"not an image")
+
+    dataset = CustomDataLoader(entries=entries, decode_workers=2)
+    assert dataset.images.shape == (4, 3, 224, 224)
+    assert dataset.labels.shape[0] == 4
+
+
+@pytest.mark.asyncio
+async def test_decode_images_in_daemonic_process(tmp_path) -> None:
+    """Should decode in a daemonic pool worker, which cannot start processes, like a Celery task."""
+    filepaths = [entry["filepath"] for entry in generate_entries(directory=tmp_path)]
+    (tmp_path / "corrupt.jpg").write_bytes(b"not an image")
+    filepaths.append(str(tmp_path / "corrupt.jpg"))
+
+    with multiprocessing.get_context("fork").Pool(processes=1) as pool:
+        shapes = pool.apply(decode_in_worker, (filepaths,))
+
+    assert shapes == [(224, 224, 3)] * 20 + [None]
+
+
+@pytest.mark.asyncio
+async def test_load_image_reduces_palette_and_high_depth_images(tmp_path) -> None:
+    """Should decode large palette, 1-bit and 16-bit images that `Image.reduce` does not support."""
+    image = Image.new(mode="RGB", size=(1200, 900), color=(200, 40, 10))
+    images = {
+        "P": image.convert("P"),
+        "1": image.convert("1"),
+        "I;16": Image.new(mode="I;16", size=(1200, 900), color=30000),
+    }
+    for mode, image in images.items():
+        filepath = tmp_path / f"{mode.replace(';', '_')}.png"
+        image.save(filepath)
+        with Image.open(filepath) as opened:
+            assert opened.mode == mode
+        assert load_image(str(filepath)).shape == (224, 224, 3)
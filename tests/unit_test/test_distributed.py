@@ -0,0 +1,143 @@
+import os
+import json
+import socket
+import torch
+import pytest
+import torch.multiprocessing as mp
+from torch.utils.data import DataLoader, DistributedSampler
+
+from utils.resnet import distributed
+from utils.resnet.custom_model import CustomDataLoader
+from utils.resnet.distributed import (
+    all_reduce_mean,
+    all_reduce_sum,
+    broadcast_object,
+    cleanup_distributed,
+    host_directory,
+    init_distributed,
+    is_distributed,
+    is_main_process,
+    shared_random_state,
+    unpadded_size,
+    world_size,
+)
+from utils.resnet.execute_model import build_dataloaders, image_cache, predicting_resnet
+from tests.factories import generate_entries
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class ZeroLogits(torch.nn.Module):
+    def forward(self, image: torch.Tensor) -> torch.Tensor:
+        return torch.zeros((image.shape[0], 1))
+
+
+def run_rank(rank: int, port: int, directory: str, entries: list[dict]) -> None:
+    os.environ.update(
+        {
+            "RANK": str(rank),
+            "LOCAL_RANK": str(rank),
+            "WORLD_SIZE": "2",
+            "MASTER_ADDR": "127.0.0.1",
+            "MASTER_PORT": str(port),
+        }
+    )
+    init_distributed()
+    try:
+        dataset = CustomDataLoader(entries=entries, lazy=True)
+        dataset.splitter(random_state=shared_random_state())
+        dataloaders = build_dataloaders(dataset=dataset, device="cpu")
+        result = {
+            "is_main_process": is_main_process(),
+            "world_size": world_size(),
+            "broadcast": broadcast_object({"rank": rank}),
+            "sum": all_reduce_sum([float(rank), 1.0]),
+            "mean": all_reduce_mean([float(rank)] * (rank + 1)),
+            "train": sorted(dataset.x_train.tolist()),
+            "shards": {
+                mode: [str(filepaths[index]) for index in dataloaders[mode].sampler]
+                for mode, filepaths in (
+                    ("train", dataset.x_train),
+                    ("valid", dataset.x_val),
+                )
+            },
+        }
+    finally:
+        cleanup_distributed()
+    with open(os.path.join(directory, f"rank_{rank}.json"), "w") as file:
+        json.dump(result, file)
+
+
+@pytest.mark.asyncio
+async def test_helpers_without_process_group() -> None:
+    """Should behave as a single process when no process group is initialized."""
+    assert not is_distributed()
+    assert is_main_process()
+    assert world_size() == 1
+    assert broadcast_object({"seed": 1}) == {"seed": 1}
+    assert shared_random_state() is None
+    assert all_reduce_sum([1.0, 2.0]) == [1.0, 2.0]
+    assert all_reduce_mean([1.0, 3.0]) == 2.0
+
+
+@pytest.mark.asyncio
+async def test_image_cache_is_owned_by_the_host(tmp_path, monkeypatch) -> None:
+    """Should keep the image cache of every host in its own directory."""
+    monkeypatch.setattr(distributed.socket, "gethostname", lambda: "trainer-2")
+    assert host_directory(directory=tmp_path) == tmp_path / "trainer-2"
+
+    monkeypatch.setattr(
+        "utils.resnet.execute_model.config.IMAGE_CACHE_DIR", str(tmp_path)
+    )
+    assert image_cache().cache_dir == tmp_path / "trainer-2"
+
+
+@pytest.mark.asyncio
+async def test_process_group_shares_the_split_and_shards_batches(tmp_path) -> None:
+    """Should give both ranks rank 0's objects and split, and disjoint shards of each partition."""
+    entries = generate_entries(directory=tmp_path, total=20)
+    mp.spawn(run_rank, args=(free_port(), str(tmp_path), entries), nprocs=2, join=True)
+    ranks = []
+    for rank in range(2):
+        with open(tmp_path / f"rank_{rank}.json") as file:
+            ranks.append(json.load(file))
+
+    assert [result["is_main_process"] for result in ranks] == [True, False]
+    assert all(result["world_size"] == 2 for result in ranks)
+    assert all(result["broadcast"] == {"rank": 0} for result in ranks)
+    assert all(result["sum"] == [1.0, 2.0] for result in ranks)
+    assert all(result["mean"] == pytest.approx(2 / 3) for result in ranks)
+    # 20 entries split into 16 train and 2 valid images, even sizes shard without padding.
+    assert ranks[0]["train"] == ranks[1]["train"]
+    for mode, size in (("train", 16), ("valid", 2)):
+        shards = [set(result["shards"][mode]) for result in ranks]
+        assert len(shards[0]) == len(shards[1]) == size // 2
+        assert not shards[0] & shards[1]
+    train_shards = [set(result["shards"]["train"]) for result in ranks]
+    assert train_shards[0] | train_shards[1] == set(ranks[0]["train"])
+
+
+@pytest.mark.asyncio
+async def test_evaluation_leaves_out_the_padding_of_the_shards() -> None:
+    """Should score every evaluation sample once, without the repeats padding the shards."""
+    # Only sample 0 is mispredicted by a model answering 0 for every label.
+    dataset = [
+        {"image": torch.zeros(1), "labels": torch.tensor([float(idx == 0)])}
+        for idx in range(4)
+    ]
+    shards, accuracies = [], []
+    for rank in range(3):
+        sampler = DistributedSampler(dataset, num_replicas=3, rank=rank, shuffle=False)
+        dataloader = DataLoader(dataset, batch_size=2, sampler=sampler)
+        shards.append(list(sampler)[: unpadded_size(dataloader=dataloader)])
+        accuracies.append(
+            predicting_resnet(device="cpu", dataloader=dataloader, model=ZeroLogits())
+        )
+
+    # Shards are padded to [0, 3], [1, 0] and [2, 1].
+    assert sorted(sum(shards, [])) == [0, 1, 2, 3]
+    assert accuracies == [50.0, 100.0, 100.0]
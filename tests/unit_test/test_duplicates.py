@@ -0,0 +1,80 @@
+import cv2
+import pytest
+import numpy as np
+
+from utils.dedup.duplicates import DuplicateIndex
+from utils.dedup.hamming_index import MultiIndexHash, duplicate_image_ids
+from utils.dedup.perceptual_hash import hamming_distances, perceptual_hash
+
+
+def planted_hashes(total: int, duplicates: int, seed: int = 0) -> np.ndarray:
+    """Random hashes followed by copies of the first ones with two flipped bits."""
+    rng = np.random.default_rng(seed=seed)
+    hashes = rng.integers(-(2**63), 2**63 - 1, size=total, dtype=np.int64)
+    bits = rng.integers(0, 56, size=duplicates).astype(np.int64)
+    flips = np.left_shift(np.int64(1), bits) | np.left_shift(np.int64(1), bits + 7)
+    return np.concatenate([hashes, hashes[:duplicates] ^ flips])
+
+
+@pytest.mark.asyncio
+async def test_perceptual_hash_survives_resizing_and_recompression() -> None:
+    """Should keep a resized JPEG re-export a few bits away and a different image far away."""
+    rng = np.random.default_rng(seed=0)
+    image = cv2.GaussianBlur(
+        rng.integers(0, 255, size=(480, 640, 3), dtype=np.uint8), (31, 31), 0
+    )
+    _, encoded = cv2.imencode(".jpg", cv2.resize(image, (320, 240)), [95, 60])
+    reexport = cv2.imdecode(encoded, cv2.IMREAD_COLOR)
+    other = cv2.GaussianBlur(
+        rng.integers(0, 255, size=(480, 640, 3), dtype=np.uint8), (31, 31), 0
+    )
+
+    original = perceptual_hash(image=image)
+    assert hamming_distances(perceptual_hash(image=reexport), original) <= 4
+    assert hamming_distances(perceptual_hash(image=other), original) > 10
+
+
+@pytest.mark.asyncio
+async def test_multi_index_hash_matches_brute_force() -> None:
+    """Should find exactly the hashes within the radius, and cluster the planted duplicates."""
+    hashes = planted_hashes(total=3000, duplicates=50)
+    ids = np.arange(hashes.shape[0]) + 1
+    index = MultiIndexHash(ids=ids, hashes=hashes, radius=4)
+
+    for position in (0, 7, 3020):
+        found, distances = index.query(query=int(hashes[position]), radius=3)
+        expected = ids[hamming_distances(hashes, hashes[position]) <= 3]
+        assert sorted(found.tolist()) == expected.tolist()
+        assert np.all(np.diff(distances) >= 0)
+
+    clusters = index.clusters()
+    assert len(clusters) == 50
+    assert [cluster.tolist() for cluster in clusters][:2] == [[1, 3001], [2, 3002]]
+    with pytest.raises(ValueError):
+        index.query(query=0, radius=5)
+
+
+@pytest.mark.asyncio
+async def test_duplicate_image_ids_keeps_the_smallest_id() -> None:
+    """Should skip every image of a cluster but its smallest id, identical hashes included."""
+    hashes = np.asarray([0b1111, 0b1110, 0b1111, 1 << 40, -1], dtype=np.int64)
+    skipped = duplicate_image_ids(
+        ids=np.asarray([5, 3, 9, 1, 2]), hashes=hashes, radius=2
+    )
+    assert skipped.tolist() == [5, 9]
+
+
+@pytest.mark.asyncio
+async def test_duplicate_index_lists_near_duplicates() -> None:
+    """Should return the other images of the cluster and `None` for unhashed ids."""
+    hashes = np.asarray([0b1111, 0b0111, 1 << 40], dtype=np.int64)
+    index = DuplicateIndex(
+        radius=2, hash_loader=lambda: (np.asarray([1, 2, 3]), hashes)
+    )
+
+    assert index.near_duplicates(image_id=1, radius=2) == [
+        {"image_id": 2, "distance": 1}
+    ]
+    assert index.near_duplicates(image_id=3, radius=2) == []
+    assert index.near_duplicates(image_id=4, radius=2) is None
+    assert [cluster.tolist() for cluster in index.clusters()] == [[1, 2]]
@@ -0,0 +1,228 @@
+import os
+import json
+import multiprocessing
+import pytest
+import numpy as np
+
+from PIL import Image
+from utils.clip.embedding_store import EmbeddingStore
+from utils.clip.indexer import index_image_embeddings
+
+
+class FakeEncoder:
+    model_name = "fake-clip"
+    dimension = 4
+
+    def __init__(self) -> None:
+        self.encoded = 0
+
+    def encode_images(self, images: list[Image.Image]) -> np.ndarray:
+        self.encoded += len(images)
+        means = np.asarray(
+            [np.asarray(image, dtype=np.float32).mean() for image in images]
+        )
+        vectors = np.stack([means, means + 1, means + 2, np.ones_like(means)], axis=1)
+        return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(
+            np.float32
+        )
+
+
+def save_images(directory, count: int) -> list[dict]:
+    entries = []
+    for image_id in range(1, count + 1):
+        filepath = str(directory / f"{image_id}.jpg")
+        Image.new("RGB", (320, 240), color=(image_id * 20, 0, 0)).save(filepath)
+        entries.append({"id": image_id, "filepath": filepath})
+    return entries
+
+
+def index_in_worker(entries: list[dict], directory: str) -> tuple[dict, dict]:
+    hashes = {}
+    progress = index_image_embeddings(
+        entries=entries,
+        encoder=FakeEncoder(),
+        store=EmbeddingStore(directory=directory, model_name="fake-clip"),
+        hash_writer=hashes.update,
+    )
+    return progress, hashes
+
+
+@pytest.mark.asyncio
+async def test_embedding_store_roundtrip(tmp_path) -> None:
+    """Should return the stored embeddings of known ids only, after a reload."""
+    store = EmbeddingStore(directory=tmp_path, model_name="fake-clip")
+    embeddings = np.random.rand(3, 4).astype(np.float32)
+    store.update(
+        image_ids=np.asarray([30, 10, 20]),
+        signatures=np.zeros((3, 2), dtype=np.int64),
+        embeddings=embeddings,
+    )
+
+    reloaded = EmbeddingStore(directory=tmp_path, model_name="fake-clip")
+    found_ids, vectors = reloaded.get([20, 99, 30])
+    assert reloaded.ids.tolist() == [10, 20, 30]
+    assert found_ids.tolist() == [20, 30]
+    np.testing.assert_array_equal(vectors, embeddings[[2, 0]])
+
+    assert not len(EmbeddingStore(directory=tmp_path, model_name="other-clip"))
+
+
+@pytest.mark.asyncio
+async def test_index_image_embeddings_is_incremental(tmp_path) -> None:
+    """Should only embed new or changed images, drop removed entries and hash every image."""
+    entries = save_images(tmp_path, count=3)
+    encoder = FakeEncoder()
+    hashes = {}
+
+    def index(entries: list[dict]) -> dict:
+        store = EmbeddingStore(directory=tmp_path / "store", model_name="fake-clip")
+        progress = index_image_embeddings(
+            entries=entries, encoder=encoder, store=store, hash_writer=hashes.update
+        )
+        for entry in entries:
+            entry["phash"] = hashes.get(entry["id"])
+        return progress
+
+    progress = index(entries)
+    assert progress["embedded_image"] == 3
+    assert progress["hashed_image"] == 3
+    assert sorted(hashes) == [entry["id"] for entry in entries]
+    progress = index(entries)
+    assert progress["embedded_image"] == 0
+    assert progress["hashed_image"] == 0
+
+    os.utime(entries[1]["filepath"], ns=(0, 0))
+    entries[0]["phash"] = None
+    progress = index(entries[:2])
+    assert progress["embedded_image"] == 1
+    assert progress["hashed_image"] == 2
+    assert progress["removed_image"] == 1
+    assert progress["stored_image"] == 2
+    assert encoder.encoded == 4
+
+
+@pytest.mark.asyncio
+async def test_index_image_embeddings_in_daemonic_process(tmp_path) -> None:
+    """Should embed and hash the images from a daemonic pool worker, like a Celery task."""
+    entries = save_images(directory=tmp_path, count=3)
+
+    with multiprocessing.get_context("fork").Pool(processes=1) as pool:
+        progress, hashes = pool.apply(
+            index_in_worker, (entries, str(tmp_path / "store"))
+        )
+
+    assert progress["embedded_image"] == 3
+    assert sorted(hashes) == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_index_image_embeddings_publishes_one_version_per_run(
+    tmp_path, monkeypatch
+) -> None:
+    """Should append every checkpoint as a segment and publish a single version at the end."""
+    monkeypatch.setattr("utils.clip.indexer.config.CLIP_BATCH_SIZE", 1)
+    monkeypatch.setattr("utils.clip.indexer.config.CLIP_CHECKPOINT_IMAGES", 1)
+    entries = save_images(directory=tmp_path, count=3)
+    store = EmbeddingStore(directory=tmp_path / "store", model_name="fake-clip")
+    calls = []
+    for method in ("append", "update"):
+        original = getattr(store, method)
+        monkeypatch.setattr(
+            store,
+            method,
+            lambda original=original, method=method, **kwargs: (
+                calls.append(method),
+                original(**kwargs),
+            ),
+        )
+
+    progress = index_image_embeddings(
+        entries=entries, encoder=FakeEncoder(), store=store, hash_writer={}.update
+    )
+    assert calls == ["append"] * 3 + ["update"]
+    assert progress["stored_image"] == 3
+    assert store.ids.tolist() == [1, 2, 3]
+    assert sorted(path.name[0] for path in (tmp_path / "store").iterdir()) == [
+        "C",
+        "v",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_embedding_store_compacts_the_segments_of_an_interrupted_run(
+    tmp_path,
+) -> None:
+    """Should keep segments invisible until compacted, the newest segment winning for an id."""
+    store = EmbeddingStore(directory=tmp_path, model_name="fake-clip")
+    store.update(
+        image_ids=np.asarray([1, 2]),
+        signatures=np.zeros((2, 2), dtype=np.int64),
+        embeddings=np.zeros((2, 4), dtype=np.float32),
+    )
+    store.append(
+        image_ids=np.asarray([3, 4]),
+        signatures=np.ones((2, 2), dtype=np.int64),
+        embeddings=np.ones((2, 4), dtype=np.float32),
+        removed_ids=np.asarray([1]),
+    )
+    store.append(
+        image_ids=np.asarray([3]),
+        signatures=np.full((1, 2), 2, dtype=np.int64),
+        embeddings=np.full((1, 4), 2, dtype=np.float32),
+    )
+
+    reloaded = EmbeddingStore(directory=tmp_path, model_name="fake-clip")
+    assert reloaded.ids.tolist() == [1, 2]
+    assert reloaded.compact() == 2
+    assert reloaded.ids.tolist() == [2, 3, 4]
+    assert reloaded.signatures[:, 0].tolist() == [0, 2, 1]
+    np.testing.assert_array_equal(reloaded.embeddings[:, 0], [0, 2, 1])
+    assert reloaded.segments() == []
+    assert reloaded.compact() == 0
+
+
+@pytest.mark.asyncio
+async def test_embedding_store_publishes_consistent_versions(tmp_path) -> None:
+    """Should swap whole versions, keep the previous one for readers and prune older ones."""
+    store = EmbeddingStore(directory=tmp_path, model_name="fake-clip")
+    for image_id in range(1, 4):
+        store.update(
+            image_ids=np.asarray([image_id]),
+            signatures=np.zeros((1, 2), dtype=np.int64),
+            embeddings=np.full((1, 4), image_id, dtype=np.float32),
+        )
+        if image_id == 2:
+            reader = EmbeddingStore(directory=tmp_path, model_name="fake-clip")
+
+    versions = sorted(path.name for path in tmp_path.iterdir() if path.is_dir())
+    assert len(versions) == 2
+    assert (tmp_path / "CURRENT").read_text() == versions[-1]
+    assert reader.ids.tolist() == [1, 2]
+    np.testing.assert_array_equal(reader.get([2])[1], np.full((1, 4), 2))
+    assert EmbeddingStore(directory=tmp_path, model_name="fake-clip").ids.tolist() == [
+        1,
+        2,
+        3,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_embedding_store_migrates_the_unversioned_layout(tmp_path) -> None:
+    """Should read a store written before versioning and move it to a version on update."""
+    np.save(tmp_path / "ids.npy", np.asarray([7], dtype=np.int64))
+    np.save(tmp_path / "signatures.npy", np.zeros((1, 2), dtype=np.int64))
+    np.save(tmp_path / "embeddings.npy", np.ones((1, 4), dtype=np.float32))
+    with open(tmp_path / "meta.json", "w") as file:
+        json.dump({"model_name": "fake-clip", "version": 1}, file)
+
+    store = EmbeddingStore(directory=tmp_path, model_name="fake-clip")
+    assert store.ids.tolist() == [7]
+
+    store.update(
+        image_ids=np.asarray([8]),
+        signatures=np.zeros((1, 2), dtype=np.int64),
+        embeddings=np.ones((1, 4), dtype=np.float32),
+    )
+    assert store.ids.tolist() == [7, 8]
+    assert not (tmp_path / "meta.json").exists()
+    assert (tmp_path / (tmp_path / "CURRENT").read_text() / "meta.json").exists()
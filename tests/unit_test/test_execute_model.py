@@ -0,0 +1,119 @@
+import torch
+import pytest
+
+from utils.resnet import execute_model
+from utils.resnet.custom_model import CustomDataLoader
+from utils.custom_errors import DatabaseQueryError
+from torch.optim import SGD
+from torch.utils.data import DataLoader
+from utils.resnet.profiler import StageProfiler
+from utils.resnet.execute_model import (
+    build_dataloaders,
+    save_training_telemetry,
+    train_validate_resnet,
+)
+from tests.factories import generate_entries
+
+
+@pytest.mark.asyncio
+async def test_dataloaders_skip_workers_in_daemonic_process(
+    tmp_path, monkeypatch
+) -> None:
+    """Should load batches in the process itself when it is daemonic, like a Celery task."""
+    dataset = CustomDataLoader(entries=generate_entries(directory=tmp_path), lazy=True)
+    dataset.splitter()
+    monkeypatch.setattr(execute_model.config, "DATALOADER_NUM_WORKERS", 2)
+
+    dataloaders = build_dataloaders(dataset=dataset, device="cpu")
+    assert dataloaders["train"].num_workers == 2
+
+    monkeypatch.setattr(execute_model, "in_daemon_process", lambda: True)
+    dataloaders = build_dataloaders(dataset=dataset, device="cpu")
+    assert all(dataloader.num_workers == 0 for dataloader in dataloaders.values())
+    assert len(next(iter(dataloaders["train"]))["image"]) > 0
+
+
+@pytest.mark.asyncio
+async def test_failed_telemetry_write_does_not_fail_the_run(monkeypatch) -> None:
+    """Should log a failed telemetry write instead of raising after the model is saved."""
+
+    def insert_training_telemetry(unique_id: str, run: dict, epochs: list) -> None:
+        raise DatabaseQueryError(detail="Database query failed.")
+
+    monkeypatch.setattr(
+        execute_model, "insert_training_telemetry", insert_training_telemetry
+    )
+    save_training_telemetry(unique_id="model", run={"run_id": "run"}, epochs=[])
+
+
+def scripted_validation(monkeypatch, model: torch.nn.Module, losses: list[float]):
+    """Replaces the validation loss of every epoch by `losses`, returns the weights seen per epoch."""
+    states = []
+
+    def all_reduce_mean(values: list[float]) -> float:
+        states.append(
+            {key: value.detach().clone() for key, value in model.state_dict().items()}
+        )
+        return losses[len(states) - 1]
+
+    monkeypatch.setattr(execute_model, "all_reduce_mean", all_reduce_mean)
+    return states
+
+
+def linear_dataloader() -> DataLoader:
+    torch.manual_seed(0)
+    entries = [
+        {"image": torch.randn(4), "labels": torch.randint(0, 2, (2,)).float()}
+        for _ in range(8)
+    ]
+    return DataLoader(dataset=entries, batch_size=4)
+
+
+@pytest.mark.asyncio
+async def test_training_stops_early_and_restores_the_best_epoch(monkeypatch) -> None:
+    """Should stop `patience` epochs after the best one and return its weights."""
+    model = torch.nn.Linear(4, 2)
+    states = scripted_validation(
+        monkeypatch, model=model, losses=[1.0, 0.5, 0.6, 0.7, 0.8, 0.9]
+    )
+    dataloader = linear_dataloader()
+
+    model = train_validate_resnet(
+        device="cpu",
+        train_dataloader=dataloader,
+        val_dataloader=dataloader,
+        model=model,
+        epochs=6,
+        optimizer=SGD(params=model.parameters(), lr=0.1),
+        patience=2,
+    )
+
+    assert len(states) == 4
+    for key, value in model.state_dict().items():
+        torch.testing.assert_close(value, states[1][key])
+        assert not torch.equal(value, states[-1][key])
+
+
+@pytest.mark.asyncio
+async def test_learning_rate_drops_when_validation_plateaus(monkeypatch) -> None:
+    """Should divide the learning rate by `LR_SCHEDULER_FACTOR` once the loss stalls."""
+    monkeypatch.setattr(execute_model.config, "LR_SCHEDULER_FACTOR", 0.1)
+    monkeypatch.setattr(execute_model.config, "LR_SCHEDULER_PATIENCE", 1)
+    model = torch.nn.Linear(4, 2)
+    scripted_validation(monkeypatch, model=model, losses=[1.0, 0.5, 0.5, 0.5])
+    dataloader = linear_dataloader()
+    profiler = StageProfiler()
+
+    train_validate_resnet(
+        device="cpu",
+        train_dataloader=dataloader,
+        val_dataloader=dataloader,
+        model=model,
+        epochs=4,
+        optimizer=SGD(params=model.parameters(), lr=0.1),
+        patience=0,
+        profiler=profiler,
+    )
+
+    learning_rates = [epoch["learning_rate"] for epoch in profiler.epochs]
+    assert learning_rates == pytest.approx([0.1, 0.1, 0.1, 0.01])
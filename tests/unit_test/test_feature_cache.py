@@ -0,0 +1,114 @@
+import torch
+import pytest
+import numpy as np
+
+from utils.resnet import execute_model
+from utils.resnet.custom_model import CustomResNet50Classifier
+from utils.resnet.execute_model import fine_tune_resnet_head
+from utils.resnet.feature_cache import (
+    BackboneFeatureCache,
+    backbone_version,
+    extract_backbone_features,
+)
+from tests.factories import generate_entries
+
+
+def build_model() -> CustomResNet50Classifier:
+    torch.manual_seed(0)
+    return CustomResNet50Classifier(num_labels=3, pretrained=False)
+
+
+@pytest.mark.asyncio
+async def test_backbone_version_ignores_the_head() -> None:
+    """Should keep the version when only the head changes and change it with the backbone."""
+    model = build_model()
+    version = backbone_version(model=model)
+
+    with torch.no_grad():
+        model.custom_resnet50_model.fc.weight.add_(1.0)
+    assert backbone_version(model=model) == version
+
+    with torch.no_grad():
+        model.custom_resnet50_model.conv1.weight.add_(1.0)
+    assert backbone_version(model=model) != version
+
+
+@pytest.mark.asyncio
+async def test_feature_cache_persists_per_version(tmp_path) -> None:
+    """Should return stored features after a reload and nothing for another backbone version."""
+    cache = BackboneFeatureCache(cache_dir=tmp_path, version="a")
+    assert cache.lookup(image_ids=[1, 2]) == ({}, [1, 2])
+
+    features = np.arange(8, dtype=np.float32).reshape(2, 4)
+    cache.update(image_ids=[1, 2], features=features)
+    cache.update(image_ids=[3], features=features[:1] + 10)
+
+    cached, missing = BackboneFeatureCache(cache_dir=tmp_path, version="a").lookup(
+        image_ids=[2, 3, 4]
+    )
+    assert missing == [4]
+    np.testing.assert_array_equal(cached[2], features[1])
+    np.testing.assert_array_equal(cached[3], features[0] + 10)
+
+    assert BackboneFeatureCache(cache_dir=tmp_path, version="b").lookup(
+        image_ids=[1]
+    ) == ({}, [1])
+    assert [path.name for path in tmp_path.iterdir()] == ["b"]
+
+
+@pytest.mark.asyncio
+async def test_extract_backbone_features_only_computes_misses(tmp_path) -> None:
+    """Should run the backbone on uncached images only and again once the backbone changes."""
+    entries = generate_entries(directory=tmp_path, total=4)
+    model = build_model()
+    calls = []
+    extract_features = model.extract_features
+
+    def counted_extract_features(image):
+        calls.append(len(image))
+        return extract_features(image)
+
+    model.extract_features = counted_extract_features
+
+    def extract(entries: list[dict]) -> dict:
+        return extract_backbone_features(
+            model=model,
+            entries=entries,
+            feature_cache=BackboneFeatureCache(
+                cache_dir=tmp_path / "features", version=backbone_version(model=model)
+            ),
+            device="cpu",
+            batch_size=2,
+            decode_workers=1,
+        )
+
+    first = extract(entries=entries[:3])
+    assert sorted(first) == [1, 2, 3]
+    assert first[1].shape == (2048,)
+    assert calls == [2, 1]
+
+    second = extract(entries=entries)
+    assert calls == [2, 1, 1]
+    np.testing.assert_allclose(second[2], first[2])
+
+    with torch.no_grad():
+        model.custom_resnet50_model.conv1.weight.mul_(0.5)
+    extract(entries=entries)
+    assert calls == [2, 1, 1, 2, 2]
+
+
+@pytest.mark.asyncio
+async def test_head_fine_tuning_without_decodable_images(tmp_path, monkeypatch) -> None:
+    """Should skip the head training instead of stacking an empty feature list."""
+    entries = generate_entries(directory=tmp_path, total=2)
+    for entry in entries:
+        with open(entry["filepath"], mode="wb") as file:
+            file.write(b"not an image")
+    monkeypatch.setattr(
+        execute_model.config, "FEATURE_CACHE_DIR", str(tmp_path / "features")
+    )
+
+    model = build_model()
+    assert fine_tune_resnet_head(
+        model=model, entries=entries, device="cpu", epochs=1
+    ) == (model, None, 0)
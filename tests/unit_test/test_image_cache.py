@@ -0,0 +1,106 @@
+import os
+import pytest
+import multiprocessing
+import numpy as np
+
+from PIL import Image
+from utils.resnet.image_cache import PreprocessedImageCache, IMAGE_BYTES
+from utils.resnet.preprocessing import load_image
+
+
+def generate_images(directory, total: int) -> list[str]:
+    filepaths = []
+    for idx in range(total):
+        filepath = str(directory / f"image_{idx}.png")
+        Image.new(mode="RGB", size=(64, 48), color=(idx * 10, 0, 0)).save(filepath)
+        filepaths.append(filepath)
+    return filepaths
+
+
+@pytest.mark.asyncio
+async def test_cache_returns_decoded_images(tmp_path) -> None:
+    """Should return the same pixels as decoding the original file."""
+    filepaths = generate_images(directory=tmp_path, total=3)
+    cache = PreprocessedImageCache(
+        cache_dir=tmp_path / "cache", max_bytes=IMAGE_BYTES * 8
+    )
+    cache.warm(filepaths=filepaths)
+
+    for filepath in filepaths:
+        np.testing.assert_array_equal(cache.get(filepath), load_image(filepath))
+
+
+@pytest.mark.asyncio
+async def test_cache_is_persisted_between_instances(tmp_path) -> None:
+    """Should reload cached entries from the index file."""
+    filepaths = generate_images(directory=tmp_path, total=3)
+    cache = PreprocessedImageCache(
+        cache_dir=tmp_path / "cache", max_bytes=IMAGE_BYTES * 8
+    )
+    cache.warm(filepaths=filepaths)
+
+    reloaded = PreprocessedImageCache(
+        cache_dir=tmp_path / "cache", max_bytes=IMAGE_BYTES * 8
+    )
+    assert len(reloaded) == 3
+    np.testing.assert_array_equal(reloaded.get(filepaths[1]), load_image(filepaths[1]))
+
+
+@pytest.mark.asyncio
+async def test_cache_invalidates_modified_files(tmp_path) -> None:
+    """Should ignore entries whose file changed after being cached."""
+    filepaths = generate_images(directory=tmp_path, total=1)
+    cache = PreprocessedImageCache(
+        cache_dir=tmp_path / "cache", max_bytes=IMAGE_BYTES * 8
+    )
+    cache.warm(filepaths=filepaths)
+
+    Image.new(mode="RGB", size=(96, 48), color=(0, 255, 0)).save(filepaths[0])
+    os.utime(filepaths[0], ns=(0, 0))
+    assert cache.get(filepaths[0]) is None
+
+
+@pytest.mark.asyncio
+async def test_cache_evicts_least_recently_used_entries(tmp_path) -> None:
+    """Should never grow beyond the configured size."""
+    filepaths = generate_images(directory=tmp_path, total=5)
+    cache = PreprocessedImageCache(
+        cache_dir=tmp_path / "cache", max_bytes=IMAGE_BYTES * 3
+    )
+    cache.warm(filepaths=filepaths[:3])
+    cache.warm(filepaths=filepaths[3:])
+
+    assert len(cache) == 3
+    assert cache.get(filepaths[0]) is None
+    np.testing.assert_array_equal(cache.get(filepaths[4]), load_image(filepaths[4]))
+
+
+@pytest.mark.asyncio
+async def test_cache_writers_in_two_processes_keep_their_slots(tmp_path) -> None:
+    """Should merge the entries of concurrent writers without sharing a slot between images."""
+    filepaths = generate_images(directory=tmp_path, total=20)
+    # Both writers start from the same empty index, like two tasks opening the cache together.
+    caches = [
+        PreprocessedImageCache(cache_dir=tmp_path / "cache", max_bytes=IMAGE_BYTES * 32)
+        for _ in range(2)
+    ]
+    context = multiprocessing.get_context("fork")
+    writers = [
+        context.Process(
+            target=cache.warm,
+            kwargs={"filepaths": filepaths[idx::2], "max_workers": 1},
+        )
+        for idx, cache in enumerate(caches)
+    ]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+
+    reloaded = PreprocessedImageCache(
+        cache_dir=tmp_path / "cache", max_bytes=IMAGE_BYTES * 32
+    )
+    assert len(reloaded) == 20
+    assert len({entry["slot"] for entry in reloaded.entries.values()}) == 20
+    for filepath in filepaths:
+        np.testing.assert_array_equal(reloaded.get(filepath), load_image(filepath))
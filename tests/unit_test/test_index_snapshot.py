@@ -0,0 +1,117 @@
+import pytest
+import numpy as np
+
+from utils.clip import index_snapshot, search
+from utils.clip.embedding_store import EmbeddingStore
+from utils.clip.index_snapshot import load_index_snapshot, refresh_index_snapshot
+from utils.clip.search import SimilarityIndex
+
+
+def random_embeddings(total: int, dimension: int = 16, seed: int = 0) -> np.ndarray:
+    vectors = np.random.default_rng(seed=seed).standard_normal((total, dimension))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+@pytest.fixture
+def snapshot_config(monkeypatch) -> None:
+    for config in (index_snapshot.config, search.config):
+        monkeypatch.setattr(config, "ANN_EXACT_THRESHOLD", 100)
+        monkeypatch.setattr(config, "ANN_NLIST", 8)
+        monkeypatch.setattr(config, "ANN_QUANTIZATION", "int8")
+        monkeypatch.setattr(config, "ANN_DELTA_MAX_FRACTION", 0.5)
+
+
+def fill_store(
+    tmp_path, image_ids: np.ndarray, embeddings: np.ndarray
+) -> EmbeddingStore:
+    store = EmbeddingStore(directory=tmp_path, model_name="fake-clip")
+    store.update(
+        image_ids=image_ids,
+        signatures=np.zeros((image_ids.shape[0], 2), dtype=np.int64),
+        embeddings=embeddings,
+    )
+    return store
+
+
+@pytest.mark.asyncio
+async def test_snapshot_is_memory_mapped_and_searchable(
+    tmp_path, snapshot_config
+) -> None:
+    """Should save a snapshot once and load it back as memory maps with the same results."""
+    embeddings = random_embeddings(total=400)
+    store = fill_store(tmp_path, np.arange(400), embeddings)
+
+    assert refresh_index_snapshot(store=store)["action"] == "compact"
+    assert refresh_index_snapshot(store=store)["action"] == "unchanged"
+
+    index = load_index_snapshot(store=store)
+    assert isinstance(index.rows, np.memmap)
+    assert isinstance(index.codes, np.memmap)
+    rows, _ = index.search(
+        embeddings=store.embeddings, query=embeddings[42], k=5, nprobe=index.nlist
+    )
+    assert rows[0] == 42
+
+
+@pytest.mark.asyncio
+async def test_snapshot_delta_adds_new_and_drops_removed_images(
+    tmp_path, snapshot_config
+) -> None:
+    """Should append new images to the delta segment and never return removed ones."""
+    embeddings = random_embeddings(total=500)
+    store = fill_store(tmp_path, np.arange(400), embeddings[:400])
+    refresh_index_snapshot(store=store)
+
+    store.update(
+        image_ids=np.arange(1000, 1100),
+        signatures=np.zeros((100, 2), dtype=np.int64),
+        embeddings=embeddings[400:],
+        removed_ids=np.arange(0, 10),
+    )
+    assert refresh_index_snapshot(store=store)["action"] == "delta"
+
+    similarity = SimilarityIndex(directory=str(tmp_path), model_name="fake-clip")
+    _, index = similarity.current()
+    assert index.delta_rows.shape[0] == 100
+    assert int((index.rows < 0).sum()) == 10
+
+    results = similarity.search(query=embeddings[450], k=1, nprobe=8)
+    assert results[0]["image_id"] == 1050
+    for image_id in range(10):
+        results = similarity.search(query=embeddings[image_id], k=5, nprobe=8)
+        assert image_id not in [result["image_id"] for result in results]
+
+
+@pytest.mark.asyncio
+async def test_snapshot_compacts_large_deltas(tmp_path, snapshot_config) -> None:
+    """Should rebuild the base once the outdated entries exceed the delta fraction."""
+    embeddings = random_embeddings(total=500)
+    store = fill_store(tmp_path, np.arange(200), embeddings[:200])
+    refresh_index_snapshot(store=store)
+
+    store.update(
+        image_ids=np.arange(200, 500),
+        signatures=np.zeros((300, 2), dtype=np.int64),
+        embeddings=embeddings[200:],
+    )
+    assert refresh_index_snapshot(store=store)["action"] == "compact"
+    index = load_index_snapshot(store=store)
+    assert index.delta_rows.shape[0] == 0
+    assert index.rows.shape[0] == 500
+
+
+@pytest.mark.asyncio
+async def test_similarity_index_searches_exactly_until_a_snapshot_exists(
+    tmp_path, snapshot_config
+) -> None:
+    """Should not build the index in the API process and pick up the snapshot once saved."""
+    embeddings = random_embeddings(total=400)
+    store = fill_store(tmp_path, np.arange(400), embeddings)
+    similarity_index = SimilarityIndex(directory=str(tmp_path), model_name="fake-clip")
+
+    assert similarity_index.current()[1] is None
+    assert not (tmp_path / "index").exists()
+    assert similarity_index.search(query=embeddings[42], k=1)[0]["image_id"] == 42
+
+    refresh_index_snapshot(store=store)
+    assert similarity_index.current()[1] is not None
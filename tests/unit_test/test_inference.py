@@ -0,0 +1,156 @@
+import os
+import multiprocessing
+import torch
+import pytest
+import numpy as np
+
+from PIL import Image
+from types import SimpleNamespace
+from utils.resnet import inference
+from utils.resnet.custom_model import CustomResNet50Classifier
+from src.routers.classification import predict
+from utils.resnet.inference import (
+    CLASSIFIER_OUTPUTS,
+    PREDICTED_LABELS,
+    ModelCache,
+    predict_probabilities,
+)
+
+
+def save_classifier(filepath) -> str:
+    model = CustomResNet50Classifier(
+        num_labels=len(CLASSIFIER_OUTPUTS), pretrained=False
+    )
+    torch.save(model.state_dict(), filepath)
+    return str(filepath)
+
+
+@pytest.mark.asyncio
+async def test_predicted_labels_match_image_tag_columns() -> None:
+    """Should predict every ImageTag label column, in training order."""
+    assert CLASSIFIER_OUTPUTS[0] == "nature"
+    assert CLASSIFIER_OUTPUTS[-1] == "is_validated"
+    assert "is_validated" not in PREDICTED_LABELS
+
+
+@pytest.mark.asyncio
+async def test_model_cache_loads_model_once(tmp_path) -> None:
+    """Should reuse the loaded model until its file is rewritten."""
+    model_path = save_classifier(tmp_path / "model.pth")
+    cache = ModelCache(capacity=2)
+
+    model = cache.get(model_name="model", model_path=model_path)
+    assert cache.get(model_name="model", model_path=model_path) is model
+
+    save_classifier(model_path)
+    os.utime(model_path, ns=(0, 0))
+    assert cache.get(model_name="model", model_path=model_path) is not model
+    assert len(cache) == 1
+
+
+@pytest.mark.asyncio
+async def test_predict_probabilities_is_batch_independent(tmp_path) -> None:
+    """Should return the same probabilities whatever the batch size."""
+    model = CustomResNet50Classifier(num_labels=4, pretrained=False).eval()
+    images = [
+        np.random.randint(0, 255, size=(224, 224, 3), dtype=np.uint8) for _ in range(5)
+    ]
+
+    batched = predict_probabilities(model=model, images=images, device="cpu")
+    single = predict_probabilities(
+        model=model, images=images, device="cpu", batch_size=1
+    )
+    assert batched.shape == (5, 4)
+    np.testing.assert_allclose(batched, single, atol=1e-5)
+
+
+def patch_auto_tag_entries(tmp_path, monkeypatch) -> list[dict]:
+    """Serves five images and a watermark of 2 to `auto_tag_images`, returns the recorded updates."""
+    model_path = save_classifier(tmp_path / "model.pth")
+    entries = []
+    for idx in range(1, 6):
+        filepath = tmp_path / f"image_{idx}.jpg"
+        Image.new(mode="RGB", size=(320, 240), color=(idx * 40, 0, 0)).save(filepath)
+        entries.append({"id": idx, "filepath": str(filepath)})
+
+    updates = []
+    monkeypatch.setattr(
+        inference,
+        "extract_models_card_entry",
+        lambda model_type: SimpleNamespace(model_name="model", model_path=model_path),
+    )
+    monkeypatch.setattr(inference, "extract_auto_tag_watermark", lambda model_name: 2)
+    monkeypatch.setattr(
+        inference,
+        "count_untagged_images",
+        lambda after_id: len([entry for entry in entries if entry["id"] > after_id]),
+    )
+    monkeypatch.setattr(
+        inference,
+        "extract_untagged_image_chunk",
+        lambda after_id, limit: [entry for entry in entries if entry["id"] > after_id][
+            :limit
+        ],
+    )
+    monkeypatch.setattr(
+        inference,
+        "update_predicted_labels",
+        lambda **kwargs: updates.append(kwargs),
+    )
+
+    return updates
+
+
+@pytest.mark.asyncio
+async def test_auto_tag_images_resumes_after_watermark(tmp_path, monkeypatch) -> None:
+    """Should only tag the entries after the watermark and move it chunk by chunk."""
+    updates = patch_auto_tag_entries(tmp_path=tmp_path, monkeypatch=monkeypatch)
+    progress = inference.auto_tag_images(chunk_size=2)
+
+    assert [update["last_image_id"] for update in updates] == [4, 5]
+    assert [p["id"] for update in updates for p in update["predictions"]] == [3, 4, 5]
+    assert 0.5 <= updates[0]["predictions"][0]["confidence"] <= 1
+    assert progress["tagged_image"] == 3
+    assert progress["total_image"] == 3
+
+
+@pytest.mark.asyncio
+async def test_auto_tag_images_in_daemonic_process(tmp_path, monkeypatch) -> None:
+    """Should tag the images from a daemonic pool worker, which cannot start processes, like a Celery task."""
+    patch_auto_tag_entries(tmp_path=tmp_path, monkeypatch=monkeypatch)
+
+    with multiprocessing.get_context("fork").Pool(processes=1) as pool:
+        progress = pool.apply(inference.auto_tag_images, kwds={"chunk_size": 2})
+
+    assert progress["tagged_image"] == 3
+    assert progress["skipped_image"] == 0
+
+
+@pytest.mark.asyncio
+async def test_predict_labels_answers_in_the_request_order(monkeypatch) -> None:
+    """Should return the result of every image id at its position, found or not."""
+
+    async def extract_image_tag_filepaths(image_ids: list[int]) -> dict:
+        return {1: "/nas/1.jpg", 3: "/nas/3.jpg"}
+
+    def classify_images(sources: list, **kwargs) -> list[dict]:
+        return [{"source": source, "key": key} for source, key, _ in sources]
+
+    monkeypatch.setattr(
+        predict, "extract_image_tag_filepaths", extract_image_tag_filepaths
+    )
+    monkeypatch.setattr(
+        predict,
+        "extract_models_card_entry",
+        lambda model_type: SimpleNamespace(model_name="m", model_path="m.pth"),
+    )
+    monkeypatch.setattr(predict, "classify_images", classify_images)
+
+    response = await predict.predict_labels(
+        request=SimpleNamespace(client=SimpleNamespace(host="192.168.100.1")),
+        files=None,
+        image_ids=[2, 3, 4, 1],
+        threshold=0.5,
+    )
+    assert [result["key"] for result in response.data] == [2, 3, 4, 1]
+    assert ["error" in result for result in response.data] == [True, False, True, False]
@@ -0,0 +1,215 @@
+import asyncio
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy.dialects import postgresql
+
+from utils.query import labels_validator
+from utils.custom_errors import DatabaseQueryError
+from utils.query.labels_validator import (
+    ValidationBuffer,
+    update_labels,
+    update_labels_bulk,
+)
+from src.schema.request_format import LabelsValidatorBulk
+
+
+class FakeResult:
+    def __init__(self, rows: list) -> None:
+        self.rows = rows
+
+    def fetchall(self) -> list:
+        return self.rows
+
+    def scalar_one_or_none(self) -> bool | None:
+        return self.rows[0][1] if self.rows else None
+
+
+class FakeSession:
+    """Async connection recording the executed statements, entries 1 and 2 exist."""
+
+    def __init__(self) -> None:
+        self.statements = []
+        self.commits = 0
+
+    async def __aenter__(self) -> "FakeSession":
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        return None
+
+    async def execute(self, query) -> FakeResult:
+        self.statements.append(str(query.compile(dialect=postgresql.dialect())))
+        return FakeResult(rows=[(1, False), (2, True)])
+
+    async def commit(self) -> None:
+        self.commits += 1
+
+    async def rollback(self) -> None:
+        return None
+
+    async def close(self) -> None:
+        return None
+
+
+@pytest.fixture
+def session(monkeypatch) -> FakeSession:
+    session = FakeSession()
+
+    class FakeEngine:
+        def connect(self) -> FakeSession:
+            return session
+
+    monkeypatch.setattr(
+        labels_validator, "database_connection", lambda connection_type: FakeEngine()
+    )
+    return session
+
+
+@pytest.mark.asyncio
+async def test_update_labels_keeps_the_dominant_colors_bit(session) -> None:
+    """Should rewrite the bitmask from the payload and the stored `dominant_colors` label."""
+    await update_labels(image_id=1, ip_address="127.0.0.1", gold=True)
+
+    update_statement = session.statements[-1]
+    assert update_statement.startswith("UPDATE image_tag SET")
+    assert "CASE WHEN image_tag.dominant_colors THEN" in update_statement
+    assert session.commits == 1
+
+
+@pytest.mark.asyncio
+async def test_update_labels_bulk_uses_a_single_update(session) -> None:
+    """Should lock, update every entry with one statement, commit once and report each image."""
+    results = await update_labels_bulk(
+        validations=[
+            {"image_id": 1, "gold": False},
+            {"image_id": 2, "warm": True},
+            {"image_id": 3, "night": True},
+            {"image_id": 1, "gold": True},
+        ],
+        ip_address="127.0.0.1",
+    )
+
+    assert results == [
+        {"image_id": 1, "status": "validated"},
+        {"image_id": 2, "status": "validated"},
+        {"image_id": 3, "status": "not_found"},
+    ]
+    assert session.commits == 1
+    select_statement, update_statement = session.statements
+    assert "FOR UPDATE" in select_statement
+    assert update_statement.startswith("UPDATE image_tag SET")
+    assert "FROM (VALUES" in update_statement
+    assert "updated_at" in update_statement
+    assert "CASE WHEN image_tag.dominant_colors THEN" in update_statement
+
+
+@pytest.mark.asyncio
+async def test_bulk_payload_is_bounded() -> None:
+    """Should reject empty payloads and payloads above 1000 images."""
+    with pytest.raises(ValidationError):
+        LabelsValidatorBulk(validations=[])
+    with pytest.raises(ValidationError):
+        LabelsValidatorBulk(
+            validations=[{"image_id": image_id} for image_id in range(1, 1002)]
+        )
+
+
+@pytest.mark.asyncio
+async def test_validation_buffer_coalesces_and_flushes_on_stop() -> None:
+    """Should write the last validation of each entry, one batch per labeler, when stopped."""
+    writes = []
+
+    async def writer(validations: list, ip_address: str) -> list:
+        writes.append((ip_address, validations))
+        return []
+
+    buffer = ValidationBuffer(writer=writer, flush_interval=60000, max_items=100)
+    buffer.start()
+    for gold in (False, True, True):
+        buffer.submit(validation={"image_id": 1, "gold": gold}, ip_address="10.0.0.1")
+    buffer.submit(validation={"image_id": 2}, ip_address="10.0.0.1")
+    buffer.submit(validation={"image_id": 1}, ip_address="10.0.0.2")
+    await asyncio.sleep(0)
+
+    assert writes == []
+    assert buffer.statistics()["depth"] == 3
+    await buffer.stop()
+
+    assert writes == [
+        ("10.0.0.1", [{"image_id": 1, "gold": True}, {"image_id": 2}]),
+        ("10.0.0.2", [{"image_id": 1}]),
+    ]
+    statistics = buffer.statistics()
+    assert statistics["depth"] == 0
+    assert statistics["coalesced"] == 2
+    assert statistics["written"] == 3
+
+
+@pytest.mark.asyncio
+async def test_validation_buffer_flushes_at_max_items_and_keeps_failed_batches() -> (
+    None
+):
+    """Should flush once `max_items` are pending and requeue a failed batch under newer payloads."""
+    writes = []
+    fail = [True]
+
+    async def writer(validations: list, ip_address: str) -> list:
+        if fail.pop():
+            raise DatabaseQueryError(detail="Invalid database query")
+        writes.append(validations)
+        return []
+
+    buffer = ValidationBuffer(writer=writer, flush_interval=60000, max_items=2)
+    buffer.start()
+    buffer.submit(validation={"image_id": 1}, ip_address="10.0.0.1")
+    buffer.submit(validation={"image_id": 2}, ip_address="10.0.0.1")
+    for _ in range(100):
+        if buffer.statistics()["failures"]:
+            break
+        await asyncio.sleep(0)
+
+    assert buffer.statistics()["failures"] == 1
+    buffer.submit(validation={"image_id": 2, "night": True}, ip_address="10.0.0.1")
+    fail.append(False)
+    await buffer.stop()
+
+    assert writes == [[{"image_id": 1}, {"image_id": 2, "night": True}]]
+    assert buffer.statistics()["depth"] == 0
+
+
+@pytest.mark.asyncio
+async def test_validation_buffer_write_waits_for_the_flush_in_progress() -> None:
+    """Should write a direct validation after the running flush and drop the older queued one."""
+    writes = []
+    release = asyncio.Event()
+
+    async def writer(validations: list, ip_address: str) -> list:
+        if not writes:
+            await release.wait()
+        writes.append(validations)
+        return [{"image_id": v["image_id"], "status": "validated"} for v in validations]
+
+    buffer = ValidationBuffer(writer=writer, flush_interval=60000, max_items=100)
+    buffer.submit(validation={"image_id": 1, "gold": False}, ip_address="10.0.0.1")
+    flush = asyncio.create_task(buffer.flush())
+    await asyncio.sleep(0)
+    buffer.submit(validation={"image_id": 2, "warm": False}, ip_address="10.0.0.1")
+
+    write = asyncio.create_task(
+        buffer.write(
+            validations=[{"image_id": 1, "gold": True}, {"image_id": 2, "warm": True}],
+            ip_address="10.0.0.1",
+        )
+    )
+    await asyncio.sleep(0)
+    assert not write.done()
+
+    release.set()
+    await flush
+    assert len(await write) == 2
+    assert writes == [
+        [{"image_id": 1, "gold": False}],
+        [{"image_id": 1, "gold": True}, {"image_id": 2, "warm": True}],
+    ]
+    assert buffer.statistics()["depth"] == 0
@@ -0,0 +1,36 @@
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from services.postgres.models import added_column_statements
+
+
+@pytest.mark.asyncio
+async def test_added_columns_are_migrated() -> None:
+    """Should add the columns created after their table, nullable and only when missing."""
+    statements = added_column_statements(dialect=postgresql.dialect())
+
+    assert (
+        "ALTER TABLE model_card ADD COLUMN IF NOT EXISTS precision VARCHAR"
+        in statements
+    )
+    assert (
+        "ALTER TABLE model_card ADD COLUMN IF NOT EXISTS channels_last BOOLEAN"
+        in statements
+    )
+    assert (
+        "ALTER TABLE model_card ADD COLUMN IF NOT EXISTS intra_op_threads INTEGER"
+        in statements
+    )
+    assert (
+        "ALTER TABLE image_tag ADD COLUMN IF NOT EXISTS confidence FLOAT" in statements
+    )
+    assert (
+        "ALTER TABLE image_tag ADD COLUMN IF NOT EXISTS auto_tagged_at TIMESTAMP WITH TIME ZONE"
+        in statements
+    )
+    assert (
+        "ALTER TABLE image_tag ADD COLUMN IF NOT EXISTS label_bitmask BIGINT"
+        in statements
+    )
+    assert "ALTER TABLE image_tag ADD COLUMN IF NOT EXISTS phash BIGINT" in statements
+    assert not any("NOT NULL" in statement for statement in statements)
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from utils.custom_errors import DatabaseQueryError, InvalidRequestError
+from utils.query.pagination import LabelerCounts, decode_cursor, encode_cursor
+
+
+@pytest.mark.asyncio
+async def test_cursor_round_trip() -> None:
+    """Should decode the direction and boundary id packed into a cursor."""
+    cursor = encode_cursor(direction="prev", image_id=1234, is_validated=True)
+
+    assert "1234" not in cursor
+    assert decode_cursor(cursor=cursor, is_validated=True) == ("prev", 1234)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "cursor", ["not-a-cursor", "eyJpZCI6IDF9", encode_cursor("next", 5, False)]
+)
+async def test_invalid_cursor_is_rejected(cursor: str) -> None:
+    """Should reject malformed cursors and cursors of the other validation state."""
+    with pytest.raises(InvalidRequestError):
+        decode_cursor(cursor=cursor, is_validated=True)
+
+
+@pytest.mark.asyncio
+async def test_labeler_counts_are_cached_and_adjusted() -> None:
+    """Should count once, apply the increments and reconcile in the background after the TTL."""
+    loads = []
+
+    async def loader() -> dict:
+        loads.append(1)
+        return {("10.0.0.1", False): 25 + len(loads)}
+
+    counts = LabelerCounts(loader=loader, ttl=300)
+    await counts.reconcile()
+    assert counts.get(ip_address="10.0.0.1", is_validated=False) == 26
+    counts.add(ip_address="10.0.0.1", is_validated=False, count=-1)
+    counts.add(ip_address="10.0.0.1", is_validated=True, count=1)
+    assert counts.get(ip_address="10.0.0.1", is_validated=False) == 25
+    assert counts.get(ip_address="10.0.0.1", is_validated=True) == 1
+    assert len(loads) == 1
+
+    counts.ttl = -1
+    assert counts.get(ip_address="10.0.0.1", is_validated=False) == 25
+    assert counts.get(ip_address="10.0.0.1", is_validated=False) == 25
+    await counts.reconcile_task
+    assert len(loads) == 2
+    assert counts.get(ip_address="10.0.0.1", is_validated=True) == 0
+    await counts.reconcile_task
+
+
+@pytest.mark.asyncio
+async def test_labeler_counts_never_load_in_the_request() -> None:
+    """Should answer 0 before the first load and keep the counts when a reconcile fails."""
+    release = asyncio.Event()
+
+    async def loader() -> dict:
+        await release.wait()
+        raise DatabaseQueryError(detail="Invalid database query.")
+
+    counts = LabelerCounts(loader=loader, ttl=300)
+    assert counts.get(ip_address="10.0.0.1", is_validated=False) == 0
+    assert not counts.reconcile_task.done()
+    release.set()
+    await counts.reconcile_task
+    assert counts.loaded_at is None
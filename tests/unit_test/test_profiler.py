@@ -0,0 +1,29 @@
+import pytest
+
+from utils.resnet.profiler import StageProfiler, stage, timed_batches
+
+
+@pytest.mark.asyncio
+async def test_stage_profiler_accumulates_stages() -> None:
+    """Should accumulate the wall time and images of repeated stages."""
+    profiler = StageProfiler()
+    for _ in range(3):
+        with profiler.stage(name="train_step", images=4):
+            pass
+
+    summary = profiler.summary()
+    assert summary["stages"]["train_step"]["images"] == 12
+    assert summary["peak_rss_mb"] > 0
+
+
+@pytest.mark.asyncio
+async def test_timed_batches_yields_every_batch() -> None:
+    """Should yield every batch and count its images, with or without a profiler."""
+    batches = [{"labels": [0, 1]}, {"labels": [1]}]
+    profiler = StageProfiler()
+
+    assert list(timed_batches(batches, profiler, name="train_data")) == batches
+    assert profiler.images["train_data"] == 3
+    assert list(timed_batches(batches, None, name="train_data")) == batches
+    with stage(None, name="noop"):
+        pass
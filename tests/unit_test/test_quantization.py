@@ -0,0 +1,51 @@
+import pytest
+import numpy as np
+
+from utils.clip.ann_index import IVFIndex, top_k
+from utils.clip.quantization import ProductQuantizer, ScalarQuantizer
+
+
+def random_embeddings(total: int, dimension: int = 16, seed: int = 0) -> np.ndarray:
+    vectors = np.random.default_rng(seed=seed).standard_normal((total, dimension))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+@pytest.mark.asyncio
+async def test_quantizers_approximate_dot_products() -> None:
+    """Should approximate the dot products of the encoded vectors with a query."""
+    embeddings = random_embeddings(total=2000)
+    query = embeddings[0]
+    exact = embeddings @ query
+
+    scalar = ScalarQuantizer.train(sample=embeddings)
+    codes = scalar.encode(embeddings)
+    assert codes.dtype == np.uint8 and codes.shape == (2000, 16)
+    assert np.abs(scalar.score(codes=codes, query=query) - exact).max() < 0.05
+
+    product = ProductQuantizer.train(sample=embeddings, subspaces=4)
+    codes = product.encode(embeddings)
+    assert codes.shape == (2000, 4)
+    assert np.corrcoef(product.score(codes=codes, query=query), exact)[0, 1] > 0.9
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("quantization", ["int8", "pq"])
+async def test_quantized_index_rescores_with_float_vectors(quantization) -> None:
+    """Should return exact scores of the rescored shortlist, best first."""
+    embeddings = random_embeddings(total=2000)
+    index = IVFIndex.build(
+        embeddings=embeddings,
+        nlist=8,
+        train_sample=2000,
+        quantization=quantization,
+        pq_subspaces=4,
+    )
+    query = embeddings[11]
+
+    rows, scores = index.search(
+        embeddings=embeddings, query=query, k=10, nprobe=index.nlist, rescore=200
+    )
+    assert rows[0] == 11
+    np.testing.assert_allclose(scores, embeddings[rows] @ query, rtol=1e-6)
+    assert len(set(rows) & set(top_k(embeddings @ query, k=10))) >= 9
+    assert index.codes.shape[0] == 2000
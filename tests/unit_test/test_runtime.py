@@ -0,0 +1,28 @@
+import torch
+import pytest
+
+from utils.resnet import runtime
+from utils.resnet.runtime import apply_thread_settings, bf16_supported, runtime_settings
+
+
+@pytest.mark.asyncio
+async def test_bf16_supported_without_the_private_cpu_helpers(monkeypatch) -> None:
+    """Should report no bfloat16 support when `torch.cpu` lacks its private helpers."""
+    monkeypatch.delattr(torch.cpu, "_is_avx512_bf16_supported", raising=False)
+    monkeypatch.delattr(torch.cpu, "_is_amx_tile_supported", raising=False)
+    assert bf16_supported(device="cpu") is False
+
+
+@pytest.mark.asyncio
+async def test_only_apply_thread_settings_changes_the_process_threads(
+    monkeypatch,
+) -> None:
+    """Should record the thread counts in `runtime_settings` and only set them on request."""
+    threads = torch.get_num_threads()
+    monkeypatch.setattr(runtime.config, "TORCH_INTRA_OP_THREADS", threads + 1)
+    try:
+        assert runtime_settings(device="cpu").intra_op_threads == threads
+        apply_thread_settings()
+        assert runtime_settings(device="cpu").intra_op_threads == threads + 1
+    finally:
+        torch.set_num_threads(threads)
@@ -0,0 +1,135 @@
+import pytest
+import numpy as np
+
+from utils.clip.ann_index import IVFIndex, top_k
+from utils.clip.embedding_store import EmbeddingStore
+from utils.clip import search
+from utils.clip.label_filter import align_bitmasks, parse_label_filter
+from utils.custom_errors import InvalidRequestError
+from services.postgres.models import label_bitmask
+from utils.clip.search import SimilarityIndex, TextEmbeddingCache
+
+
+def random_embeddings(total: int, dimension: int = 16, seed: int = 0) -> np.ndarray:
+    vectors = np.random.default_rng(seed=seed).standard_normal((total, dimension))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+@pytest.mark.asyncio
+async def test_ivf_index_matches_exact_search_when_probing_every_list() -> None:
+    """Should return the exact top-k when every list is probed."""
+    embeddings = random_embeddings(total=2000)
+    index = IVFIndex.build(embeddings=embeddings, nlist=16, train_sample=500)
+    query = embeddings[7]
+
+    rows, scores = index.search(
+        embeddings=embeddings, query=query, k=10, nprobe=index.nlist
+    )
+    assert rows.tolist() == top_k(embeddings @ query, k=10).tolist()
+    assert rows[0] == 7
+    assert np.all(np.diff(scores) <= 0)
+    assert index.offsets[-1] == embeddings.shape[0]
+
+
+@pytest.mark.asyncio
+async def test_similarity_index_reloads_updated_store(tmp_path) -> None:
+    """Should search the latest store and leave excluded ids out."""
+    store = EmbeddingStore(directory=tmp_path, model_name="fake-clip")
+    embeddings = random_embeddings(total=4)
+    store.update(
+        image_ids=np.asarray([1, 2, 3, 4]),
+        signatures=np.zeros((4, 2), dtype=np.int64),
+        embeddings=embeddings,
+    )
+    index = SimilarityIndex(directory=str(tmp_path), model_name="fake-clip")
+
+    results = index.search(query=embeddings[1], k=2, exclude_ids=[2])
+    assert len(results) == 2
+    assert 2 not in [result["image_id"] for result in results]
+
+    store.update(
+        image_ids=np.asarray([5]),
+        signatures=np.zeros((1, 2), dtype=np.int64),
+        embeddings=embeddings[1:2],
+    )
+    assert index.search(query=embeddings[1], k=2, exclude_ids=[2])[0] == {
+        "image_id": 5,
+        "score": 1.0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_text_embedding_cache_encodes_each_query_once(monkeypatch) -> None:
+    """Should encode a repeated query once and evict the least recently used one."""
+    encoded = []
+
+    class FakeEncoder:
+        def encode_texts(self, texts: list[str]) -> np.ndarray:
+            encoded.extend(texts)
+            return random_embeddings(total=len(texts), seed=len(encoded))
+
+    monkeypatch.setattr(search, "clip_encoder", lambda: FakeEncoder())
+    cache = TextEmbeddingCache(capacity=2)
+
+    embedding = cache.get("Gold art deco  ballroom")
+    assert cache.get("gold art deco ballroom") is embedding
+    cache.get("night")
+    cache.get("gold art deco ballroom")
+    cache.get("asian")
+    cache.get("night")
+    assert encoded == ["gold art deco ballroom", "night", "asian", "night"]
+    assert len(cache) == 2
+
+
+@pytest.mark.asyncio
+async def test_label_filter_matches_required_and_forbidden_labels() -> None:
+    """Should keep images with every required label, no forbidden one and an entry."""
+    label_filter = parse_label_filter(
+        labels=["night", "gold"], exclude_labels=["asian"]
+    )
+    bitmasks = align_bitmasks(
+        store_ids=np.asarray([1, 2, 3, 4]),
+        image_ids=np.asarray([1, 2, 3]),
+        bitmasks=np.asarray(
+            [
+                label_bitmask({"night": True, "gold": True}),
+                label_bitmask({"night": True, "gold": True, "asian": True}),
+                label_bitmask({"night": True}),
+            ]
+        ),
+    )
+    assert label_filter.match(bitmasks=bitmasks).tolist() == [True, False, False, False]
+
+    with pytest.raises(InvalidRequestError):
+        parse_label_filter(labels=["nigth"])
+    assert parse_label_filter() is None
+
+
+@pytest.mark.asyncio
+async def test_filtered_scan_only_returns_matching_rows(tmp_path) -> None:
+    """Should pre-filter rare labels exactly and post-filter common ones through the index."""
+    embeddings = random_embeddings(total=2000)
+    store = EmbeddingStore(directory=tmp_path, model_name="fake-clip")
+    store.update(
+        image_ids=np.arange(1, 2001),
+        signatures=np.zeros((2000, 2), dtype=np.int64),
+        embeddings=embeddings,
+    )
+    index = IVFIndex.build(embeddings=embeddings, nlist=16, train_sample=500)
+    similarity = SimilarityIndex(directory=str(tmp_path), model_name="fake-clip")
+    query = embeddings[3]
+
+    rare = np.zeros(2000, dtype=bool)
+    rare[::100] = True
+    rows, _ = similarity.scan(
+        store=store, index=index, query=query, k=5, nprobe=1, match=rare
+    )
+    expected = np.flatnonzero(rare)[top_k(embeddings[rare] @ query, k=5)]
+    assert rows.tolist() == expected.tolist()
+
+    common = np.arange(2000) % 2 == 1
+    rows, _ = similarity.scan(
+        store=store, index=index, query=query, k=10, nprobe=1, match=common
+    )
+    assert rows.shape[0] == 10
+    assert common[rows].all()
@@ -0,0 +1,96 @@
+import copy
+import pytest
+import numpy as np
+
+from utils.clip import zero_shot
+from utils.clip.search import SimilarityIndex
+from utils.clip.embedding_store import EmbeddingStore
+from utils.clip.zero_shot import ZeroShotLabeler
+
+DOCUMENTATION = [
+    {
+        "category": "time_period",
+        "details": [
+            {"category": "day", "description": "Scenes illuminated by daylight."},
+            {"category": "night", "description": "Images set in the dark."},
+        ],
+    },
+    {
+        "category": "dominant_colors",
+        "details": [
+            {"category": "warm", "description": "Colors that evoke warmth."},
+            {"category": "cool", "description": "Colors that convey calmness."},
+            {"category": "gold", "description": "A metallic color."},
+        ],
+    },
+]
+
+
+class FakeEncoder:
+    def __init__(self) -> None:
+        self.encoded = 0
+
+    def encode_texts(self, texts: list[str]) -> np.ndarray:
+        self.encoded += len(texts)
+        return np.eye(len(texts), 8, dtype=np.float32)
+
+
+@pytest.mark.asyncio
+async def test_zero_shot_labeler_encodes_prompts_once(tmp_path) -> None:
+    """Should reuse the saved label embeddings until the documentation changes."""
+    encoder = FakeEncoder()
+    ZeroShotLabeler(directory=tmp_path, model_name="fake-clip").load(
+        documentation=DOCUMENTATION, encoder=encoder
+    )
+
+    labeler = ZeroShotLabeler(directory=tmp_path, model_name="fake-clip")
+    labeler.load(documentation=DOCUMENTATION, encoder=encoder)
+    assert encoder.encoded == 5
+    assert labeler.labels.tolist() == ["day", "night", "warm", "cool", "gold"]
+
+    documentation = copy.deepcopy(DOCUMENTATION)
+    documentation[0]["details"][1]["description"] = "Images set at night."
+    labeler.load(documentation=documentation, encoder=encoder)
+    assert encoder.encoded == 10
+
+
+@pytest.mark.asyncio
+async def test_zero_shot_labeler_encodes_again_over_a_broken_file(tmp_path) -> None:
+    """Should treat a partially written prompts file as a cache miss and replace it whole."""
+    (tmp_path / "label_prompts.npz").write_bytes(b"PK\x03\x04 truncated")
+    encoder = FakeEncoder()
+    labeler = ZeroShotLabeler(directory=tmp_path, model_name="fake-clip")
+    labeler.load(documentation=DOCUMENTATION, encoder=encoder)
+    assert encoder.encoded == 5
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["label_prompts.npz"]
+
+    ZeroShotLabeler(directory=tmp_path, model_name="fake-clip").load(
+        documentation=DOCUMENTATION, encoder=encoder
+    )
+    assert encoder.encoded == 5
+
+
+@pytest.mark.asyncio
+async def test_zero_shot_labeler_suggests_labels_per_category(
+    tmp_path, monkeypatch
+) -> None:
+    """Should suggest the dominant label of every category for indexed images only."""
+    labeler = ZeroShotLabeler(directory=tmp_path, model_name="fake-clip")
+    labeler.load(documentation=DOCUMENTATION, encoder=FakeEncoder())
+
+    # Image 1 points at "night" and "gold".
+    embedding = np.zeros((1, 8), dtype=np.float32)
+    embedding[0, [1, 4]] = 1 / np.sqrt(2)
+    EmbeddingStore(directory=tmp_path / "store", model_name="fake-clip").update(
+        image_ids=np.asarray([1]),
+        signatures=np.zeros((1, 2), dtype=np.int64),
+        embeddings=embedding,
+    )
+    index = SimilarityIndex(directory=str(tmp_path / "store"), model_name="fake-clip")
+    monkeypatch.setattr(zero_shot, "similarity_index", lambda: index)
+
+    suggestions = labeler.suggest(image_ids=[1, 2], threshold=0.6)
+    assert list(suggestions) == [1]
+    assert suggestions[1]["suggested_labels"] == ["night", "gold"]
+    scores = suggestions[1]["labels"]
+    assert scores["day"] + scores["night"] == pytest.approx(1, abs=1e-3)
@@ -0,0 +1,285 @@
+import math
+import numpy as np
+from utils.logger import logging
+from utils.clip.quantization import (
+    QuantizationMode,
+    Quantizer,
+    encode_rows,
+    train_quantizer,
+)
+
+# Scores computed per matrix product while assigning the corpus to its lists, bounds the
+# (rows, nlist) score matrix to 64 MB.
+ASSIGN_SCORES = 2**24
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """The function `top_k` returns the positions of the `k` highest scores, best first."""
+    k = min(k, scores.shape[0])
+    if not k:
+        return np.empty(0, dtype=np.int64)
+    best = np.argpartition(-scores, k - 1)[:k]
+    return best[np.argsort(-scores[best], kind="stable")]
+
+
+def assign_lists(embeddings: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """The function `assign_lists` returns the closest centroid of every embedding, in chunks."""
+    lists = np.empty(embeddings.shape[0], dtype=np.int64)
+    step = max(1, ASSIGN_SCORES // centroids.shape[0])
+    for start in range(0, embeddings.shape[0], step):
+        chunk = np.asarray(embeddings[start : start + step], dtype=np.float32)
+        lists[start : start + chunk.shape[0]] = np.argmax(chunk @ centroids.T, axis=1)
+    return lists
+
+
+def spherical_kmeans(
+    vectors: np.ndarray, clusters: int, iterations: int, seed: int = 0
+) -> np.ndarray:
+    """
+    The function `spherical_kmeans` clusters L2 normalized vectors by cosine similarity.
+
+    :param vectors: The `vectors` parameter is the `float32` training sample.
+    :type vectors: np.ndarray
+    :param clusters: The `clusters` parameter is the number of centroids.
+    :type clusters: int
+    :return: The normalized centroids with shape (clusters, dimension).
+    """
+    rng = np.random.default_rng(seed=seed)
+    centroids = vectors[rng.choice(vectors.shape[0], size=clusters, replace=False)]
+    for _ in range(iterations):
+        lists = assign_lists(embeddings=vectors, centroids=centroids)
+        counts = np.bincount(lists, minlength=clusters)
+        filled = counts > 0
+        starts = (np.cumsum(counts) - counts)[filled]
+        sums = np.empty_like(centroids)
+        sums[filled] = np.add.reduceat(
+            vectors[np.argsort(lists, kind="stable")], starts, axis=0
+        )
+        # Empty clusters are moved onto random vectors instead of collapsing.
+        sums[~filled] = vectors[rng.choice(vectors.shape[0], size=int((~filled).sum()))]
+        centroids = sums / np.linalg.norm(sums, axis=1, keepdims=True)
+    return centroids.astype(np.float32)
+
+
+class IVFIndex:
+    """Inverted file index over the rows of an embedding matrix.
+
+    The embeddings are clustered into `nlist` lists around spherical k-means centroids. A query
+    only scores the rows of its `nprobe` closest lists, so `nprobe` trades recall for latency and
+    `nprobe == nlist` is a brute force scan. The index keeps the row numbers of every list, the
+    vectors stay in the embedding store.
+
+    With a quantizer the index also keeps the `uint8` codes of every row, laid out list by list.
+    Candidates are then ranked on their codes and only a shortlist of `rescore` rows is read from
+    the store and scored exactly, so the `float32` vectors no longer need to stay in memory.
+
+    Rows embedded after the index was built are kept in a small delta segment (their rows, lists
+    and codes) scanned along with the probed lists. Rows set to `-1` are deleted.
+    """
+
+    def __init__(
+        self,
+        centroids: np.ndarray,
+        rows: np.ndarray,
+        offsets: np.ndarray,
+        quantizer: Quantizer | None = None,
+        codes: np.ndarray | None = None,
+        delta_rows: np.ndarray | None = None,
+        delta_lists: np.ndarray | None = None,
+        delta_codes: np.ndarray | None = None,
+    ) -> None:
+        self.centroids = centroids
+        self.rows = rows
+        self.offsets = offsets
+        self.quantizer = quantizer
+        self.codes = codes
+        self.delta_rows = (
+            delta_rows if delta_rows is not None else np.empty(0, dtype=np.int64)
+        )
+        self.delta_lists = (
+            delta_lists if delta_lists is not None else np.empty(0, dtype=np.int64)
+        )
+        self.delta_codes = delta_codes
+        if quantizer is not None and delta_codes is None:
+            self.delta_codes = np.empty((0, quantizer.code_size), dtype=np.uint8)
+
+    @property
+    def nlist(self) -> int:
+        return self.centroids.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        """The function `nbytes` returns the memory held by the index, the codes included."""
+        return sum(
+            array.nbytes
+            for array in (
+                self.centroids,
+                self.rows,
+                self.offsets,
+                self.codes,
+                self.delta_rows,
+                self.delta_lists,
+                self.delta_codes,
+            )
+            if array is not None
+        ) + (self.quantizer.nbytes if self.quantizer is not None else 0)
+
+    @classmethod
+    def build(
+        cls,
+        embeddings: np.ndarray,
+        nlist: int = 0,
+        iterations: int = 10,
+        train_sample: int = 65536,
+        quantization: QuantizationMode = "none",
+        pq_subspaces: int = 128,
+        seed: int = 0,
+    ) -> "IVFIndex":
+        """
+        The function `build` trains the centroids on a sample of the embeddings and assigns every
+        row to its closest list.
+
+        :param embeddings: The `embeddings` parameter is the L2 normalized `float32` matrix, it may
+        be a memory map.
+        :type embeddings: np.ndarray
+        :param nlist: The `nlist` parameter is the number of lists, `4 * sqrt(rows)` when `0`.
+        :type nlist: int
+        :param train_sample: The `train_sample` parameter bounds the rows used to train the centroids
+        and the quantizer.
+        :type train_sample: int
+        :param quantization: The `quantization` parameter is "none", "int8" or "pq".
+        :type quantization: QuantizationMode
+        :return: The index.
+        """
+        total = embeddings.shape[0]
+        nlist = min(nlist or round(4 * math.sqrt(total)), total)
+        rng = np.random.default_rng(seed=seed)
+        sample = np.asarray(
+            embeddings[
+                np.sort(
+                    rng.choice(
+                        total, size=min(total, max(train_sample, nlist)), replace=False
+                    )
+                )
+            ],
+            dtype=np.float32,
+        )
+        centroids = spherical_kmeans(
+            vectors=sample, clusters=nlist, iterations=iterations, seed=seed
+        )
+
+        lists = assign_lists(embeddings=embeddings, centroids=centroids)
+        rows = np.argsort(lists, kind="stable")
+        offsets = np.zeros(nlist + 1, dtype=np.int64)
+        np.cumsum(np.bincount(lists, minlength=nlist), out=offsets[1:])
+        logging.info(
+            f"[IVFIndex] Built {nlist} lists over {total} embeddings, largest list {int(np.diff(offsets).max())} rows."
+        )
+        index = cls(centroids=centroids, rows=rows, offsets=offsets)
+        return index.quantize(
+            embeddings=embeddings,
+            quantizer=train_quantizer(
+                mode=quantization, sample=sample, subspaces=pq_subspaces
+            ),
+        )
+
+    def quantize(
+        self, embeddings: np.ndarray, quantizer: Quantizer | None
+    ) -> "IVFIndex":
+        """
+        The function `quantize` returns an index with the same lists that ranks candidates on the
+        codes of `quantizer`, or on the `float32` vectors when `quantizer` is `None`.
+        """
+        codes = None
+        if quantizer is not None:
+            codes = encode_rows(quantizer=quantizer, embeddings=embeddings)[self.rows]
+            logging.info(
+                f"[IVFIndex] Encoded {codes.shape[0]} embeddings in {codes.shape[1]} bytes each."
+            )
+        return IVFIndex(
+            centroids=self.centroids,
+            rows=self.rows,
+            offsets=self.offsets,
+            quantizer=quantizer,
+            codes=codes,
+        )
+
+    def encode_delta(
+        self, embeddings: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray | None]:
+        """
+        The function `encode_delta` returns the lists and the codes of new embeddings, as stored in
+        a delta segment.
+        """
+        lists = assign_lists(embeddings=embeddings, centroids=self.centroids)
+        codes = None
+        if self.quantizer is not None:
+            codes = encode_rows(quantizer=self.quantizer, embeddings=embeddings)
+        return lists, codes
+
+    def candidates(
+        self, query: np.ndarray, nprobe: int
+    ) -> tuple[np.ndarray, np.ndarray | None]:
+        """
+        The function `candidates` returns the live rows of the `nprobe` lists closest to `query`,
+        delta segment included, with their codes when the index is quantized.
+        """
+        probes = top_k(self.centroids @ query, k=nprobe)
+        positions = np.concatenate(
+            [
+                np.arange(self.offsets[probe], self.offsets[probe + 1])
+                for probe in probes
+            ]
+        )
+        rows = self.rows[positions]
+        codes = self.codes[positions] if self.quantizer is not None else None
+        if self.delta_rows.shape[0]:
+            in_probes = np.isin(self.delta_lists, probes)
+            rows = np.concatenate([rows, self.delta_rows[in_probes]])
+            if codes is not None:
+                codes = np.concatenate([codes, self.delta_codes[in_probes]])
+
+        live = rows >= 0
+        return rows[live], codes[live] if codes is not None else None
+
+    def search(
+        self,
+        embeddings: np.ndarray,
+        query: np.ndarray,
+        k: int,
+        nprobe: int,
+        match: np.ndarray | None = None,
+        rescore: int = 100,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        The function `search` returns the `k` rows most similar to `query` among the probed lists.
+
+        :param embeddings: The `embeddings` parameter is the matrix the index was built on.
+        :type embeddings: np.ndarray
+        :param query: The `query` parameter is an L2 normalized `float32` vector.
+        :type query: np.ndarray
+        :param match: The `match` parameter is a boolean mask over the rows, candidates outside of
+        it are dropped before scoring.
+        :type match: np.ndarray | None
+        :param rescore: The `rescore` parameter is the number of candidates ranked on their codes
+        that are scored exactly, ignored without a quantizer.
+        :type rescore: int
+        :return: A tuple of the rows and their cosine similarities, best first.
+        """
+        query = np.asarray(query, dtype=np.float32)
+        rows, codes = self.candidates(query=query, nprobe=nprobe)
+        if match is not None:
+            keep = match[rows]
+            rows = rows[keep]
+            codes = codes[keep] if codes is not None else None
+        if codes is not None:
+            shortlist = top_k(
+                self.quantizer.score(codes=codes, query=query), k=max(k, rescore)
+            )
+            rows = rows[shortlist]
+
+        # Sorted rows read the memory map sequentially.
+        rows = np.sort(rows)
+        scores = np.take(embeddings, rows, axis=0) @ query
+        best = top_k(scores, k=k)
+        return rows[best], scores[best]
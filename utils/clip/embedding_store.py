@@ -0,0 +1,305 @@
+import os
+import json
+import time
+import shutil
+import numpy as np
+from pathlib import Path
+from utils.logger import logging
+from utils.clip.versioned_directory import (
+    current_version,
+    prune_versions,
+    publish_version,
+    read_meta,
+    version_stamp,
+    write_directory,
+)
+
+COPY_ROWS = 65536
+SEGMENT_PREFIX = "seg-"
+
+
+class SegmentRows:
+    """Selected rows of the embeddings of several segments, gathered on access instead of being
+    concatenated in memory."""
+
+    def __init__(self, arrays: list[np.ndarray], rows: np.ndarray) -> None:
+        self.arrays = arrays
+        self.offsets = np.cumsum([0] + [array.shape[0] for array in arrays])
+        self.rows = rows
+        self.shape = (rows.shape[0], arrays[0].shape[1])
+
+    def __getitem__(self, index: np.ndarray) -> np.ndarray:
+        rows = self.rows[index]
+        segments = np.searchsorted(self.offsets, rows, side="right") - 1
+        chunk = np.empty((rows.shape[0], self.shape[1]), dtype=np.float32)
+        for segment in np.unique(segments):
+            selected = segments == segment
+            chunk[selected] = self.arrays[segment][
+                rows[selected] - self.offsets[segment]
+            ]
+        return chunk
+
+
+class EmbeddingStore:
+    """On-disk image embeddings keyed by `ImageTag.id`.
+
+    Every update writes a version directory `v{time_ns}` holding `ids.npy` (sorted `int64` ids),
+    `signatures.npy` (the `mtime_ns` and `size` of every embedded file), `embeddings.npy`, a
+    `float32` matrix, row `i` being the embedding of `ids[i]`, and `meta.json`, which records the
+    encoder and the `version`. The `CURRENT` file names the live version and is replaced
+    atomically, so readers always load a consistent set of arrays. All three are memory-mapped on
+    load, so processes reading the same store share its pages. The store is emptied when the encoder
+    changes since embeddings of different models cannot be compared.
+
+    Long runs `append` their checkpoints as delta segments `seg-{time_ns}`, which only hold the rows
+    of the checkpoint and stay invisible to readers, and `compact` publishes them as one version.
+    """
+
+    def __init__(self, directory: str | Path, model_name: str) -> None:
+        self.directory = Path(directory)
+        self.model_name = model_name
+        self.ids = np.empty(0, dtype=np.int64)
+        self.signatures = np.empty((0, 2), dtype=np.int64)
+        self.embeddings = np.empty((0, 0), dtype=np.float32)
+        self.version = 0
+
+        os.makedirs(name=self.directory, exist_ok=True)
+        self._load()
+
+    def __len__(self) -> int:
+        return self.ids.shape[0]
+
+    def _load(self) -> None:
+        # A version pruned between reading `CURRENT` and opening it is retried once.
+        for attempt in range(2):
+            name = current_version(root=self.directory)
+            if name is None:
+                # Stores written before versioning keep their files in the store directory.
+                if not os.path.exists(self.directory / "meta.json"):
+                    return
+                data_directory = self.directory
+            else:
+                data_directory = self.directory / name
+            try:
+                self._load_version(directory=data_directory)
+                return
+            except FileNotFoundError:
+                if attempt:
+                    raise
+
+    def _load_version(self, directory: Path) -> None:
+        meta = read_meta(directory)
+        if meta.get("model_name") != self.model_name:
+            logging.warning(
+                f"[EmbeddingStore] Encoder changed from {meta.get('model_name')} to {self.model_name}, starting with an empty store."
+            )
+            return
+
+        self.version = meta.get("version", 0)
+        self.ids = np.load(directory / "ids.npy", mmap_mode="r")
+        self.signatures = np.load(directory / "signatures.npy", mmap_mode="r")
+        self.embeddings = np.load(directory / "embeddings.npy", mmap_mode="r")
+
+    @property
+    def dimension(self) -> int:
+        return self.embeddings.shape[1]
+
+    def positions(self, image_ids: np.ndarray) -> np.ndarray:
+        """
+        The function `positions` returns the row of every id in the store, `-1` for unknown ids.
+
+        :param image_ids: The `image_ids` parameter is an array of `ImageTag.id` values.
+        :type image_ids: np.ndarray
+        :return: An `int64` array aligned with `image_ids`.
+        """
+        image_ids = np.asarray(image_ids, dtype=np.int64)
+        if not len(self):
+            return np.full(image_ids.shape, -1, dtype=np.int64)
+        rows = np.minimum(np.searchsorted(self.ids, image_ids), len(self) - 1)
+        return np.where(self.ids[rows] == image_ids, rows, -1)
+
+    def get(self, image_ids: list[int]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        The function `get` returns the stored embeddings of `image_ids`.
+
+        :return: A tuple of the ids found in the store and their embeddings.
+        """
+        image_ids = np.asarray(image_ids, dtype=np.int64)
+        rows = self.positions(image_ids=image_ids)
+        found = rows >= 0
+        return image_ids[found], np.asarray(self.embeddings[rows[found]])
+
+    def stale(self, image_ids: np.ndarray, signatures: np.ndarray) -> np.ndarray:
+        """
+        The function `stale` returns a mask of the ids that are missing from the store or whose file
+        changed since it was embedded.
+
+        :param signatures: The `signatures` parameter holds the current `mtime_ns` and `size` of
+        every file, aligned with `image_ids`.
+        :type signatures: np.ndarray
+        """
+        rows = self.positions(image_ids=image_ids)
+        stale = rows < 0
+        known = ~stale
+        stale[known] = np.any(self.signatures[rows[known]] != signatures[known], axis=1)
+        return stale
+
+    def update(
+        self,
+        image_ids: np.ndarray,
+        signatures: np.ndarray,
+        embeddings: np.ndarray | SegmentRows,
+        removed_ids: np.ndarray | None = None,
+    ) -> None:
+        """
+        The function `update` inserts or replaces the embeddings of `image_ids`, drops
+        `removed_ids` and publishes the result as a new version of the store. Existing rows are
+        copied in chunks, so the store is never fully loaded in memory.
+
+        :param image_ids: The `image_ids` parameter is an array of `ImageTag.id` values.
+        :type image_ids: np.ndarray
+        :param signatures: The `signatures` parameter is the `(mtime_ns, size)` of every file.
+        :type signatures: np.ndarray
+        :param embeddings: The `embeddings` parameter is a `float32` matrix aligned with `image_ids`.
+        :type embeddings: np.ndarray | SegmentRows
+        :param removed_ids: The `removed_ids` parameter lists the ids to delete from the store.
+        :type removed_ids: np.ndarray | None
+        """
+        image_ids = np.asarray(image_ids, dtype=np.int64)
+        dropped = np.concatenate(
+            [image_ids, np.asarray(removed_ids if removed_ids is not None else [])]
+        ).astype(np.int64)
+        kept = ~np.isin(self.ids, dropped)
+
+        ids = np.concatenate([self.ids[kept], image_ids])
+        order = np.argsort(ids, kind="stable")
+        all_signatures = np.concatenate(
+            [self.signatures[kept], np.asarray(signatures, dtype=np.int64)]
+        )
+        dimension = embeddings.shape[1] if len(image_ids) else self.dimension
+
+        version = time.time_ns()
+        name = f"v{version}"
+        tmp_directory = self.directory / f"tmp-{name}"
+        os.makedirs(tmp_directory)
+        matrix = np.lib.format.open_memmap(
+            tmp_directory / "embeddings.npy",
+            mode="w+",
+            dtype=np.float32,
+            shape=(ids.shape[0], dimension),
+        )
+        kept_rows = np.flatnonzero(kept)
+        for start in range(0, ids.shape[0], COPY_ROWS):
+            # Sources of the rows of this output chunk, from the old store or the new embeddings.
+            sources = order[start : start + COPY_ROWS]
+            from_store = sources < kept_rows.shape[0]
+            chunk = np.empty((sources.shape[0], dimension), dtype=np.float32)
+            if from_store.any():
+                chunk[from_store] = self.embeddings[kept_rows[sources[from_store]]]
+            if not from_store.all():
+                chunk[~from_store] = embeddings[
+                    sources[~from_store] - kept_rows.shape[0]
+                ]
+            matrix[start : start + sources.shape[0]] = chunk
+        matrix.flush()
+        del matrix
+
+        np.save(tmp_directory / "ids.npy", ids[order])
+        np.save(tmp_directory / "signatures.npy", all_signatures[order])
+        with open(tmp_directory / "meta.json", mode="w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "model_name": self.model_name,
+                    "dimension": dimension,
+                    "count": int(ids.shape[0]),
+                    "version": version,
+                },
+                file,
+            )
+        os.replace(tmp_directory, self.directory / name)
+
+        previous = current_version(root=self.directory)
+        publish_version(root=self.directory, name=name)
+        prune_versions(
+            root=self.directory,
+            kept={name} if previous is None else {name, previous},
+            prefixes=("v",),
+        )
+        if previous is None:
+            for legacy in ("meta.json", "ids.npy", "signatures.npy", "embeddings.npy"):
+                (self.directory / legacy).unlink(missing_ok=True)
+        self._load()
+
+    def append(
+        self,
+        image_ids: np.ndarray,
+        signatures: np.ndarray,
+        embeddings: np.ndarray,
+        removed_ids: np.ndarray | None = None,
+    ) -> None:
+        """
+        The function `append` saves a checkpoint as a delta segment, writing its own rows only. The
+        segment is not visible to readers until `compact` publishes it, takes the same parameters
+        as `update`.
+        """
+        write_directory(
+            root=self.directory,
+            name=f"{SEGMENT_PREFIX}{time.time_ns()}",
+            arrays={
+                "ids": np.asarray(image_ids, dtype=np.int64),
+                "signatures": np.asarray(signatures, dtype=np.int64).reshape(-1, 2),
+                "embeddings": np.asarray(embeddings, dtype=np.float32),
+                "removed_ids": np.asarray(
+                    removed_ids if removed_ids is not None else [], dtype=np.int64
+                ),
+            },
+            meta={"model_name": self.model_name},
+        )
+
+    def segments(self) -> list[Path]:
+        return sorted(
+            (
+                path
+                for path in self.directory.iterdir()
+                if path.is_dir() and path.name.startswith(SEGMENT_PREFIX)
+            ),
+            key=lambda path: version_stamp(path.name),
+        )
+
+    def compact(self) -> int:
+        """
+        The function `compact` publishes every delta segment as a single new version, the newest
+        segment winning for an id embedded twice, and deletes them. Segments of another encoder are
+        dropped.
+
+        :return: The number of segments published.
+        """
+        segments = self.segments()
+        valid = [
+            segment
+            for segment in segments
+            if read_meta(segment).get("model_name") == self.model_name
+        ]
+        if valid:
+            ids = np.concatenate([np.load(segment / "ids.npy") for segment in valid])
+            _, last = np.unique(ids[::-1], return_index=True)
+            rows = np.sort(ids.shape[0] - 1 - last)
+            self.update(
+                image_ids=ids[rows],
+                signatures=np.concatenate(
+                    [np.load(segment / "signatures.npy") for segment in valid]
+                )[rows],
+                embeddings=SegmentRows(
+                    arrays=[
+                        np.load(segment / "embeddings.npy", mmap_mode="r")
+                        for segment in valid
+                    ],
+                    rows=rows,
+                ),
+                removed_ids=np.concatenate(
+                    [np.load(segment / "removed_ids.npy") for segment in valid]
+                ),
+            )
+        for segment in segments:
+            shutil.rmtree(segment, ignore_errors=True)
+        return len(valid)
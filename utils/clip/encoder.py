@@ -0,0 +1,48 @@
+import torch
+import numpy as np
+from PIL import Image
+from functools import lru_cache
+from src.secret import Config
+from utils.logger import logging
+from sentence_transformers import SentenceTransformer
+
+config = Config()
+
+
+class ClipEncoder:
+    """Image and text towers of a sentence-transformers CLIP model.
+
+    Both towers project into the same space and return L2 normalized `float32` vectors, so the
+    cosine similarity of two embeddings is their dot product.
+    """
+
+    def __init__(self, model_name: str = config.CLIP_MODEL_NAME) -> None:
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name_or_path=model_name, device=device)
+        # Also warms the text tower up, the first real query does not pay for it.
+        self.dimension = self.encode_texts(texts=[""]).shape[1]
+        logging.info(
+            f"[ClipEncoder] Loaded {model_name} on {device}, {self.dimension} dimensions."
+        )
+
+    def encode_images(
+        self, images: list[Image.Image], batch_size: int = config.CLIP_BATCH_SIZE
+    ) -> np.ndarray:
+        return self.model.encode(
+            images,
+            batch_size=batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+        ).astype(np.float32)
+
+    def encode_texts(self, texts: list[str]) -> np.ndarray:
+        return self.model.encode(
+            texts, convert_to_numpy=True, normalize_embeddings=True
+        ).astype(np.float32)
+
+
+@lru_cache(maxsize=1)
+def clip_encoder() -> ClipEncoder:
+    """The function `clip_encoder` returns the process wide `ClipEncoder`, loaded on first use."""
+    return ClipEncoder()
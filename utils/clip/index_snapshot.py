@@ -0,0 +1,346 @@
+import os
+import time
+import numpy as np
+from pathlib import Path
+from src.secret import Config
+from utils.logger import logging
+from utils.clip.ann_index import IVFIndex
+from utils.clip.embedding_store import EmbeddingStore
+from utils.clip.quantization import ProductQuantizer, Quantizer, ScalarQuantizer
+from utils.clip.versioned_directory import (
+    current_version,
+    prune_versions,
+    publish_version,
+    read_meta,
+    write_directory,
+)
+
+config = Config()
+
+SNAPSHOT_DIR = "index"
+
+
+def quantizer_arrays(quantizer: Quantizer | None) -> tuple[str, dict[str, np.ndarray]]:
+    """The function `quantizer_arrays` returns the quantization mode and the arrays of `quantizer`."""
+    if isinstance(quantizer, ScalarQuantizer):
+        return "int8", {
+            "quantizer_low": quantizer.low,
+            "quantizer_scale": quantizer.scale,
+        }
+    if isinstance(quantizer, ProductQuantizer):
+        return "pq", {"quantizer_centroids": quantizer.centroids}
+    return "none", {}
+
+
+def load_quantizer(mode: str, directory: Path) -> Quantizer | None:
+    if mode == "int8":
+        return ScalarQuantizer(
+            low=np.load(directory / "quantizer_low.npy"),
+            scale=np.load(directory / "quantizer_scale.npy"),
+        )
+    if mode == "pq":
+        return ProductQuantizer(
+            centroids=np.load(directory / "quantizer_centroids.npy", mmap_mode="r")
+        )
+    return None
+
+
+class IndexSnapshot:
+    """Versioned on-disk copy of an `IVFIndex`.
+
+    A snapshot is a base, written when the index is built (centroids, lists, codes and quantizer,
+    with the id and file signature of every row), and a segment pointing at the base. The segment
+    maps the base entries to the rows of the current embedding store, `-1` for deleted or changed
+    images, and holds the delta of images embedded since the base was built. An update of the store
+    only writes a new segment, a compaction rebuilds the base once the delta grows too large.
+
+    `CURRENT` names the live segment and is replaced atomically. Every array is loaded as a memory
+    map, so startup reads a few headers and the uvicorn workers share the pages of one snapshot.
+    """
+
+    def __init__(
+        self,
+        index: IVFIndex,
+        ids: np.ndarray,
+        signatures: np.ndarray,
+        delta_ids: np.ndarray,
+        delta_signatures: np.ndarray,
+        store_version: int,
+        base: str | None = None,
+    ) -> None:
+        self.index = index
+        # Id and file signature of every base entry in list order, then of every delta entry.
+        self.ids = ids
+        self.signatures = signatures
+        self.delta_ids = delta_ids
+        self.delta_signatures = delta_signatures
+        self.store_version = store_version
+        self.base = base
+
+    @property
+    def outdated(self) -> int:
+        """The function `outdated` returns the number of deleted base entries and delta entries."""
+        return int((self.index.rows < 0).sum()) + self.delta_ids.shape[0]
+
+    @classmethod
+    def build(cls, store: EmbeddingStore) -> "IndexSnapshot":
+        """The function `build` indexes every row of `store` from scratch."""
+        index = IVFIndex.build(
+            embeddings=store.embeddings,
+            nlist=config.ANN_NLIST,
+            train_sample=config.ANN_TRAIN_SAMPLE,
+            quantization=config.ANN_QUANTIZATION,
+            pq_subspaces=config.ANN_PQ_SUBSPACES,
+        )
+        return cls(
+            index=index,
+            ids=np.asarray(store.ids[index.rows]),
+            signatures=np.asarray(store.signatures[index.rows]),
+            delta_ids=np.empty(0, dtype=np.int64),
+            delta_signatures=np.empty((0, 2), dtype=np.int64),
+            store_version=store.version,
+        )
+
+    @classmethod
+    def load(cls, root: Path, name: str) -> "IndexSnapshot":
+        """The function `load` memory maps the segment `name` and its base."""
+        segment = root / name
+        segment_meta = read_meta(segment)
+        base = root / segment_meta["base"]
+        base_meta = read_meta(base)
+
+        def mapped(directory: Path, array_name: str) -> np.ndarray:
+            return np.load(directory / f"{array_name}.npy", mmap_mode="r")
+
+        quantizer = load_quantizer(mode=base_meta["quantization"], directory=base)
+        index = IVFIndex(
+            centroids=mapped(base, "centroids"),
+            rows=mapped(segment, "rows"),
+            offsets=mapped(base, "offsets"),
+            quantizer=quantizer,
+            codes=mapped(base, "codes") if quantizer is not None else None,
+            delta_rows=mapped(segment, "delta_rows"),
+            delta_lists=mapped(segment, "delta_lists"),
+            delta_codes=mapped(segment, "delta_codes")
+            if quantizer is not None
+            else None,
+        )
+        return cls(
+            index=index,
+            ids=mapped(base, "ids"),
+            signatures=mapped(base, "signatures"),
+            delta_ids=mapped(segment, "delta_ids"),
+            delta_signatures=mapped(segment, "delta_signatures"),
+            store_version=segment_meta["store_version"],
+            base=segment_meta["base"],
+        )
+
+    def save(self, root: Path, model_name: str) -> str:
+        """
+        The function `save` writes the snapshot, its base too when it is new, and makes it current.
+
+        :return: The name of the new segment.
+        """
+        os.makedirs(root, exist_ok=True)
+        stamp = time.time_ns()
+        index = self.index
+        if self.base is None:
+            mode, arrays = quantizer_arrays(quantizer=index.quantizer)
+            if index.codes is not None:
+                arrays["codes"] = index.codes
+            self.base = f"base-{stamp}"
+            write_directory(
+                root=root,
+                name=self.base,
+                arrays={
+                    "centroids": index.centroids,
+                    "offsets": index.offsets,
+                    "ids": self.ids,
+                    "signatures": self.signatures,
+                    **arrays,
+                },
+                meta={
+                    "model_name": model_name,
+                    "quantization": mode,
+                    "nlist": index.nlist,
+                    "count": int(self.ids.shape[0]),
+                },
+            )
+
+        name = f"v{stamp}"
+        write_directory(
+            root=root,
+            name=name,
+            arrays={
+                "rows": index.rows,
+                "delta_ids": self.delta_ids,
+                "delta_signatures": self.delta_signatures,
+                "delta_rows": index.delta_rows,
+                "delta_lists": index.delta_lists,
+                "delta_codes": index.delta_codes
+                if index.delta_codes is not None
+                else np.empty((0, 0), dtype=np.uint8),
+            },
+            meta={"base": self.base, "store_version": self.store_version},
+        )
+        publish_snapshot(root=root, name=name)
+        return name
+
+    def updated(self, store: EmbeddingStore) -> "IndexSnapshot":
+        """
+        The function `updated` returns the snapshot of the current `store`. Entries whose image was
+        deleted or changed are marked `-1`, images missing from the snapshot are assigned to the
+        closest lists of the base and appended to the delta.
+        """
+        index = self.index
+        base_count = self.ids.shape[0]
+        previous = np.concatenate([index.rows, index.delta_rows])
+        signatures = np.concatenate([self.signatures, self.delta_signatures])
+        rows = store.positions(image_ids=np.concatenate([self.ids, self.delta_ids]))
+        live = (previous >= 0) & (rows >= 0)
+        live[live] = np.all(store.signatures[rows[live]] == signatures[live], axis=1)
+        rows = np.where(live, rows, -1)
+
+        covered = np.zeros(len(store), dtype=bool)
+        covered[rows[live]] = True
+        added = np.flatnonzero(~covered)
+        lists, codes = index.encode_delta(
+            embeddings=np.take(store.embeddings, added, axis=0)
+        )
+
+        kept = live[base_count:]
+        delta_codes = None
+        if index.quantizer is not None:
+            delta_codes = np.concatenate([index.delta_codes[kept], codes])
+        return IndexSnapshot(
+            index=IVFIndex(
+                centroids=index.centroids,
+                rows=rows[:base_count],
+                offsets=index.offsets,
+                quantizer=index.quantizer,
+                codes=index.codes,
+                delta_rows=np.concatenate([rows[base_count:][kept], added]),
+                delta_lists=np.concatenate([index.delta_lists[kept], lists]),
+                delta_codes=delta_codes,
+            ),
+            ids=self.ids,
+            signatures=self.signatures,
+            delta_ids=np.concatenate([self.delta_ids[kept], store.ids[added]]),
+            delta_signatures=np.concatenate(
+                [self.delta_signatures[kept], store.signatures[added]]
+            ),
+            store_version=store.version,
+            base=self.base,
+        )
+
+
+def snapshot_root(directory: str | Path) -> Path:
+    return Path(directory) / SNAPSHOT_DIR
+
+
+def current_snapshot(root: Path) -> str | None:
+    """The function `current_snapshot` returns the name of the live segment, if any."""
+    return current_version(root=root)
+
+
+def publish_snapshot(root: Path, name: str) -> None:
+    """
+    The function `publish_snapshot` points `CURRENT` at the segment `name` and deletes the older
+    snapshots, except the previous one that workers may still be loading.
+    """
+    previous = current_snapshot(root=root)
+    publish_version(root=root, name=name)
+
+    kept = {name}
+    for segment in (name, previous):
+        if segment is not None and (root / segment).is_dir():
+            kept |= {segment, read_meta(root / segment)["base"]}
+    prune_versions(root=root, kept=kept, prefixes=("v", "base-"))
+
+
+def load_index_snapshot(store: EmbeddingStore) -> IVFIndex | None:
+    """
+    The function `load_index_snapshot` returns the saved index of `store`, memory-mapped. A snapshot
+    older than the store is brought up to date in memory until the next refresh saves it.
+
+    :return: The index, `None` when no usable snapshot exists.
+    """
+    root = snapshot_root(directory=store.directory)
+    name = current_snapshot(root=root)
+    if name is None:
+        return None
+    try:
+        snapshot = IndexSnapshot.load(root=root, name=name)
+        if read_meta(root / snapshot.base)["model_name"] != store.model_name:
+            return None
+    except (OSError, ValueError, KeyError) as e:
+        logging.warning(f"[load_index_snapshot] Ignoring snapshot {name}: {e}")
+        return None
+
+    if snapshot.store_version != store.version:
+        logging.warning(
+            f"[load_index_snapshot] Snapshot {name} is older than the embedding store, updating it in memory."
+        )
+        snapshot = snapshot.updated(store=store)
+    return snapshot.index
+
+
+def refresh_index_snapshot(store: EmbeddingStore | None = None) -> dict:
+    """
+    The function `refresh_index_snapshot` brings the saved index up to date with the embedding
+    store, appending a delta segment or compacting the snapshot into a new base when the deleted and
+    delta entries exceed `ANN_DELTA_MAX_FRACTION` of the store or the quantization settings changed.
+    Runs in the Celery worker after indexing, the API workers reload the new snapshot.
+
+    :param store: The `store` parameter is the embedding store, the configured one when `None`.
+    :type store: EmbeddingStore | None
+    :return: The "snapshot" name and the "action" taken, "exact", "unchanged", "delta" or "compact".
+    """
+    store = (
+        store
+        if store is not None
+        else EmbeddingStore(
+            directory=config.EMBEDDING_STORE_DIR, model_name=config.CLIP_MODEL_NAME
+        )
+    )
+    root = snapshot_root(directory=store.directory)
+    if len(store) <= config.ANN_EXACT_THRESHOLD:
+        return {"snapshot": None, "action": "exact"}
+
+    snapshot = None
+    name = current_snapshot(root=root)
+    if name is not None:
+        try:
+            snapshot = IndexSnapshot.load(root=root, name=name)
+            base_meta = read_meta(root / snapshot.base)
+            quantizer = snapshot.index.quantizer
+            if (
+                base_meta["model_name"] != store.model_name
+                or base_meta["quantization"] != config.ANN_QUANTIZATION
+                or (
+                    isinstance(quantizer, ProductQuantizer)
+                    and quantizer.code_size != config.ANN_PQ_SUBSPACES
+                )
+            ):
+                snapshot = None
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"[refresh_index_snapshot] Rebuilding snapshot {name}: {e}")
+            snapshot = None
+
+    if snapshot is not None and snapshot.store_version == store.version:
+        return {"snapshot": name, "action": "unchanged"}
+
+    action = "delta"
+    if snapshot is not None:
+        snapshot = snapshot.updated(store=store)
+    if snapshot is None or snapshot.outdated > config.ANN_DELTA_MAX_FRACTION * len(
+        store
+    ):
+        action = "compact"
+        snapshot = IndexSnapshot.build(store=store)
+
+    name = snapshot.save(root=root, model_name=store.model_name)
+    logging.info(
+        f"[refresh_index_snapshot] Saved snapshot {name} ({action}), {snapshot.outdated} outdated entries."
+    )
+    return {"snapshot": name, "action": action}
@@ -0,0 +1,229 @@
+import os
+import time
+import numpy as np
+from PIL import Image
+from collections import deque
+from typing import BinaryIO, Callable, Iterator
+from src.secret import Config
+from utils.logger import logging
+from utils.helper import parallel_executor
+from utils.clip.encoder import ClipEncoder, clip_encoder
+from utils.clip.embedding_store import EmbeddingStore
+from utils.dedup.perceptual_hash import perceptual_hash
+from utils.query.image_tag import (
+    extract_all_image_tag_filepaths,
+    update_perceptual_hashes,
+)
+
+config = Config()
+
+CLIP_IMAGE_SIZE = 224
+
+
+def load_clip_image(filepath: str | BinaryIO) -> np.ndarray:
+    """
+    The function `load_clip_image` decodes an image with its shortest side shrunk to
+    `CLIP_IMAGE_SIZE`, the resolution the CLIP processor resizes to anyway. JPEG files are decoded
+    at a reduced resolution through `Image.draft`.
+
+    :param filepath: The `filepath` parameter is the absolute path of the image on the mounted NAS,
+    or a file object holding an uploaded image.
+    :type filepath: str | BinaryIO
+    :return: A `uint8` RGB array.
+    """
+    with Image.open(filepath) as img:
+        img.draft("RGB", (CLIP_IMAGE_SIZE, CLIP_IMAGE_SIZE))
+        img = img.convert("RGB")
+        scale = CLIP_IMAGE_SIZE / min(img.size)
+        if scale < 1:
+            size = (round(img.width * scale), round(img.height * scale))
+            img = img.resize(size, resample=Image.Resampling.BICUBIC)
+        return np.array(img)
+
+
+def safe_load_clip_image(filepath: str) -> np.ndarray | None:
+    try:
+        return load_clip_image(filepath=filepath)
+    except Exception as e:
+        logging.error(f"[safe_load_clip_image] Skipping corrupt image {filepath}: {e}")
+    return None
+
+
+def bounded_decode(
+    filepaths: list[str], max_workers: int | None = None, max_pending: int = 256
+) -> Iterator[tuple[str, np.ndarray | None]]:
+    """
+    The function `bounded_decode` decodes images on a process pool, a thread pool in daemonic
+    processes such as Celery workers, and yields them in order, with at most `max_pending` images in
+    flight, so memory stays flat when encoding is the bottleneck.
+
+    :param filepaths: The `filepaths` parameter is the list of image paths to decode.
+    :type filepaths: list[str]
+    :param max_pending: The `max_pending` parameter bounds the submitted but not consumed images.
+    :type max_pending: int
+    :return: An iterator of `(filepath, image)` tuples, `image` is `None` for unreadable files.
+    """
+    if not filepaths:
+        return
+
+    with parallel_executor(max_workers=max_workers or os.cpu_count() or 1) as executor:
+        pending = deque()
+        for filepath in filepaths:
+            pending.append((filepath, executor.submit(safe_load_clip_image, filepath)))
+            if len(pending) >= max_pending:
+                filepath, future = pending.popleft()
+                yield filepath, future.result()
+        while pending:
+            filepath, future = pending.popleft()
+            yield filepath, future.result()
+
+
+def file_signatures(entries: list[dict]) -> tuple[list[dict], np.ndarray]:
+    """
+    The function `file_signatures` returns the entries whose file exists together with their
+    `(mtime_ns, size)` signatures.
+    """
+    existing, signatures = [], []
+    for entry in entries:
+        try:
+            stat = os.stat(entry["filepath"])
+        except OSError:
+            continue
+        existing.append(entry)
+        signatures.append((stat.st_mtime_ns, stat.st_size))
+    return existing, np.asarray(signatures, dtype=np.int64).reshape(-1, 2)
+
+
+def index_image_embeddings(
+    entries: list[dict] | None = None,
+    encoder: ClipEncoder | None = None,
+    store: EmbeddingStore | None = None,
+    on_progress: Callable[[dict], None] | None = None,
+    hash_writer: Callable[[dict[int, int]], None] = update_perceptual_hashes,
+) -> dict:
+    """
+    The function `index_image_embeddings` embeds every `ImageTag` image with the CLIP image tower
+    into the `EmbeddingStore`. Only images that are new or whose file changed since the previous
+    run are decoded and encoded, entries that no longer exist are dropped from the store. Every
+    `CLIP_CHECKPOINT_IMAGES` images are appended to the store as a delta segment, published with
+    the others as one version at the end of the run, or at the start of the next one when the run
+    is interrupted.
+    The perceptual hash of every decoded image is computed from the same pixels and written to
+    `ImageTag.phash`, images without a hash yet are decoded for their hash only.
+
+    :param entries: The `entries` parameter is a list of dictionaries with the "id", "filepath" and
+    optionally the current "phash" of the images, every `ImageTag` entry when omitted.
+    :type entries: list[dict] | None
+    :param on_progress: The `on_progress` parameter is called with the progress after every
+    checkpoint and once the store is published.
+    :type on_progress: Callable[[dict], None] | None
+    :param hash_writer: The `hash_writer` parameter saves a batch of hashes keyed by id.
+    :type hash_writer: Callable[[dict[int, int]], None]
+    :return: The final progress of the run.
+    """
+    entries = entries if entries is not None else extract_all_image_tag_filepaths()
+    encoder = encoder or clip_encoder()
+    store = (
+        store
+        if store is not None
+        else EmbeddingStore(
+            directory=config.EMBEDDING_STORE_DIR, model_name=encoder.model_name
+        )
+    )
+
+    if store.compact():
+        logging.info(
+            "[index_image_embeddings] Published the checkpoints of the previous run."
+        )
+
+    existing, signatures = file_signatures(entries=entries)
+    image_ids = np.asarray([entry["id"] for entry in existing], dtype=np.int64)
+    stale = store.stale(image_ids=image_ids, signatures=signatures)
+    removed_ids = store.ids[~np.isin(store.ids, image_ids)]
+
+    todo = [
+        entry
+        for entry, is_stale in zip(existing, stale)
+        if is_stale or entry.get("phash") is None
+    ]
+    todo_signatures = dict(zip(image_ids[stale].tolist(), signatures[stale]))
+    progress = {
+        "total_image": len(entries),
+        "stored_image": len(store),
+        "to_embed": int(stale.sum()),
+        "embedded_image": 0,
+        "hashed_image": 0,
+        "skipped_image": len(entries) - len(existing),
+        "removed_image": int(removed_ids.shape[0]),
+        "images_per_sec": 0.0,
+    }
+    logging.info(f"[index_image_embeddings] {progress}")
+
+    started_at = time.perf_counter()
+    batch_ids, batch = [], []
+    done_ids, done_embeddings = [], []
+    done_hashes = {}
+
+    def encode_batch() -> None:
+        done_embeddings.append(encoder.encode_images(images=batch))
+        done_ids.extend(batch_ids)
+        batch_ids.clear()
+        batch.clear()
+
+    def checkpoint(final: bool = False) -> None:
+        nonlocal removed_ids
+        if done_hashes:
+            hash_writer(done_hashes)
+            progress["hashed_image"] += len(done_hashes)
+            done_hashes.clear()
+        if done_ids or removed_ids.shape[0]:
+            store.append(
+                image_ids=np.asarray(done_ids, dtype=np.int64),
+                signatures=np.asarray(
+                    [todo_signatures[image_id] for image_id in done_ids],
+                    dtype=np.int64,
+                ).reshape(-1, 2),
+                embeddings=np.concatenate(done_embeddings)
+                if done_embeddings
+                else np.empty((0, store.dimension), dtype=np.float32),
+                removed_ids=removed_ids,
+            )
+            progress["embedded_image"] += len(done_ids)
+            progress["images_per_sec"] = round(
+                progress["embedded_image"] / (time.perf_counter() - started_at), 2
+            )
+            removed_ids = removed_ids[:0]
+            done_ids.clear()
+            done_embeddings.clear()
+        elif not final:
+            return
+        if final:
+            store.compact()
+            progress["stored_image"] = len(store)
+        logging.info(f"[index_image_embeddings] {progress}")
+        if on_progress is not None:
+            on_progress(progress)
+
+    filepath_ids = {entry["filepath"]: entry["id"] for entry in todo}
+    for filepath, image in bounded_decode(
+        filepaths=list(filepath_ids),
+        max_workers=config.IMAGE_DECODE_WORKERS,
+        max_pending=config.CLIP_MAX_PENDING_IMAGES,
+    ):
+        if image is None:
+            progress["skipped_image"] += 1
+            continue
+        image_id = filepath_ids[filepath]
+        done_hashes[image_id] = perceptual_hash(image=image)
+        if image_id in todo_signatures:
+            batch_ids.append(image_id)
+            batch.append(Image.fromarray(image))
+        if len(batch) == config.CLIP_BATCH_SIZE:
+            encode_batch()
+        if max(len(done_ids), len(done_hashes)) >= config.CLIP_CHECKPOINT_IMAGES:
+            checkpoint()
+    if batch:
+        encode_batch()
+    checkpoint(final=True)
+
+    return progress
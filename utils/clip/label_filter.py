@@ -0,0 +1,70 @@
+import numpy as np
+from typing import NamedTuple
+from services.postgres.models import LABEL_COLUMNS, label_bitmask
+from utils.custom_errors import InvalidRequestError
+
+# Set on the rows of the embedding store without an `ImageTag` entry, always forbidden.
+MISSING_BIT = 1 << 62
+
+
+class LabelFilter(NamedTuple):
+    """Labels every result must have (`required`) and must not have (`forbidden`), as bitmasks."""
+
+    required: int
+    forbidden: int
+
+    def match(self, bitmasks: np.ndarray) -> np.ndarray:
+        """
+        The function `match` returns a mask of the bitmasks satisfying the filter, with two bitwise
+        operations over the whole array.
+        """
+        required = np.int64(self.required)
+        forbidden = np.int64(self.forbidden | MISSING_BIT)
+        return ((bitmasks & required) == required) & ((bitmasks & forbidden) == 0)
+
+
+def parse_label_filter(
+    labels: list[str] | None = None, exclude_labels: list[str] | None = None
+) -> LabelFilter | None:
+    """
+    The function `parse_label_filter` builds the filter of "`labels` AND NOT `exclude_labels`".
+
+    :param labels: The `labels` parameter lists the labels every result must have.
+    :type labels: list[str] | None
+    :param exclude_labels: The `exclude_labels` parameter lists the labels no result may have.
+    :type exclude_labels: list[str] | None
+    :return: The filter, `None` when no label is given.
+    """
+    labels, exclude_labels = labels or [], exclude_labels or []
+    unknown = sorted(set(labels + exclude_labels) - set(LABEL_COLUMNS))
+    if unknown:
+        raise InvalidRequestError(detail=f"Unknown labels: {', '.join(unknown)}.")
+    if not labels and not exclude_labels:
+        return None
+    return LabelFilter(
+        required=label_bitmask({label: True for label in labels}),
+        forbidden=label_bitmask({label: True for label in exclude_labels}),
+    )
+
+
+def align_bitmasks(
+    store_ids: np.ndarray, image_ids: np.ndarray, bitmasks: np.ndarray
+) -> np.ndarray:
+    """
+    The function `align_bitmasks` orders the bitmasks like the rows of the embedding store.
+
+    :param store_ids: The `store_ids` parameter is the sorted ids of the embedding store.
+    :type store_ids: np.ndarray
+    :param image_ids: The `image_ids` parameter is the sorted ids of the `ImageTag` entries.
+    :type image_ids: np.ndarray
+    :param bitmasks: The `bitmasks` parameter is the label bitmask of every `image_ids` entry.
+    :type bitmasks: np.ndarray
+    :return: An `int64` array aligned with `store_ids`, `MISSING_BIT` for ids without an entry.
+    """
+    aligned = np.full(store_ids.shape, MISSING_BIT, dtype=np.int64)
+    if not image_ids.shape[0]:
+        return aligned
+    rows = np.minimum(np.searchsorted(image_ids, store_ids), image_ids.shape[0] - 1)
+    found = image_ids[rows] == store_ids
+    aligned[found] = bitmasks[rows[found]]
+    return aligned
@@ -0,0 +1,172 @@
+import numpy as np
+from typing import Literal
+
+QuantizationMode = Literal["none", "int8", "pq"]
+
+# Rows encoded per chunk, bounds the `float32` temporaries of the encoders.
+ENCODE_ROWS = 16384
+# 64 training vectors per product quantization centroid are plenty for 256 centroids.
+PQ_TRAIN_ROWS = 256 * 64
+
+
+class ScalarQuantizer:
+    """`uint8` scalar quantization, one byte per dimension (4x smaller than `float32`).
+
+    Every dimension is mapped linearly from its `[low, high]` range on the training sample onto
+    `0..255`. A dot product with a query is then `codes @ (scale * query) + low @ query`.
+    """
+
+    def __init__(self, low: np.ndarray, scale: np.ndarray) -> None:
+        self.low = low
+        self.scale = scale
+
+    @classmethod
+    def train(cls, sample: np.ndarray) -> "ScalarQuantizer":
+        low, high = sample.min(axis=0), sample.max(axis=0)
+        scale = np.maximum(high - low, 1e-12) / 255
+        return cls(low=low.astype(np.float32), scale=scale.astype(np.float32))
+
+    @property
+    def code_size(self) -> int:
+        return self.low.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        return self.low.nbytes + self.scale.nbytes
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        codes = np.rint((np.asarray(vectors, dtype=np.float32) - self.low) / self.scale)
+        return np.clip(codes, 0, 255).astype(np.uint8)
+
+    def score(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """The function `score` returns the approximate dot products of the encoded vectors with `query`."""
+        return codes.astype(np.float32) @ (self.scale * query) + self.low @ query
+
+
+def kmeans(
+    vectors: np.ndarray, clusters: int, iterations: int, rng: np.random.Generator
+) -> np.ndarray:
+    """The function `kmeans` clusters `vectors` by euclidean distance and returns the centroids."""
+    centroids = vectors[
+        rng.choice(vectors.shape[0], size=clusters, replace=vectors.shape[0] < clusters)
+    ].copy()
+    for _ in range(iterations):
+        assignments = nearest_centroids(vectors=vectors, centroids=centroids)
+        counts = np.bincount(assignments, minlength=clusters)
+        filled = counts > 0
+        sums = np.stack(
+            [
+                np.bincount(assignments, weights=vectors[:, dim], minlength=clusters)
+                for dim in range(vectors.shape[1])
+            ],
+            axis=1,
+        )
+        centroids[filled] = sums[filled] / counts[filled, None]
+    return centroids
+
+
+def nearest_centroids(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    # |x - c|^2 = |x|^2 - 2 x.c + |c|^2, the first term does not change the argmin.
+    distances = (centroids**2).sum(axis=1) - 2 * (vectors @ centroids.T)
+    return np.argmin(distances, axis=1)
+
+
+class ProductQuantizer:
+    """Product quantization, one byte per subspace.
+
+    The vectors are split into `subspaces` slices, each slice is replaced by the index of its
+    closest centroid among 256 trained on that subspace. With 512 dimensions and 128 subspaces a
+    vector takes 128 bytes (16x smaller than `float32`). Queries are scored with a lookup table of
+    the dot products between the query slices and every centroid.
+    """
+
+    def __init__(self, centroids: np.ndarray) -> None:
+        # Shape (subspaces, 256, dimension / subspaces).
+        self.centroids = centroids
+
+    @classmethod
+    def train(
+        cls,
+        sample: np.ndarray,
+        subspaces: int,
+        iterations: int = 10,
+        seed: int = 0,
+    ) -> "ProductQuantizer":
+        if sample.shape[1] % subspaces:
+            raise ValueError(
+                f"{sample.shape[1]} dimensions cannot be split into {subspaces} subspaces."
+            )
+        rng = np.random.default_rng(seed=seed)
+        if sample.shape[0] > PQ_TRAIN_ROWS:
+            sample = sample[
+                rng.choice(sample.shape[0], size=PQ_TRAIN_ROWS, replace=False)
+            ]
+        slices = np.split(np.asarray(sample, dtype=np.float32), subspaces, axis=1)
+        return cls(
+            centroids=np.stack(
+                [
+                    kmeans(vectors=part, clusters=256, iterations=iterations, rng=rng)
+                    for part in slices
+                ]
+            )
+        )
+
+    @property
+    def code_size(self) -> int:
+        return self.centroids.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        return self.centroids.nbytes
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        slices = np.split(np.asarray(vectors, dtype=np.float32), self.code_size, axis=1)
+        return np.stack(
+            [
+                nearest_centroids(vectors=part, centroids=centroids)
+                for part, centroids in zip(slices, self.centroids)
+            ],
+            axis=1,
+        ).astype(np.uint8)
+
+    def score(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """The function `score` returns the approximate dot products of the encoded vectors with `query`."""
+        table = np.einsum(
+            "skd,sd->sk", self.centroids, query.reshape(self.code_size, -1)
+        )
+        return table[np.arange(self.code_size), codes].sum(axis=1)
+
+
+Quantizer = ScalarQuantizer | ProductQuantizer
+
+
+def train_quantizer(
+    mode: QuantizationMode, sample: np.ndarray, subspaces: int = 128
+) -> Quantizer | None:
+    """
+    The function `train_quantizer` trains the quantizer of `mode` on a sample of the embeddings.
+
+    :param mode: The `mode` parameter is "none", "int8" or "pq".
+    :type mode: QuantizationMode
+    :param subspaces: The `subspaces` parameter is the number of product quantization subspaces,
+    bytes per vector in "pq" mode.
+    :type subspaces: int
+    :return: The quantizer, `None` in "none" mode.
+    """
+    if mode == "int8":
+        return ScalarQuantizer.train(sample=sample)
+    if mode == "pq":
+        return ProductQuantizer.train(sample=sample, subspaces=subspaces)
+    if mode == "none":
+        return None
+    raise ValueError(f"Unknown quantization mode {mode}.")
+
+
+def encode_rows(quantizer: Quantizer, embeddings: np.ndarray) -> np.ndarray:
+    """The function `encode_rows` encodes every row of `embeddings` in chunks."""
+    codes = np.empty((embeddings.shape[0], quantizer.code_size), dtype=np.uint8)
+    for start in range(0, embeddings.shape[0], ENCODE_ROWS):
+        codes[start : start + ENCODE_ROWS] = quantizer.encode(
+            embeddings[start : start + ENCODE_ROWS]
+        )
+    return codes
@@ -0,0 +1,287 @@
+import os
+import math
+import time
+import numpy as np
+from io import BytesIO
+from PIL import Image
+from typing import Callable
+from threading import Lock
+from functools import lru_cache
+from collections import OrderedDict
+from src.secret import Config
+from utils.logger import logging
+from utils.clip.ann_index import IVFIndex, top_k
+from utils.clip.encoder import clip_encoder
+from utils.clip.embedding_store import EmbeddingStore
+from utils.clip.index_snapshot import load_index_snapshot, snapshot_root
+from utils.clip.versioned_directory import CURRENT_FILE
+from utils.clip.indexer import load_clip_image
+from utils.clip.label_filter import LabelFilter, align_bitmasks
+from utils.query.image_tag import extract_label_bitmasks
+
+config = Config()
+
+
+class SimilarityIndex:
+    """Process wide view of the embedding store and its ANN index.
+
+    The store and the `IVFIndex` are loaded on first use and again whenever an indexing run rewrote
+    the store or its index snapshot. The index is memory-mapped from the snapshot saved by the
+    Celery indexing task, requests are served by an exact scan until it exists. Stores of at most
+    `ANN_EXACT_THRESHOLD` embeddings are scanned exactly, an index does not pay off below that
+    size. The `ImageTag.label_bitmask` column is mirrored in an array aligned with the store rows
+    for label filtering, refreshed every `LABEL_BITMASK_TTL` seconds.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        model_name: str,
+        bitmask_loader: Callable[
+            [], tuple[np.ndarray, np.ndarray]
+        ] = extract_label_bitmasks,
+    ) -> None:
+        self.directory = directory
+        self.model_name = model_name
+        self.version: tuple[int, int] | None = None
+        self.store: EmbeddingStore | None = None
+        self.index: IVFIndex | None = None
+        self.bitmask_loader = bitmask_loader
+        self.bitmasks: np.ndarray | None = None
+        self.bitmasks_version: tuple[EmbeddingStore, float] | None = None
+        self._lock = Lock()
+
+    def store_version(self) -> tuple[int, int]:
+        """The function `store_version` returns the modification times of the store and its snapshot."""
+        version = []
+        for path in (
+            os.path.join(self.directory, CURRENT_FILE),
+            snapshot_root(directory=self.directory) / CURRENT_FILE,
+        ):
+            try:
+                version.append(os.stat(path).st_mtime_ns)
+            except FileNotFoundError:
+                version.append(0)
+        return tuple(version)
+
+    def current(self) -> tuple[EmbeddingStore, IVFIndex | None]:
+        """The function `current` returns the store and its index, reloading them when outdated."""
+        version = self.store_version()
+        with self._lock:
+            if self.store is None or version != self.version:
+                store = EmbeddingStore(
+                    directory=self.directory, model_name=self.model_name
+                )
+                index = None
+                if len(store) > config.ANN_EXACT_THRESHOLD:
+                    index = load_index_snapshot(store=store)
+                    if index is None:
+                        logging.warning(
+                            "[SimilarityIndex] No index snapshot yet, searching exactly until the /index-embeddings task saves one."
+                        )
+                self.store, self.index, self.version = store, index, version
+                logging.info(
+                    f"[SimilarityIndex] Loaded {len(store)} embeddings, {'IVF' if index else 'exact'} search."
+                )
+            return self.store, self.index
+
+    def label_bitmasks(self, store: EmbeddingStore) -> np.ndarray:
+        """The function `label_bitmasks` returns the label bitmask of every row of `store`."""
+        with self._lock:
+            if (
+                self.bitmasks is None
+                or self.bitmasks_version[0] is not store
+                or time.monotonic() - self.bitmasks_version[1]
+                > config.LABEL_BITMASK_TTL
+            ):
+                image_ids, bitmasks = self.bitmask_loader()
+                self.bitmasks = align_bitmasks(
+                    store_ids=store.ids, image_ids=image_ids, bitmasks=bitmasks
+                )
+                self.bitmasks_version = (store, time.monotonic())
+            return self.bitmasks
+
+    def scan(
+        self,
+        store: EmbeddingStore,
+        index: IVFIndex | None,
+        query: np.ndarray,
+        k: int,
+        nprobe: int,
+        match: np.ndarray | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        The function `scan` returns the rows of the `k` best matches and their scores. With a label
+        `match` mask it either scores every matching row exactly (pre-filtering) or scans enough IVF
+        lists to find as many matching candidates as an unfiltered search (post-filtering),
+        whichever reads fewer rows. Post-filtering falls back to pre-filtering when it finds fewer
+        than `k` results.
+        """
+        if match is None:
+            if index is None:
+                scores = np.asarray(store.embeddings) @ query
+                rows = top_k(scores, k=k)
+                return rows, scores[rows]
+            return index.search(
+                embeddings=store.embeddings,
+                query=query,
+                k=k,
+                nprobe=nprobe,
+                rescore=config.ANN_RESCORE,
+            )
+
+        matched = np.flatnonzero(match)
+        # Post-filtering reads `nprobe * total / matched` lists of `total / nlist` rows.
+        if (
+            index is not None
+            and matched.shape[0] ** 2 > nprobe * len(store) ** 2 / index.nlist
+        ):
+            rows, scores = index.search(
+                embeddings=store.embeddings,
+                query=query,
+                k=k,
+                nprobe=min(
+                    index.nlist, math.ceil(nprobe * len(store) / matched.shape[0])
+                ),
+                match=match,
+                rescore=config.ANN_RESCORE,
+            )
+            if rows.shape[0] >= k:
+                return rows, scores
+
+        scores = np.take(store.embeddings, matched, axis=0) @ query
+        best = top_k(scores, k=k)
+        return matched[best], scores[best]
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        nprobe: int = config.ANN_NPROBE,
+        exclude_ids: list[int] | None = None,
+        label_filter: LabelFilter | None = None,
+    ) -> list[dict]:
+        """
+        The function `search` returns the `k` stored images most similar to `query`.
+
+        :param query: The `query` parameter is an L2 normalized embedding of the CLIP encoder.
+        :type query: np.ndarray
+        :param nprobe: The `nprobe` parameter is the number of IVF lists scanned, higher values
+        raise the recall and the latency.
+        :type nprobe: int
+        :param exclude_ids: The `exclude_ids` parameter lists ids left out of the results, such as
+        the queried image itself.
+        :type exclude_ids: list[int] | None
+        :param label_filter: The `label_filter` parameter restricts the results to the images with
+        and without the given labels.
+        :type label_filter: LabelFilter | None
+        :return: A list of dictionaries with the "image_id" and "score" of every result, best first.
+        """
+        store, index = self.current()
+        if not len(store):
+            return []
+
+        query = np.asarray(query, dtype=np.float32)
+        exclude_ids = exclude_ids or []
+        match = None
+        if label_filter is not None:
+            match = label_filter.match(bitmasks=self.label_bitmasks(store=store))
+        rows, scores = self.scan(
+            store=store,
+            index=index,
+            query=query,
+            k=k + len(exclude_ids),
+            nprobe=nprobe,
+            match=match,
+        )
+
+        results = [
+            {"image_id": int(image_id), "score": round(float(score), 4)}
+            for image_id, score in zip(store.ids[rows], scores)
+            if image_id not in exclude_ids
+        ]
+        return results[:k]
+
+
+class TextEmbeddingCache:
+    """Process wide LRU cache of CLIP text embeddings.
+
+    Queries are keyed after collapsing whitespace and case, which the CLIP tokenizer ignores
+    anyway, so "Gold  Ballroom" and "gold ballroom" share one entry.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = max(capacity, 1)
+        self._embeddings: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._embeddings)
+
+    @staticmethod
+    def key(text: str) -> str:
+        return " ".join(text.lower().split())
+
+    def get(self, text: str) -> np.ndarray:
+        """
+        The function `get` returns the embedding of `text`, encoding it when missing.
+
+        :param text: The `text` parameter is the search query.
+        :type text: str
+        :return: The L2 normalized `float32` embedding, shared between callers, do not modify it.
+        """
+        key = self.key(text)
+        with self._lock:
+            embedding = self._embeddings.get(key)
+            if embedding is not None:
+                self._embeddings.move_to_end(key)
+                return embedding
+
+        # Encoded outside the lock, a slow query does not hold back cached ones.
+        embedding = clip_encoder().encode_texts(texts=[key])[0]
+        embedding.setflags(write=False)
+        with self._lock:
+            self._embeddings[key] = embedding
+            while len(self._embeddings) > self.capacity:
+                self._embeddings.popitem(last=False)
+        return embedding
+
+
+text_embedding_cache = TextEmbeddingCache(capacity=config.TEXT_EMBEDDING_CACHE_SIZE)
+
+
+@lru_cache(maxsize=1)
+def similarity_index() -> SimilarityIndex:
+    return SimilarityIndex(
+        directory=config.EMBEDDING_STORE_DIR, model_name=config.CLIP_MODEL_NAME
+    )
+
+
+def image_query_vector(
+    image_id: int | None = None, content: bytes | None = None
+) -> np.ndarray | None:
+    """
+    The function `image_query_vector` returns the CLIP embedding of an uploaded image, or the stored
+    embedding of an `ImageTag` id. Blocking, run it in a threadpool.
+
+    :return: The embedding, `None` when the id is not indexed yet.
+    """
+    if content is not None:
+        image = Image.fromarray(load_clip_image(filepath=BytesIO(content)))
+        return clip_encoder().encode_images(images=[image])[0]
+
+    store, _ = similarity_index().current()
+    found_ids, vectors = store.get([image_id])
+    return vectors[0] if found_ids.shape[0] else None
+
+
+def warm_up_search() -> None:
+    """
+    The function `warm_up_search` loads the CLIP encoder, the embedding store and its index, so the
+    first search after startup does not pay for them. Blocking, run it in a threadpool.
+    """
+    try:
+        clip_encoder()
+        similarity_index().current()
+    except Exception as e:
+        logging.warning(f"[warm_up_search] Search is loaded on first use instead: {e}")
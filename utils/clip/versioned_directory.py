@@ -0,0 +1,65 @@
+import os
+import json
+import shutil
+import numpy as np
+from pathlib import Path
+
+CURRENT_FILE = "CURRENT"
+
+
+def write_directory(
+    root: Path, name: str, arrays: dict[str, np.ndarray], meta: dict
+) -> None:
+    """
+    The function `write_directory` writes `arrays` and `meta` to `root / name` through a temporary
+    directory, readers never see a partial version.
+    """
+    tmp_path = root / f"tmp-{name}"
+    os.makedirs(tmp_path)
+    for array_name, array in arrays.items():
+        np.save(tmp_path / f"{array_name}.npy", np.ascontiguousarray(array))
+    with open(tmp_path / "meta.json", mode="w", encoding="utf-8") as file:
+        json.dump(meta, file)
+    os.replace(tmp_path, root / name)
+
+
+def read_meta(directory: Path) -> dict:
+    with open(directory / "meta.json", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def current_version(root: Path) -> str | None:
+    """The function `current_version` returns the name of the live version of `root`, if any."""
+    try:
+        return (root / CURRENT_FILE).read_text(encoding="utf-8").strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def publish_version(root: Path, name: str) -> None:
+    """The function `publish_version` atomically points the `CURRENT` file of `root` at `name`."""
+    tmp_path = root / f"{CURRENT_FILE}.tmp"
+    tmp_path.write_text(name, encoding="utf-8")
+    os.replace(tmp_path, root / CURRENT_FILE)
+
+
+def version_stamp(name: str) -> int:
+    """The function `version_stamp` returns the `time_ns` stamp of a `v{stamp}` or `base-{stamp}` name."""
+    return int(name.split("-")[-1].lstrip("v"))
+
+
+def prune_versions(root: Path, kept: set[str], prefixes: tuple[str, ...]) -> None:
+    """
+    The function `prune_versions` deletes the version directories of `root` older than every `kept`
+    one. Newer directories may belong to a concurrent writer, and files already mapped by a reader
+    stay readable after being deleted.
+    """
+    oldest = min(version_stamp(name) for name in kept)
+    for path in root.iterdir():
+        if (
+            path.is_dir()
+            and path.name not in kept
+            and path.name.startswith(prefixes)
+            and version_stamp(path.name) < oldest
+        ):
+            shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,177 @@
+import os
+import json
+import hashlib
+import numpy as np
+from threading import Lock
+from src.secret import Config
+from utils.logger import logging
+from services.postgres.models import TRAINING_COLUMNS
+from utils.clip.encoder import ClipEncoder, clip_encoder
+from utils.clip.search import similarity_index
+
+config = Config()
+
+# CLIP's learned temperature, turns cosine similarities into softmax logits.
+CLIP_LOGIT_SCALE = 100.0
+# Labels predicted by the classifier, the only ones given a zero-shot prompt.
+TRAINING_LABELS = {column.name for column in TRAINING_COLUMNS}
+
+
+def label_prompts(documentation: list[dict]) -> list[tuple[str, str, str]]:
+    """
+    The function `label_prompts` turns the labels documentation into one CLIP prompt per label.
+
+    :param documentation: The `documentation` parameter is the "documentation" list returned by
+    `retrieve_labels_documentation`, every category holding its labels in "details".
+    :type documentation: list[dict]
+    :return: A list of `(category, label, prompt)` tuples, restricted to the `TRAINING_LABELS`.
+    """
+    return [
+        (
+            category["category"],
+            detail["category"],
+            f"{detail['category'].replace('_', ' ')}: {detail['description']}",
+        )
+        for category in documentation
+        for detail in category.get("details") or []
+        if detail["category"] in TRAINING_LABELS
+    ]
+
+
+class ZeroShotLabeler:
+    """CLIP text embeddings of the label descriptions, used as zero-shot classifiers.
+
+    The prompts are encoded once and saved next to the image embeddings in `label_prompts.npz`,
+    keyed by the encoder and a digest of the prompts, so they are encoded again only when the
+    documentation or the encoder change. Scoring a page of images is a single matrix product.
+    """
+
+    def __init__(self, directory: str, model_name: str) -> None:
+        self.path = os.path.join(directory, "label_prompts.npz")
+        self.model_name = model_name
+        self.digest: str | None = None
+        self.categories = np.empty(0, dtype=str)
+        self.labels = np.empty(0, dtype=str)
+        self.embeddings = np.empty((0, 0), dtype=np.float32)
+        self._lock = Lock()
+
+    def prompts_digest(self, prompts: list[tuple[str, str, str]]) -> str:
+        payload = json.dumps([self.model_name, prompts]).encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def load(
+        self, documentation: list[dict], encoder: ClipEncoder | None = None
+    ) -> None:
+        """
+        The function `load` makes the label embeddings match `documentation`, reading them from
+        disk or encoding and saving them when the saved ones are missing or outdated.
+        """
+        prompts = label_prompts(documentation=documentation)
+        digest = self.prompts_digest(prompts=prompts)
+        with self._lock:
+            if digest == self.digest:
+                return
+
+            if self._load_saved(digest=digest):
+                return
+
+            encoder = encoder or clip_encoder()
+            self.categories = np.asarray([category for category, _, _ in prompts])
+            self.labels = np.asarray([label for _, label, _ in prompts])
+            self.embeddings = encoder.encode_texts(
+                texts=[prompt for _, _, prompt in prompts]
+            )
+            self._save(digest=digest)
+            self.digest = digest
+            logging.info(f"[ZeroShotLabeler] Encoded {len(prompts)} label prompts.")
+
+    def _load_saved(self, digest: str) -> bool:
+        if not os.path.exists(self.path):
+            return False
+
+        try:
+            with np.load(self.path) as saved:
+                if str(saved["digest"]) != digest:
+                    return False
+                self.categories = saved["categories"]
+                self.labels = saved["labels"]
+                self.embeddings = saved["embeddings"]
+        except Exception as e:
+            logging.warning(f"[ZeroShotLabeler] Ignoring unreadable label prompts: {e}")
+            return False
+        self.digest = digest
+        return True
+
+    def _save(self, digest: str) -> None:
+        # Every API worker may write the file, readers only ever see a complete one.
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, mode="wb") as file:
+            np.savez(
+                file,
+                digest=digest,
+                categories=self.categories,
+                labels=self.labels,
+                embeddings=self.embeddings,
+            )
+        os.replace(tmp_path, self.path)
+
+    def score(self, image_embeddings: np.ndarray) -> np.ndarray:
+        """
+        The function `score` returns the probability of every label for every image. Labels compete
+        with the other labels of their category through a softmax over the CLIP logits.
+
+        :param image_embeddings: The `image_embeddings` parameter is an (images, dimension) matrix.
+        :type image_embeddings: np.ndarray
+        :return: A `float32` matrix with shape (images, labels).
+        """
+        logits = CLIP_LOGIT_SCALE * (image_embeddings @ self.embeddings.T)
+        probabilities = np.empty_like(logits)
+        for category in np.unique(self.categories):
+            columns = self.categories == category
+            grouped = np.exp(
+                logits[:, columns] - logits[:, columns].max(axis=1, keepdims=True)
+            )
+            probabilities[:, columns] = grouped / grouped.sum(axis=1, keepdims=True)
+        return probabilities
+
+    def suggest(
+        self, image_ids: list[int], threshold: float = config.ZERO_SHOT_THRESHOLD
+    ) -> dict[int, dict]:
+        """
+        The function `suggest` scores the indexed images of `image_ids` against every label.
+        Blocking, run it in a threadpool.
+
+        :param threshold: The `threshold` parameter is the in-category probability above which a
+        label is suggested.
+        :type threshold: float
+        :return: The "labels" probabilities and "suggested_labels" of every indexed image, keyed by
+        id, images that are not indexed yet are left out.
+        """
+        store, _ = similarity_index().current()
+        found_ids, vectors = store.get(image_ids)
+        if not found_ids.shape[0] or not self.labels.shape[0]:
+            return {}
+
+        suggestions = {}
+        labels = self.labels.tolist()
+        for image_id, probabilities in zip(
+            found_ids.tolist(), self.score(image_embeddings=vectors)
+        ):
+            suggestions[image_id] = {
+                "labels": {
+                    label: round(float(probability), 4)
+                    for label, probability in zip(labels, probabilities)
+                },
+                "suggested_labels": [
+                    label
+                    for label, probability in zip(labels, probabilities)
+                    if probability >= threshold
+                ],
+            }
+        return suggestions
+
+
+zero_shot_labeler = ZeroShotLabeler(
+    directory=config.EMBEDDING_STORE_DIR, model_name=config.CLIP_MODEL_NAME
+)
@@ -70,3 +70,9 @@ class AccessUnauthorized(DiVA):
     """Error occurred when user with blacklisted IP try to access server."""
 
     pass
+
+
+class InvalidRequestError(DiVA):
+    """Error occurred when the request payload cannot be processed."""
+
+    pass
@@ -0,0 +1,84 @@
+import time
+import numpy as np
+from typing import Callable
+from threading import Lock
+from functools import lru_cache
+from src.secret import Config
+from utils.logger import logging
+from utils.dedup.hamming_index import MultiIndexHash
+from utils.query.image_tag import extract_perceptual_hashes
+
+config = Config()
+
+
+class DuplicateIndex:
+    """Process wide multi-index hash of `ImageTag.phash`.
+
+    The hashes are reloaded every `DUPLICATE_INDEX_TTL` seconds, new images are hashed by the CLIP
+    indexing task. The duplicate clusters of a load are computed on first use and kept with it.
+    """
+
+    def __init__(
+        self,
+        radius: int,
+        hash_loader: Callable[
+            [], tuple[np.ndarray, np.ndarray]
+        ] = extract_perceptual_hashes,
+    ) -> None:
+        self.radius = radius
+        self.hash_loader = hash_loader
+        self.index: MultiIndexHash | None = None
+        self.loaded_at = 0.0
+        self.duplicate_clusters: list[np.ndarray] | None = None
+        self._lock = Lock()
+
+    def current(self) -> MultiIndexHash:
+        """The function `current` returns the index, reloading the hashes when outdated."""
+        with self._lock:
+            if (
+                self.index is None
+                or time.monotonic() - self.loaded_at > config.DUPLICATE_INDEX_TTL
+            ):
+                image_ids, hashes = self.hash_loader()
+                self.index = MultiIndexHash(
+                    ids=image_ids, hashes=hashes, radius=self.radius
+                )
+                self.loaded_at = time.monotonic()
+                self.duplicate_clusters = None
+                logging.info(f"[DuplicateIndex] Loaded {len(self.index)} hashes.")
+            return self.index
+
+    def clusters(self) -> list[np.ndarray]:
+        """The function `clusters` returns the near-duplicate clusters, largest first."""
+        index = self.current()
+        with self._lock:
+            if self.duplicate_clusters is None or self.index is not index:
+                self.duplicate_clusters = index.clusters()
+            return self.duplicate_clusters
+
+    def near_duplicates(self, image_id: int, radius: int) -> list[dict] | None:
+        """
+        The function `near_duplicates` returns the images whose hash is at most `radius` bits away
+        from the hash of `image_id`. Blocking, run it in a threadpool.
+
+        :return: A list of dictionaries with the "image_id" and "distance" of every other image,
+        closest first, `None` when `image_id` is not hashed yet.
+        """
+        index = self.current()
+        position = np.searchsorted(index.ids, image_id)
+        if position == len(index) or index.ids[position] != image_id:
+            return None
+
+        image_ids, distances = index.query(
+            query=int(index.hashes[index.inverse[position]]), radius=radius
+        )
+        return [
+            {"image_id": int(other_id), "distance": int(distance)}
+            for other_id, distance in zip(image_ids, distances)
+            if other_id != image_id
+        ]
+
+
+@lru_cache(maxsize=1)
+def duplicate_index() -> DuplicateIndex:
+    return DuplicateIndex(radius=config.DUPLICATE_HAMMING_RADIUS)
@@ -0,0 +1,175 @@
+import numpy as np
+from utils.dedup.perceptual_hash import hamming_distances
+
+# Bounds the (rows, bucket) distance matrices computed while pairing a bucket, 16M entries.
+PAIR_SCORES = 2**24
+
+
+def chunk_bounds(chunks: int) -> list[tuple[int, int]]:
+    """The function `chunk_bounds` splits 64 bits into `chunks` `(shift, width)` slices."""
+    bounds, shift = [], 0
+    for chunk in range(chunks):
+        width = 64 // chunks + (1 if chunk < 64 % chunks else 0)
+        bounds.append((shift, width))
+        shift += width
+    return bounds
+
+
+def chunk_keys(hashes: np.ndarray, shift: int, width: int) -> np.ndarray:
+    unsigned = np.asarray(hashes, dtype=np.int64).view(np.uint64)
+    return (unsigned >> np.uint64(shift)) & np.uint64((1 << width) - 1)
+
+
+def connected_components(
+    count: int, first: np.ndarray, second: np.ndarray
+) -> np.ndarray:
+    """
+    The function `connected_components` labels every node with the smallest node of its component,
+    propagating labels along the edges `(first[i], second[i])` until nothing changes.
+    """
+    labels = np.arange(count)
+    while True:
+        lowest = np.minimum(labels[first], labels[second])
+        updated = labels.copy()
+        np.minimum.at(updated, first, lowest)
+        np.minimum.at(updated, second, lowest)
+        updated = updated[updated]
+        if np.array_equal(updated, labels):
+            return labels
+        labels = updated
+
+
+class MultiIndexHash:
+    """Multi-index hashing over 64 bits perceptual hashes.
+
+    The hashes are split into `radius + 1` chunks and every chunk is indexed on its own. Two hashes
+    at most `radius` bits apart have at least one identical chunk (pigeonhole principle), so a
+    query only compares the hashes sharing a chunk with it instead of the whole corpus. Identical
+    hashes are indexed once.
+    """
+
+    def __init__(self, ids: np.ndarray, hashes: np.ndarray, radius: int) -> None:
+        self.radius = radius
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.hashes, inverse = np.unique(
+            np.asarray(hashes, dtype=np.int64), return_inverse=True
+        )
+        self.inverse = inverse.ravel()
+        # Ids grouped by unique hash, `members[offsets[i]:offsets[i + 1]]` share `hashes[i]`.
+        self.members = self.ids[np.argsort(self.inverse, kind="stable")]
+        self.offsets = np.zeros(self.hashes.shape[0] + 1, dtype=np.int64)
+        np.cumsum(
+            np.bincount(self.inverse, minlength=self.hashes.shape[0]),
+            out=self.offsets[1:],
+        )
+
+        self.tables = []
+        for shift, width in chunk_bounds(chunks=radius + 1):
+            keys = chunk_keys(hashes=self.hashes, shift=shift, width=width)
+            order = np.argsort(keys, kind="stable")
+            self.tables.append((shift, width, keys[order], order))
+
+    def __len__(self) -> int:
+        return self.ids.shape[0]
+
+    def expand(self, positions: np.ndarray) -> np.ndarray:
+        """The function `expand` returns the ids of the unique hashes at `positions`."""
+        if not positions.shape[0]:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(
+            [
+                self.members[self.offsets[position] : self.offsets[position + 1]]
+                for position in positions
+            ]
+        )
+
+    def query(
+        self, query: int, radius: int | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        The function `query` returns the ids whose hash is at most `radius` bits away from `query`.
+
+        :param radius: The `radius` parameter is the Hamming radius, at most the radius the index
+        was built with, which is the default.
+        :type radius: int | None
+        :return: A tuple of the ids and their Hamming distances, closest first.
+        """
+        radius = self.radius if radius is None else radius
+        if radius > self.radius:
+            raise ValueError(
+                f"Radius {radius} is larger than the index radius {self.radius}."
+            )
+
+        candidates = []
+        for shift, width, keys, order in self.tables:
+            key = chunk_keys(hashes=np.asarray([query]), shift=shift, width=width)[0]
+            start = np.searchsorted(keys, key, side="left")
+            end = np.searchsorted(keys, key, side="right")
+            candidates.append(order[start:end])
+        positions = np.unique(np.concatenate(candidates))
+        distances = hamming_distances(hashes=self.hashes[positions], query=query)
+        close = distances <= radius
+        positions, distances = positions[close], distances[close]
+        best = np.argsort(distances, kind="stable")
+        positions, distances = positions[best], distances[best]
+        counts = self.offsets[positions + 1] - self.offsets[positions]
+        return self.expand(positions=positions), np.repeat(distances, counts)
+
+    def pairs(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        The function `pairs` returns every pair of distinct unique hashes at most `radius` bits
+        apart, as positions in `self.hashes` with `first < second`.
+        """
+        found = []
+        for _, _, keys, order in self.tables:
+            starts = np.flatnonzero(np.diff(keys, prepend=keys[:1] - 1) != 0)
+            ends = np.append(starts[1:], keys.shape[0])
+            for start, end in zip(starts, ends):
+                if end - start < 2:
+                    continue
+                bucket = order[start:end]
+                step = max(1, PAIR_SCORES // bucket.shape[0])
+                for row in range(0, bucket.shape[0], step):
+                    rows = bucket[row : row + step]
+                    distances = hamming_distances(
+                        hashes=self.hashes[rows][:, None],
+                        query=self.hashes[bucket][None, :],
+                    )
+                    first, second = np.nonzero(distances <= self.radius)
+                    first, second = rows[first], bucket[second]
+                    keep = first < second
+                    found.append(first[keep] * self.hashes.shape[0] + second[keep])
+
+        if not found:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        codes = np.unique(np.concatenate(found))
+        return codes // self.hashes.shape[0], codes % self.hashes.shape[0]
+
+    def clusters(self) -> list[np.ndarray]:
+        """
+        The function `clusters` groups the ids linked by chains of near-duplicate hashes.
+
+        :return: The sorted ids of every cluster of at least two images, largest clusters first.
+        """
+        first, second = self.pairs()
+        labels = connected_components(
+            count=self.hashes.shape[0], first=first, second=second
+        )[self.inverse]
+        order = np.lexsort((self.ids, labels))
+        labels, ids = labels[order], self.ids[order]
+        starts = np.flatnonzero(np.diff(labels, prepend=-1) != 0)
+        groups = [group for group in np.split(ids, starts[1:]) if group.shape[0] > 1]
+        return sorted(groups, key=lambda group: (-group.shape[0], group[0]))
+
+
+def duplicate_image_ids(ids: np.ndarray, hashes: np.ndarray, radius: int) -> np.ndarray:
+    """
+    The function `duplicate_image_ids` returns the ids to skip so that every near-duplicate cluster
+    keeps a single image, its smallest id.
+    """
+    if not np.asarray(ids).shape[0]:
+        return np.empty(0, dtype=np.int64)
+    clusters = MultiIndexHash(ids=ids, hashes=hashes, radius=radius).clusters()
+    if not clusters:
+        return np.empty(0, dtype=np.int64)
+    return np.sort(np.concatenate([cluster[1:] for cluster in clusters]))
@@ -0,0 +1,33 @@
+import cv2
+import numpy as np
+
+# The image is shrunk to 32x32 and the 8x8 lowest DCT frequencies give the 64 bits.
+HASH_IMAGE_SIZE = 32
+HASH_SIZE = 8
+HASH_WEIGHTS = np.left_shift(np.uint64(1), np.arange(63, -1, -1, dtype=np.uint64))
+
+
+def perceptual_hash(image: np.ndarray) -> int:
+    """
+    The function `perceptual_hash` computes the 64 bits pHash of an image. Re-exports, resizes and
+    light edits keep most of the low DCT frequencies, so near-duplicates land a few bits apart.
+
+    :param image: The `image` parameter is an RGB or grayscale `uint8` array.
+    :type image: np.ndarray
+    :return: The hash as a signed 64 bits integer, the type of `ImageTag.phash`.
+    """
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+    small = cv2.resize(
+        image, (HASH_IMAGE_SIZE, HASH_IMAGE_SIZE), interpolation=cv2.INTER_AREA
+    )
+    low = cv2.dct(small.astype(np.float32))[:HASH_SIZE, :HASH_SIZE].ravel()
+    bits = low > np.median(low)
+    return int(np.uint64(HASH_WEIGHTS[bits].sum()).view(np.int64))
+
+
+def hamming_distances(hashes: np.ndarray, query: int | np.ndarray) -> np.ndarray:
+    """The function `hamming_distances` returns the number of bits differing from `query`."""
+    return np.bitwise_count(
+        np.asarray(hashes, dtype=np.int64) ^ np.asarray(query, dtype=np.int64)
+    )
@@ -1,9 +1,11 @@
 import os
 import string
 import random
+import multiprocessing
 from pathlib import Path
 from collections import defaultdict
 from datetime import datetime
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from utils.logger import logging
 from utils.custom_errors import DataNotFoundError
 
@@ -113,3 +115,26 @@ def label_distribution(entries: list) -> None:
         logging.info(
             f"{label}: True = {percentages['true']:.2f}%, False = {percentages['false']:.2f}%"
         )
+
+
+def in_daemon_process() -> bool:
+    """
+    The function `in_daemon_process` tells whether the current process is daemonic, such as a task
+    running in a Celery prefork worker. Daemonic processes are not allowed to start child processes.
+    """
+    return multiprocessing.current_process().daemon
+
+
+def parallel_executor(max_workers: int) -> Executor:
+    """
+    The function `parallel_executor` returns a process pool, or a thread pool when the current process
+    is daemonic and cannot start processes. Image decoding mostly runs in PIL and OpenCV code that
+    releases the GIL, so the threads still decode in parallel.
+
+    :param max_workers: The `max_workers` parameter is the number of workers of the pool.
+    :type max_workers: int
+    :return: A `ProcessPoolExecutor` or a `ThreadPoolExecutor`.
+    """
+    if in_daemon_process():
+        return ThreadPoolExecutor(max_workers=max_workers)
+    return ProcessPoolExecutor(max_workers=max_workers)
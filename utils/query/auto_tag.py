@@ -0,0 +1,193 @@
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Float,
+    Integer,
+    column,
+    func,
+    select,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import insert
+from services.postgres.connection import database_connection
+from services.postgres.models import AutoTagWatermark, ImageTag, label_bitmask
+from utils.custom_errors import DatabaseQueryError
+from utils.logger import logging
+from utils.helper import local_time
+
+
+def extract_auto_tag_watermark(model_name: str) -> int:
+    """
+    The function `extract_auto_tag_watermark` returns the last `ImageTag.id` auto-tagged by the model,
+    `0` when the model never ran.
+    """
+    with database_connection().connect() as session:
+        try:
+            query = select(AutoTagWatermark.last_image_id).where(
+                AutoTagWatermark.model_name == model_name
+            )
+            return session.execute(query).scalar_one_or_none() or 0
+        except DatabaseQueryError:
+            raise
+        except Exception as e:
+            logging.error(
+                f"[extract_auto_tag_watermark] Error retrieving watermark: {e}"
+            )
+            session.rollback()
+            raise DatabaseQueryError(detail="Invalid database query")
+        finally:
+            session.close()
+
+
+def count_untagged_images(after_id: int) -> int:
+    with database_connection().connect() as session:
+        try:
+            query = (
+                select(func.count())
+                .where(ImageTag.is_validated.is_(False), ImageTag.id > after_id)
+                .select_from(ImageTag)
+            )
+            return session.execute(query).scalar_one()
+        except DatabaseQueryError:
+            raise
+        except Exception as e:
+            logging.error(f"[count_untagged_images] Error counting entries: {e}")
+            session.rollback()
+            raise DatabaseQueryError(detail="Invalid database query")
+        finally:
+            session.close()
+
+
+def extract_untagged_image_chunk(after_id: int, limit: int) -> list[dict]:
+    """
+    The function `extract_untagged_image_chunk` returns the next unvalidated entries after the
+    `after_id` watermark, walking the primary key instead of using an OFFSET.
+
+    :param after_id: The `after_id` parameter is the last `ImageTag.id` already processed.
+    :type after_id: int
+    :param limit: The `limit` parameter is the chunk size.
+    :type limit: int
+    :return: A list of dictionaries with the "id" and "filepath" of every entry, ordered by id.
+    """
+    with database_connection().connect() as session:
+        try:
+            query = (
+                select(ImageTag.id, ImageTag.filepath)
+                .where(ImageTag.is_validated.is_(False), ImageTag.id > after_id)
+                .order_by(ImageTag.id)
+                .limit(limit)
+            )
+            return [dict(row._mapping) for row in session.execute(query).fetchall()]
+        except DatabaseQueryError:
+            raise
+        except Exception as e:
+            logging.error(f"[extract_untagged_image_chunk] Error retrieving chunk: {e}")
+            session.rollback()
+            raise DatabaseQueryError(detail="Invalid database query")
+        finally:
+            session.close()
+
+
+def update_predicted_labels(
+    model_name: str,
+    predictions: list[dict],
+    labels: list[str],
+    last_image_id: int,
+) -> None:
+    """
+    The function `update_predicted_labels` writes a chunk of predictions with bulk
+    `UPDATE ... FROM (VALUES ...)` statements and moves the watermark of the model in the same transaction,
+    so an interrupted run resumes right after the last committed chunk. Entries validated in the
+    meantime are left untouched.
+
+    :param predictions: The `predictions` parameter holds the "id", every label of `labels` and the
+    "confidence" of each entry.
+    :type predictions: list[dict]
+    :param labels: The `labels` parameter is the list of predicted `ImageTag` label columns.
+    :type labels: list[str]
+    :param last_image_id: The `last_image_id` parameter is the new watermark of the model.
+    :type last_image_id: int
+    """
+    with database_connection().connect() as session:
+        try:
+            now = local_time()
+            # Postgres accepts at most 65535 bind parameters per statement.
+            step = 65535 // (len(labels) + 3)
+            for start in range(0, len(predictions), step):
+                predicted = values(
+                    column("id", Integer),
+                    *[column(label, Boolean) for label in labels],
+                    column("confidence", Float),
+                    column("label_bitmask", BigInteger),
+                    name="predicted",
+                ).data(
+                    [
+                        (
+                            prediction["id"],
+                            *[prediction[label] for label in labels],
+                            prediction["confidence"],
+                            label_bitmask(prediction),
+                        )
+                        for prediction in predictions[start : start + step]
+                    ]
+                )
+                query = (
+                    update(ImageTag)
+                    .where(
+                        ImageTag.id == predicted.c.id,
+                        ImageTag.is_validated.is_(False),
+                    )
+                    .values(
+                        **{label: predicted.c[label] for label in labels},
+                        confidence=predicted.c.confidence,
+                        label_bitmask=predicted.c.label_bitmask,
+                        auto_tagged_at=now,
+                    )
+                )
+                session.execute(query)
+
+            query = insert(AutoTagWatermark).values(
+                created_at=now,
+                model_name=model_name,
+                last_image_id=last_image_id,
+                tagged_image=len(predictions),
+            )
+            query = query.on_conflict_do_update(
+                index_elements=[AutoTagWatermark.model_name],
+                set_={
+                    "updated_at": now,
+                    "last_image_id": last_image_id,
+                    "tagged_image": AutoTagWatermark.tagged_image + len(predictions),
+                },
+            )
+            session.execute(query)
+            session.commit()
+        except DatabaseQueryError:
+            raise
+        except Exception as e:
+            logging.error(f"[update_predicted_labels] Error updating entries: {e}")
+            session.rollback()
+            raise DatabaseQueryError(detail="Failed to update database entries")
+        finally:
+            session.close()
+
+
+def reset_auto_tag_watermark(model_name: str) -> None:
+    with database_connection().connect() as session:
+        try:
+            query = (
+                update(AutoTagWatermark)
+                .where(AutoTagWatermark.model_name == model_name)
+                .values(updated_at=local_time(), last_image_id=0, tagged_image=0)
+            )
+            session.execute(query)
+            session.commit()
+        except DatabaseQueryError:
+            raise
+        except Exception as e:
+            logging.error(f"[reset_auto_tag_watermark] Error resetting watermark: {e}")
+            session.rollback()
+            raise DatabaseQueryError(detail="Failed to update database entries")
+        finally:
+            session.close()
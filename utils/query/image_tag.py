@@ -1,13 +1,17 @@
 from utils.logger import logging
-from sqlalchemy import select, update
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.asyncio import AsyncSession
+import numpy as np
+from sqlalchemy import BigInteger, Integer, case, column, select, update, values
 from src.schema.request_format import AllowedIpAddress
 from utils.helper import find_image_path, extract_filename
 from utils.custom_errors import DatabaseQueryError, DataNotFoundError
-from services.postgres.models import ImageTag
-from services.postgres.connection import database_connection
+from services.postgres.models import ImageTag, LABEL_COLUMNS, TRAINING_COLUMNS
+from services.postgres.connection import database_connection, session_factory
 from utils.query.labels_documentation import validate_data_availability
+from utils.query.pagination import labeler_counts
+from utils.dedup.hamming_index import duplicate_image_ids
+from src.secret import Config
+
+config = Config()
 
 
 async def insert_image_tag_entry(
@@ -26,6 +30,7 @@ async def insert_image_tag_entry(
     remainder = total_entries % total_ips
 
     distributed_data = []
+    distributed_counts = {}
     start_index = 0
 
     for idx_ips, ip in enumerate(allowed_ips.ip_address):
@@ -35,21 +40,20 @@ async def insert_image_tag_entry(
                 filepath=filepaths[idx_file],
                 filename=filenames[idx_file],
                 ip_address=ip,
+                label_bitmask=0,
             )
             for idx_file in range(start_index, end_index)
         ]
         distributed_data.extend(entries)
+        distributed_counts[ip] = len(entries)
         start_index = end_index
 
-    async_engine = database_connection(connection_type="async")
-    async_session = sessionmaker(
-        bind=async_engine, class_=AsyncSession, expire_on_commit=False
-    )
-
-    async with async_session() as session:
+    async with session_factory()() as session:
         try:
             session.add_all(distributed_data)
             await session.commit()
+            for ip, count in distributed_counts.items():
+                labeler_counts.add(ip_address=ip, is_validated=False, count=count)
             logging.info("Insert image_tag entries.")
         except DatabaseQueryError:
             raise
@@ -70,20 +74,42 @@ async def initialize_image_tag_preparation():
 
 
 def extract_image_tag_entries(
-    is_validated: bool = True, is_trained: bool = False
+    is_validated: bool = True,
+    is_trained: bool | None = False,
+    skip_duplicates: bool = config.TRAINING_SKIP_DUPLICATES,
 ) -> list:
     with database_connection().connect() as session:
         try:
             query = (
-                select(ImageTag)
-                .where(
-                    ImageTag.is_validated == is_validated,
-                    ImageTag.is_trained == is_trained,
-                )
+                select(*TRAINING_COLUMNS)
+                .where(ImageTag.is_validated == is_validated)
                 .order_by(ImageTag.id)
             )
+            if is_trained is not None:
+                query = query.where(ImageTag.is_trained == is_trained)
+            duplicates = np.empty(0, dtype=np.int64)
+            if skip_duplicates:
+                # Clustered over every entry of `is_validated`, trained or not, so the kept image of
+                # a cluster stays the same from one training run to the next.
+                hashes = session.execute(
+                    select(ImageTag.id, ImageTag.phash).where(
+                        ImageTag.is_validated == is_validated,
+                        ImageTag.phash.is_not(None),
+                    )
+                ).fetchall()
+                duplicates = duplicate_image_ids(
+                    ids=np.asarray([row.id for row in hashes], dtype=np.int64),
+                    hashes=np.asarray([row.phash for row in hashes], dtype=np.int64),
+                    radius=config.DUPLICATE_HAMMING_RADIUS,
+                )
+                logging.info(
+                    f"[extract_validated_image_tag] Skipping {duplicates.shape[0]} near-duplicate entries."
+                )
             execute = session.execute(query)
             rows = execute.fetchall()
+            if duplicates.shape[0]:
+                skipped = set(duplicates.tolist())
+                rows = [row for row in rows if row.id not in skipped]
             if not rows:
                 logging.warning(
                     "[extract_validated_image_tag] No validated data entry!"
@@ -130,3 +156,179 @@ def update_image_tag_is_trained(entries: list[dict]) -> None:
             raise DatabaseQueryError(detail="Failed to update database entries")
         finally:
             session.close()
+
+
+async def extract_image_tag_filepaths(image_ids: list[int]) -> dict[int, str]:
+    """
+    The function `extract_image_tag_filepaths` returns the filepath of every existing `ImageTag` id.
+
+    :param image_ids: The `image_ids` parameter is a list of `ImageTag.id` values.
+    :type image_ids: list[int]
+    :return: A dictionary of filepaths keyed by id, unknown ids are left out.
+    """
+    async with database_connection(connection_type="async").connect() as session:
+        try:
+            query = select(ImageTag.id, ImageTag.filepath).where(
+                ImageTag.id.in_(image_ids)
+            )
+            result = await session.execute(query)
+            return {row.id: row.filepath for row in result.fetchall()}
+        except DatabaseQueryError:
+            raise
+        except Exception as e:
+            logging.error(
+                f"[extract_image_tag_filepaths] Error retrieving filepaths: {e}"
+            )
+            await session.rollback()
+            raise DatabaseQueryError(detail="Invalid database query")
+        finally:
+            await session.close()
+
+
+def extract_all_image_tag_filepaths() -> list[dict]:
+    """
+    The function `extract_all_image_tag_filepaths` returns the "id", "filepath" and "phash" of every
+    `ImageTag` entry, ordered by id.
+    """
+    with database_connection().connect() as session:
+        try:
+            query = select(ImageTag.id, ImageTag.filepath, ImageTag.phash).order_by(
+                ImageTag.id
+            )
+            return [dict(row._mapping) for row in session.execute(query).fetchall()]
+        except DatabaseQueryError:
+            raise
+        except Exception as e:
+            logging.error(
+                f"[extract_all_image_tag_filepaths] Error retrieving filepaths: {e}"
+            )
+            session.rollback()
+            raise DatabaseQueryError(detail="Invalid database query")
+        finally:
+            session.close()
+
+
+async def backfill_label_bitmask() -> None:
+    """
+    The function `backfill_label_bitmask` packs the labels of the entries written before
+    `ImageTag.label_bitmask` existed.
+    """
+    async with database_connection(connection_type="async").connect() as session:
+        try:
+            bitmask = sum(
+                case((getattr(ImageTag, label), 1 << bit), else_=0)
+                for bit, label in enumerate(LABEL_COLUMNS)
+            )
+            query = (
+                update(ImageTag)
+                .where(ImageTag.label_bitmask.is_(None))
+                .values(label_bitmask=bitmask)
+            )
+            result = await session.execute(query)
+            await session.commit()
+            if result.rowcount:
+                logging.info(f"Backfilled label_bitmask of {result.rowcount} entries.")
+        except DatabaseQueryError:
+            raise
+        except Exception as e:
+            logging.error(f"[backfill_label_bitmask] Error updating entries: {e}")
+            await session.rollback()
+            raise DatabaseQueryError(detail="Failed to update database entries")
+        finally:
+            await session.close()
+
+
+def extract_label_bitmasks() -> tuple[np.ndarray, np.ndarray]:
+    """
+    The function `extract_label_bitmasks` returns the `label_bitmask` of every `ImageTag` entry.
+
+    :return: A tuple of the `int64` ids, ordered, and their `int64` label bitmasks.
+    """
+    with database_connection().connect() as session:
+        try:
+            query = select(ImageTag.id, ImageTag.label_bitmask).order_by(ImageTag.id)
+            rows = session.execute(query).fetchall()
+            ids = np.fromiter((row.id for row in rows), dtype=np.int64, count=len(rows))
+            bitmasks = np.fromiter(
+                (row.label_bitmask or 0 for row in rows),
+                dtype=np.int64,
+                count=len(rows),
+            )
+            return ids, bitmasks
+        except DatabaseQueryError:
+            raise
+        except Exception as e:
+            logging.error(f"[extract_label_bitmasks] Error retrieving bitmasks: {e}")
+            session.rollback()
+            raise DatabaseQueryError(detail="Invalid database query")
+        finally:
+            session.close()
+
+
+def update_perceptual_hashes(hashes: dict[int, int]) -> None:
+    """
+    The function `update_perceptual_hashes` writes the perceptual hash of every id with bulk
+    `UPDATE ... FROM (VALUES ...)` statements.
+
+    :param hashes: The `hashes` parameter maps `ImageTag.id` values to their signed 64 bits pHash.
+    :type hashes: dict[int, int]
+    """
+    if not hashes:
+        return
+
+    with database_connection().connect() as session:
+        try:
+            items = list(hashes.items())
+            # Postgres accepts at most 65535 bind parameters per statement.
+            step = 65535 // 2
+            for start in range(0, len(items), step):
+                computed = values(
+                    column("id", Integer),
+                    column("phash", BigInteger),
+                    name="computed",
+                ).data(items[start : start + step])
+                query = (
+                    update(ImageTag)
+                    .where(ImageTag.id == computed.c.id)
+                    .values(phash=computed.c.phash)
+                )
+                session.execute(query)
+            session.commit()
+        except DatabaseQueryError:
+            raise
+        except Exception as e:
+            logging.error(f"[update_perceptual_hashes] Error updating entries: {e}")
+            session.rollback()
+            raise DatabaseQueryError(detail="Failed to update database entries")
+        finally:
+            session.close()
+
+
+def extract_perceptual_hashes() -> tuple[np.ndarray, np.ndarray]:
+    """
+    The function `extract_perceptual_hashes` returns the perceptual hash of every hashed `ImageTag`
+    entry.
+
+    :return: A tuple of the `int64` ids, ordered, and their `int64` hashes.
+    """
+    with database_connection().connect() as session:
+        try:
+            query = (
+                select(ImageTag.id, ImageTag.phash)
+                .where(ImageTag.phash.is_not(None))
+                .order_by(ImageTag.id)
+            )
+            rows = session.execute(query).fetchall()
+            ids = np.fromiter((row.id for row in rows), dtype=np.int64, count=len(rows))
+            hashes = np.fromiter(
+                (row.phash for row in rows), dtype=np.int64, count=len(rows)
+            )
+            return ids, hashes
+        except DatabaseQueryError:
+            raise
+        except Exception as e:
+            logging.error(f"[extract_perceptual_hashes] Error retrieving hashes: {e}")
+            session.rollback()
+            raise DatabaseQueryError(detail="Invalid database query")
+        finally:
+            session.close()
@@ -1,8 +1,59 @@
-from sqlalchemy import update
+import asyncio
+from typing import Awaitable, Callable
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Integer,
+    case,
+    column,
+    select,
+    update,
+    values,
+)
 from services.postgres.connection import database_connection
-from services.postgres.models import ImageTag
+from services.postgres.models import LABEL_COLUMNS, ImageTag, label_bitmask
 from utils.custom_errors import DatabaseQueryError
+from utils.helper import local_time
 from utils.logger import logging
+from src.secret import Config
+from utils.query.pagination import labeler_counts
+
+config = Config()
+
+# Entries per `update_labels_bulk` statement, the cap of `LabelsValidatorBulk`.
+VALIDATION_BULK_MAX_ITEMS = 1000
+
+# Label columns written by a validation, `dominant_colors` is not labeled by hand.
+VALIDATED_LABELS = (
+    "artifacts",
+    "nature",
+    "living_beings",
+    "natural",
+    "manmade",
+    "conceptual",
+    "art_deco",
+    "architectural",
+    "artistic",
+    "sci_fi",
+    "fantasy",
+    "day",
+    "afternoon",
+    "evening",
+    "night",
+    "warm",
+    "cool",
+    "neutral",
+    "gold",
+    "asian",
+    "european",
+)
+
+# Bits of the labels a validation does not write, kept from the entry when its bitmask is rewritten.
+UNVALIDATED_LABEL_BITS = sum(
+    case((getattr(ImageTag, label), 1 << bit), else_=0)
+    for bit, label in enumerate(LABEL_COLUMNS)
+    if label not in VALIDATED_LABELS
+)
 
 
 async def update_labels(
@@ -55,18 +106,34 @@ async def update_labels(
                 "asian": asian,
                 "european": european,
                 "is_validated": True,
+                "updated_at": local_time(),
             }
+            update_values["label_bitmask"] = (
+                label_bitmask(update_values) + UNVALIDATED_LABEL_BITS
+            )
+
+            # Locked until the commit, so concurrent validations of the entry count it once.
+            was_validated = (
+                await session.execute(
+                    select(ImageTag.is_validated)
+                    .where(ImageTag.id == image_id, ImageTag.ip_address == ip_address)
+                    .with_for_update()
+                )
+            ).scalar_one_or_none()
 
             query = (
                 update(ImageTag)
                 .where(ImageTag.id == image_id, ImageTag.ip_address == ip_address)
                 .values(update_values)
-                .returning(*ImageTag.__table__.columns)
             )
 
             await session.execute(query)
             await session.commit()
 
+            if was_validated is False:
+                labeler_counts.add(ip_address=ip_address, is_validated=False, count=-1)
+                labeler_counts.add(ip_address=ip_address, is_validated=True, count=1)
+
         except DatabaseQueryError:
             raise
         except Exception as e:
@@ -75,3 +142,230 @@ async def update_labels(
             raise DatabaseQueryError(detail="Invalid database query")
         finally:
             await session.close()
+
+
+async def update_labels_bulk(validations: list[dict], ip_address: str) -> list[dict]:
+    """
+    The function `update_labels_bulk` validates the labels of many entries in one transaction,
+    with a single `UPDATE ... FROM (VALUES ...)` statement. Only the entries distributed to
+    `ip_address` are updated.
+
+    :param validations: The `validations` parameter is a list of `LabelsValidator` payloads as
+    dictionaries, the last payload of an "image_id" wins.
+    :type validations: list[dict]
+    :param ip_address: The `ip_address` parameter is the IP of the labeler.
+    :type ip_address: str
+    :return: The "image_id" and "status" of every distinct image, "validated" or "not_found" when
+    the entry does not exist or belongs to another labeler.
+    """
+    latest = {validation["image_id"]: validation for validation in validations}
+    async with database_connection(connection_type="async").connect() as session:
+        try:
+            # Locked until the commit, so concurrent validations of an entry count it once.
+            previous = dict(
+                (
+                    await session.execute(
+                        select(ImageTag.id, ImageTag.is_validated)
+                        .where(
+                            ImageTag.id.in_(list(latest)),
+                            ImageTag.ip_address == ip_address,
+                        )
+                        .with_for_update()
+                    )
+                ).fetchall()
+            )
+
+            if previous:
+                validated = values(
+                    column("id", Integer),
+                    *[column(label, Boolean) for label in VALIDATED_LABELS],
+                    column("label_bitmask", BigInteger),
+                    name="validated",
+                ).data(
+                    [
+                        (
+                            image_id,
+                            *[
+                                bool(latest[image_id].get(label))
+                                for label in VALIDATED_LABELS
+                            ],
+                            label_bitmask(latest[image_id]),
+                        )
+                        for image_id in previous
+                    ]
+                )
+                query = (
+                    update(ImageTag)
+                    .where(
+                        ImageTag.id == validated.c.id,
+                        ImageTag.ip_address == ip_address,
+                    )
+                    .values(
+                        **{label: validated.c[label] for label in VALIDATED_LABELS},
+                        label_bitmask=validated.c.label_bitmask
+                        + UNVALIDATED_LABEL_BITS,
+                        is_validated=True,
+                        updated_at=local_time(),
+                    )
+                )
+                await session.execute(query)
+                await session.commit()
+
+            flipped = sum(1 for is_validated in previous.values() if not is_validated)
+            if flipped:
+                labeler_counts.add(
+                    ip_address=ip_address, is_validated=False, count=-flipped
+                )
+                labeler_counts.add(
+                    ip_address=ip_address, is_validated=True, count=flipped
+                )
+
+            return [
+                {
+                    "image_id": image_id,
+                    "status": "validated" if image_id in previous else "not_found",
+                }
+                for image_id in latest
+            ]
+        except DatabaseQueryError:
+            raise
+        except Exception as e:
+            logging.error(f"[update_labels_bulk] Error while updating labels: {e}")
+            await session.rollback()
+            raise DatabaseQueryError(detail="Invalid database query")
+        finally:
+            await session.close()
+
+
+class ValidationBuffer:
+    """Write-behind buffer of the label validations of the process.
+
+    `submit` only records the payload, keyed by `(ip_address, image_id)` so the last validation of an
+    entry replaces the pending one. A background task writes the pending validations with
+    `update_labels_bulk`, one transaction per labeler and `VALIDATION_BULK_MAX_ITEMS` entries, every
+    `flush_interval` milliseconds or as soon as `max_items` are pending. A failed batch is kept for
+    the next flush unless a newer validation of the entry arrived, and `stop` writes what is left.
+    Pending validations are lost if the process is killed before a flush.
+    """
+
+    def __init__(
+        self,
+        writer: Callable[[list[dict], str], Awaitable[list[dict]]] = update_labels_bulk,
+        flush_interval: int = config.VALIDATION_FLUSH_MS,
+        max_items: int = config.VALIDATION_FLUSH_MAX_ITEMS,
+    ) -> None:
+        self.writer = writer
+        self.flush_interval = flush_interval
+        self.max_items = max_items
+        self.pending: dict[tuple[str, int], dict] = {}
+        self.wake = asyncio.Event()
+        self.lock = asyncio.Lock()
+        self.task: asyncio.Task | None = None
+        self.stopping = False
+        self.submitted = 0
+        self.coalesced = 0
+        self.written = 0
+        self.flushes = 0
+        self.failures = 0
+
+    def submit(self, validation: dict, ip_address: str) -> None:
+        """The function `submit` queues a `LabelsValidator` payload of `ip_address`."""
+        key = (ip_address, validation["image_id"])
+        if key in self.pending:
+            self.coalesced += 1
+        self.pending[key] = validation
+        self.submitted += 1
+        if len(self.pending) >= self.max_items:
+            self.wake.set()
+
+    async def write(self, validations: list[dict], ip_address: str) -> list[dict]:
+        """
+        The function `write` writes validations right away with the writer of the buffer. It waits for
+        a flush in progress and drops the pending validations of the same entries, which are older,
+        so no flush can overwrite the newer labels.
+
+        :return: The result of the writer.
+        """
+        async with self.lock:
+            for validation in validations:
+                self.pending.pop((ip_address, validation["image_id"]), None)
+            return await self.writer(validations, ip_address)
+
+    async def flush(self) -> int:
+        """
+        The function `flush` writes the pending validations.
+
+        :return: The number of validations written.
+        """
+        async with self.lock:
+            batch, self.pending = self.pending, {}
+            labelers: dict[str, list[dict]] = {}
+            for (ip_address, _), validation in batch.items():
+                labelers.setdefault(ip_address, []).append(validation)
+
+            written = 0
+            for ip_address, validations in labelers.items():
+                for start in range(0, len(validations), VALIDATION_BULK_MAX_ITEMS):
+                    chunk = validations[start : start + VALIDATION_BULK_MAX_ITEMS]
+                    try:
+                        await self.writer(chunk, ip_address)
+                    except Exception as e:
+                        self.failures += 1
+                        logging.error(
+                            f"[ValidationBuffer] Keeping {len(chunk)} validations of {ip_address}: {e}"
+                        )
+                        for validation in chunk:
+                            self.pending.setdefault(
+                                (ip_address, validation["image_id"]), validation
+                            )
+                        continue
+                    written += len(chunk)
+                    self.flushes += 1
+
+            self.written += written
+            return written
+
+    async def run(self) -> None:
+        while not self.stopping:
+            try:
+                await asyncio.wait_for(
+                    self.wake.wait(), timeout=self.flush_interval / 1000
+                )
+            except asyncio.TimeoutError:
+                pass
+            self.wake.clear()
+            if self.pending and not self.stopping:
+                await self.flush()
+
+    def start(self) -> None:
+        if self.task is None:
+            self.stopping = False
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """The function `stop` ends the background task and writes the pending validations."""
+        if self.task is not None:
+            # Not cancelled, a flush in progress completes before the task returns.
+            self.stopping = True
+            self.wake.set()
+            await self.task
+            self.task = None
+        await self.flush()
+        if self.pending:
+            logging.error(
+                f"[ValidationBuffer] {len(self.pending)} validations not written on shutdown."
+            )
+
+    def statistics(self) -> dict:
+        return {
+            "enabled": self.task is not None,
+            "depth": len(self.pending),
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "written": self.written,
+            "flushes": self.flushes,
+            "failures": self.failures,
+        }
+
+
+validation_buffer = ValidationBuffer()
@@ -17,6 +17,7 @@ def insert_classification_model_card(
     model_path: str,
     trained_image: int,
     unique_id: str,
+    runtime_settings: dict = None,
 ) -> None:
     with database_connection().connect() as session:
         try:
@@ -29,6 +30,7 @@ def insert_classification_model_card(
                 model_name=model_name,
                 model_type=model_type,
                 trained_image=trained_image,
+                **(runtime_settings or {}),
             )
             session.execute(query)
             session.commit()
@@ -75,6 +77,7 @@ def update_model_card_entry(
     finished_task_at: datetime,
     model_type: Literal["classification", "query"],
     trained_image: int,
+    runtime_settings: dict = None,
 ) -> None:
     with database_connection().connect() as session:
         try:
@@ -85,6 +88,7 @@ def update_model_card_entry(
                     started_task_at=started_task_at,
                     finished_task_at=finished_task_at,
                     trained_image=trained_image,
+                    **(runtime_settings or {}),
                 )
             )
             session.execute(query)
@@ -0,0 +1,121 @@
+from sqlalchemy import insert, select
+from services.postgres.connection import database_connection
+from services.postgres.models import ModelCard, ModelTrainingRun, ModelEpochTelemetry
+from utils.custom_errors import DatabaseQueryError, DataNotFoundError
+from utils.logger import logging
+from utils.helper import local_time
+from typing import Literal
+
+
+def insert_training_telemetry(unique_id: str, run: dict, epochs: list[dict]) -> None:
+    """
+    The function `insert_training_telemetry` stores the performance telemetry of one training or
+    fine tuning run and its epochs in a single transaction.
+
+    :param unique_id: The `unique_id` parameter is the `ModelCard.unique_id` of the trained model.
+    :type unique_id: str
+    :param run: The `run` parameter holds the `ModelTrainingRun` columns, including its `run_id`.
+    :type run: dict
+    :param epochs: The `epochs` parameter holds the `ModelEpochTelemetry` columns of every epoch.
+    :type epochs: list[dict]
+    """
+    with database_connection().connect() as session:
+        try:
+            created_at = local_time()
+            session.execute(
+                insert(ModelTrainingRun).values(
+                    created_at=created_at, unique_id=unique_id, **run
+                )
+            )
+            if epochs:
+                session.execute(
+                    insert(ModelEpochTelemetry),
+                    [
+                        {"created_at": created_at, "run_id": run["run_id"], **epoch}
+                        for epoch in epochs
+                    ],
+                )
+            session.commit()
+            logging.info(
+                f"[insert_training_telemetry] Inserted {run['run_type']} telemetry with {len(epochs)} epochs."
+            )
+        except DatabaseQueryError:
+            raise
+        except Exception as e:
+            logging.error(f"[insert_training_telemetry] Error inserting data: {e}")
+            session.rollback()
+            raise DatabaseQueryError(detail="Database query failed.")
+        finally:
+            session.close()
+
+
+async def extract_training_telemetry(
+    model_type: Literal["classification", "query"] | None = None,
+    limit: int = 50,
+    include_epochs: bool = False,
+) -> dict:
+    """
+    The function `extract_training_telemetry` returns the telemetry of the latest runs in
+    chronological order, with a summary of the images/sec and memory trend across them.
+
+    :param model_type: The `model_type` parameter filters the runs by `ModelCard.model_type`.
+    :type model_type: Literal["classification", "query"] | None
+    :param limit: The `limit` parameter is the number of latest runs returned.
+    :type limit: int
+    :param include_epochs: The `include_epochs` parameter adds the per-epoch telemetry of every run.
+    :type include_epochs: bool
+    :return: A dictionary with the "runs" and their "summary".
+    """
+    async with database_connection(connection_type="async").connect() as session:
+        try:
+            query = (
+                select(ModelTrainingRun, ModelCard.model_name, ModelCard.model_type)
+                .join(ModelCard, ModelCard.unique_id == ModelTrainingRun.unique_id)
+                .order_by(ModelTrainingRun.created_at.desc())
+                .limit(limit)
+            )
+            if model_type is not None:
+                query = query.where(ModelCard.model_type == model_type)
+
+            result = await session.execute(query)
+            runs = [dict(row._mapping) for row in reversed(result.fetchall())]
+            if not runs:
+                raise DataNotFoundError(detail="No training telemetry found.")
+
+            if include_epochs:
+                epoch_query = (
+                    select(ModelEpochTelemetry)
+                    .where(
+                        ModelEpochTelemetry.run_id.in_([run["run_id"] for run in runs])
+                    )
+                    .order_by(ModelEpochTelemetry.epoch)
+                )
+                result = await session.execute(epoch_query)
+                epochs = {run["run_id"]: [] for run in runs}
+                for row in result.fetchall():
+                    epochs[row.run_id].append(dict(row._mapping))
+                for run in runs:
+                    run["epoch_details"] = epochs[run["run_id"]]
+
+            throughput = [run["images_per_sec"] or 0.0 for run in runs]
+            summary = {
+                "total_runs": len(runs),
+                "latest_images_per_sec": throughput[-1],
+                "mean_images_per_sec": round(sum(throughput) / len(throughput), 2),
+                "images_per_sec_change": round(throughput[-1] - throughput[0], 2),
+                "max_peak_rss_mb": max(run["peak_rss_mb"] or 0.0 for run in runs),
+            }
+            return {"runs": runs, "summary": summary}
+
+        except DataNotFoundError:
+            raise
+        except DatabaseQueryError:
+            raise
+        except Exception as e:
+            logging.error(
+                f"[extract_training_telemetry] Error while extracting telemetry: {e}"
+            )
+            await session.rollback()
+            raise DatabaseQueryError(detail="Invalid database query.")
+        finally:
+            await session.close()
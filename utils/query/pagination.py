@@ -1,54 +1,241 @@
+import json
+import time
+import base64
+import asyncio
+import binascii
+from typing import Awaitable, Callable, Literal
+from src.secret import Config
 from services.postgres.connection import database_connection
 from services.postgres.models import ImageTag
-from sqlalchemy import select, func
+from sqlalchemy import select, func, exists
 from sqlalchemy.sql import and_
 from utils.logger import logging
-from utils.custom_errors import DataNotFoundError, DatabaseQueryError
+from utils.custom_errors import (
+    DataNotFoundError,
+    DatabaseQueryError,
+    InvalidRequestError,
+)
 from src.schema.response import Pagination
 
+config = Config()
+
+
+def encode_cursor(
+    direction: Literal["next", "prev"], image_id: int, is_validated: bool
+) -> str:
+    """
+    The function `encode_cursor` packs a page boundary into an opaque URL safe token.
+
+    :param direction: The `direction` parameter is "next" for the entries after `image_id`, "prev"
+    for the entries before it.
+    :type direction: Literal["next", "prev"]
+    :param image_id: The `image_id` parameter is the last id of the page for "next", the first one
+    for "prev".
+    :type image_id: int
+    :param is_validated: The `is_validated` parameter is the filter of the paginated entries.
+    :type is_validated: bool
+    :return: The cursor.
+    """
+    payload = json.dumps(
+        {"direction": direction, "id": image_id, "is_validated": is_validated}
+    )
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str, is_validated: bool) -> tuple[str, int]:
+    """
+    The function `decode_cursor` unpacks a cursor of `encode_cursor`.
+
+    :return: A tuple of the direction and the boundary id.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        direction, image_id = payload["direction"], int(payload["id"])
+        cursor_is_validated = payload["is_validated"]
+    except (binascii.Error, ValueError, KeyError, TypeError, UnicodeError):
+        raise InvalidRequestError(detail="Invalid pagination cursor.")
+    if direction not in ("next", "prev") or cursor_is_validated != is_validated:
+        raise InvalidRequestError(detail="Invalid pagination cursor.")
+    return direction, image_id
+
+
+async def count_labeler_entries() -> dict[tuple[str, bool], int]:
+    """
+    The function `count_labeler_entries` counts the `ImageTag` entries of every labeler, an index only
+    scan of `ix_image_tag_labeler_page`.
+
+    :return: The counts keyed by `(ip_address, is_validated)`.
+    """
+    async with database_connection(connection_type="async").connect() as session:
+        try:
+            query = select(
+                ImageTag.ip_address, ImageTag.is_validated, func.count()
+            ).group_by(ImageTag.ip_address, ImageTag.is_validated)
+            result = await session.execute(query)
+            return {
+                (ip_address, is_validated): count
+                for ip_address, is_validated, count in result.fetchall()
+            }
+        except DatabaseQueryError:
+            raise
+        except Exception as e:
+            logging.error(f"[count_labeler_entries] Error while counting entries: {e}")
+            await session.rollback()
+            raise DatabaseQueryError(detail="Invalid database query.")
+        finally:
+            await session.close()
+
+
+class LabelerCounts:
+    """Process wide count of the `ImageTag` entries per `(ip_address, is_validated)`.
+
+    Pages read the cached counts instead of running `COUNT(*)`. Writers adjust them as they insert or
+    validate entries, and `reconcile` reloads them from the table at startup and every
+    `LABELER_COUNT_RECONCILE_SECONDS`. A read of counts older than `LABELER_COUNT_TTL` still serves
+    them and schedules a reconcile in the background, a request never waits for the count. Counts
+    only change on the event loop, no lock needed.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[
+            [], Awaitable[dict[tuple[str, bool], int]]
+        ] = count_labeler_entries,
+        ttl: int = config.LABELER_COUNT_TTL,
+    ) -> None:
+        self.loader = loader
+        self.ttl = ttl
+        self.counts: dict[tuple[str, bool], int] = {}
+        self.loaded_at: float | None = None
+        self.reconcile_task: asyncio.Task | None = None
+
+    async def reconcile(self) -> None:
+        self.counts = await self.loader()
+        self.loaded_at = time.monotonic()
+
+    async def safe_reconcile(self) -> None:
+        try:
+            await self.reconcile()
+        except Exception as e:
+            logging.warning(f"[LabelerCounts] Keeping the cached counts: {e}")
+
+    def get(self, ip_address: str, is_validated: bool) -> int:
+        """
+        The function `get` returns the last known count of the group, scheduling a background
+        reconcile when the counts are missing or older than the TTL.
+        """
+        if self.loaded_at is None or time.monotonic() - self.loaded_at > self.ttl:
+            if self.reconcile_task is None or self.reconcile_task.done():
+                self.reconcile_task = asyncio.create_task(self.safe_reconcile())
+        return self.counts.get((ip_address, is_validated), 0)
+
+    def add(self, ip_address: str, is_validated: bool, count: int) -> None:
+        """The function `add` records `count` entries inserted, or removed when negative, in the group."""
+        if self.loaded_at is None:
+            return
+        key = (ip_address, is_validated)
+        self.counts[key] = max(self.counts.get(key, 0) + count, 0)
+
+
+labeler_counts = LabelerCounts()
+
+
+async def reconcile_labeler_counts(
+    interval: int = config.LABELER_COUNT_RECONCILE_SECONDS,
+) -> None:
+    """
+    The function `reconcile_labeler_counts` reloads the labeler counts every `interval` seconds,
+    correcting the updates made by other workers. Run it as a background task.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        await labeler_counts.safe_reconcile()
+
 
 async def extract_distributed_entries(
-    page: int, image_per_page: int, ip_address: str, is_validated: bool
+    page: int,
+    image_per_page: int,
+    ip_address: str,
+    is_validated: bool,
+    cursor: str | None = None,
 ) -> Pagination:
+    """
+    The function `extract_distributed_entries` returns a page of the entries of a labeler.
+
+    With a `cursor` the page seeks on the `(ip_address, is_validated, id)` index right after or
+    before the boundary of the previous page, so every page costs the same whatever its depth.
+    Without one the page is located by its number, which is slower for deep pages. Both modes
+    return the cursors of the neighbouring pages.
+
+    :param page: The `page` parameter is the page number, ignored when `cursor` is given.
+    :type page: int
+    :param cursor: The `cursor` parameter is a "next_cursor" or "prev_cursor" of a previous page.
+    :type cursor: str | None
+    :return: The page, with "next_cursor" and "prev_cursor" set when such a page exists.
+    """
     response = Pagination()
+    labeler = and_(
+        ImageTag.ip_address == ip_address,
+        ImageTag.is_validated == is_validated,
+    )
 
     async with database_connection(connection_type="async").connect() as session:
         try:
-            skip_entry = [
-                0 if page == 1 else ((image_per_page * page) - image_per_page)
-            ]
-
-            query = (
-                select(ImageTag)
-                .where(
-                    and_(
-                        ImageTag.ip_address == ip_address,
-                        ImageTag.is_validated == is_validated,
-                    )
+            query = select(ImageTag).where(labeler)
+            if cursor is None:
+                skip_entry = [
+                    0 if page == 1 else ((image_per_page * page) - image_per_page)
+                ]
+                query = (
+                    query.limit(image_per_page)
+                    .offset(skip_entry[0])
+                    .order_by(ImageTag.id)
                 )
-                .limit(image_per_page)
-                .offset(skip_entry[0])
-                .order_by(ImageTag.id)
-            )
-
-            total_count_query = (
-                select(func.count())
-                .where(
-                    and_(
-                        ImageTag.ip_address == ip_address,
-                        ImageTag.is_validated == is_validated,
-                    )
+            else:
+                direction, boundary = decode_cursor(
+                    cursor=cursor, is_validated=is_validated
                 )
-                .select_from(ImageTag)
-            )
-            result = await session.execute(total_count_query)
-            total_count = result.scalar_one_or_none()
+                if direction == "next":
+                    query = query.where(ImageTag.id > boundary).order_by(ImageTag.id)
+                else:
+                    query = query.where(ImageTag.id < boundary).order_by(
+                        ImageTag.id.desc()
+                    )
+                query = query.limit(image_per_page)
 
+            total_count = labeler_counts.get(
+                ip_address=ip_address, is_validated=is_validated
+            )
             total_page = (total_count + image_per_page - 1) // image_per_page
 
             result = await session.execute(query)
             rows = result.fetchall()
-            result = [dict(row._mapping) for row in rows]
+            result = sorted(
+                [dict(row._mapping) for row in rows], key=lambda entry: entry["id"]
+            )
+
+            if result:
+                # Two index probes, whatever the page depth.
+                has_prev, has_next = (
+                    await session.execute(
+                        select(
+                            exists().where(labeler, ImageTag.id < result[0]["id"]),
+                            exists().where(labeler, ImageTag.id > result[-1]["id"]),
+                        )
+                    )
+                ).one()
+                if has_prev:
+                    response.prev_cursor = encode_cursor(
+                        direction="prev",
+                        image_id=result[0]["id"],
+                        is_validated=is_validated,
+                    )
+                if has_next:
+                    response.next_cursor = encode_cursor(
+                        direction="next",
+                        image_id=result[-1]["id"],
+                        is_validated=is_validated,
+                    )
 
             if not result:
                 result = None
@@ -62,6 +249,8 @@ async def extract_distributed_entries(
             raise
         except DatabaseQueryError:
             raise
+        except InvalidRequestError:
+            raise
         except Exception as e:
             logging.error(
                 f"[extract_distributed_entries] Error while extracting pagination: {e}"
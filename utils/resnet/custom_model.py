@@ -1,18 +1,26 @@
-import cv2
 import numpy as np
-from PIL import Image
-from tqdm.auto import tqdm
+from copy import copy
 from typing import Literal
 from sklearn.model_selection import train_test_split
 from torchvision.models import ResNet50_Weights
 from torchvision import models
-from torch.nn import Module, Linear
+from torch.nn import Module, Linear, Identity
+from utils.resnet.preprocessing import load_image, normalize_image, decode_images
+from utils.resnet.image_cache import PreprocessedImageCache
 
 
 class CustomDataLoader:
-    def __init__(self, entries: list[dict]) -> None:
+    def __init__(
+        self,
+        entries: list[dict],
+        lazy: bool = False,
+        cache: PreprocessedImageCache | None = None,
+        decode_workers: int | None = None,
+    ) -> None:
         self.images = []
         self.labels = []
+        self.lazy = lazy
+        self.cache = cache
         self.x_train = None
         self.x_val = None
         self.x_test = None
@@ -24,22 +32,37 @@ class CustomDataLoader:
         self.test_size = None
         self.mode: Literal["train", "valid", "test"] = "train"
 
-        for record in tqdm(iterable=entries, desc="Loading entries."):
-            filepath = record["filepath"]
-            label_values = list(record.values())[5:-2]
-
+        filepaths = [record["filepath"] for record in entries]
+        labels = [list(record.values())[5:-2] for record in entries]
+
+        if self.lazy:
+            # Only keep file paths, images are decoded on demand in __getitem__.
+            skipped = set()
+            if self.cache is not None:
+                skipped = set(
+                    self.cache.warm(filepaths=filepaths, max_workers=decode_workers)
+                )
+
+            for filepath, label_values in zip(filepaths, labels):
+                if filepath not in skipped:
+                    self.images.append(filepath)
+                    self.labels.append(label_values)
+
+            self.images = np.array(self.images)
+            self.labels = np.array(self.labels)
+            return
+
+        decoded_images = decode_images(filepaths=filepaths, max_workers=decode_workers)
+        for (_, image), label_values in zip(decoded_images, labels):
+            if image is None:
+                continue
+            self.images.append(normalize_image(image))
             self.labels.append(label_values)
 
-            img = Image.open(filepath).convert("RGB")
-            array = np.array(img)
-            resized_image = cv2.resize(array, (224, 224))
-            image = resized_image.reshape((3, 224, 224))
-            self.images.append(image)
-
-        self.images = np.array(self.images) / 255
+        self.images = np.array(self.images, dtype=np.float32)
         self.labels = np.array(self.labels)
 
-    def splitter(self) -> None:
+    def splitter(self, random_state: int | None = None) -> None:
         """
         The function `splitter` splits the images and labels data into training, testing, and validation
         sets using the `train_test_split` function.
@@ -48,18 +71,34 @@ class CustomDataLoader:
         of the dataset to include in the test split. It is a float value between 0.0 and 1.0 and
         represents the fraction of the dataset to be included in the test split. For example, if
         :type test_size: int
+        :param random_state: The `random_state` parameter seeds the split, processes of a distributed
+        run must share it to train on the same partitions.
+        :type random_state: int | None
         """
         self.x_train, self.x_test, self.y_train, self.y_test = train_test_split(
-            self.images, self.labels, test_size=0.1
+            self.images, self.labels, test_size=0.1, random_state=random_state
         )
         self.x_train, self.x_val, self.y_train, self.y_val = train_test_split(
-            self.x_train, self.y_train, test_size=0.1
+            self.x_train, self.y_train, test_size=0.1, random_state=random_state
         )
 
         self.train_size = self.x_train.shape[0]
         self.val_size = self.x_val.shape[0]
         self.test_size = self.x_test.shape[0]
 
+    def partition(self, mode: Literal["train", "valid", "test"]) -> "CustomDataLoader":
+        """
+        This function returns a shallow copy of the dataset pinned to a single mode, so every phase
+        can be served by its own `DataLoader` while sharing the underlying split arrays.
+
+        :param mode: The `mode` parameter selects the split served by the returned dataset.
+        :type mode: Literal["train", "valid", "test"]
+        :return: A `CustomDataLoader` sharing the data of the current instance.
+        """
+        partition = copy(self)
+        partition.mode = mode
+        return partition
+
     def label_details(self) -> int:
         """
         This function returns the length of the first element in the 'labels' attribute of the object.
@@ -83,6 +122,20 @@ class CustomDataLoader:
             return self.x_val.shape[0]
         return self.x_train.shape[0]
 
+    def load(self, filepath: str) -> np.ndarray:
+        """
+        This function decodes a single image in lazy mode, reading it from the preprocessed image
+        cache when available and falling back to decoding the original file.
+
+        :param filepath: The `filepath` parameter is the path of the image to load.
+        :type filepath: str
+        :return: A normalized `float32` array with shape (3, 224, 224).
+        """
+        image = self.cache.get(filepath=filepath) if self.cache is not None else None
+        if image is None:
+            image = load_image(filepath=filepath)
+        return normalize_image(image)
+
     def __getitem__(self, index) -> dict:
         """
         This function returns a dictionary containing image and label data based on the mode specified.
@@ -94,16 +147,25 @@ class CustomDataLoader:
         containing the corresponding data based on the mode specified ("test", "valid", or default).
         """
         if self.mode == "test":
-            return {"image": self.x_test[index], "labels": self.y_test[index]}
-        if self.mode == "valid":
-            return {"image": self.x_val[index], "labels": self.y_val[index]}
-        return {"image": self.x_train[index], "labels": self.y_train[index]}
+            image, labels = self.x_test[index], self.y_test[index]
+        elif self.mode == "valid":
+            image, labels = self.x_val[index], self.y_val[index]
+        else:
+            image, labels = self.x_train[index], self.y_train[index]
+
+        if self.lazy:
+            image = self.load(filepath=str(image))
+
+        return {"image": image, "labels": labels}
 
 
 class CustomResNet50Classifier(Module):
-    def __init__(self, num_labels: int) -> None:
+    def __init__(self, num_labels: int, pretrained: bool = True) -> None:
         super(CustomResNet50Classifier, self).__init__()
-        self.custom_resnet50_model = models.resnet50(weights=ResNet50_Weights.DEFAULT)
+        # Skip the ImageNet weights when a state dict is loaded right after, or in benchmarks.
+        self.custom_resnet50_model = models.resnet50(
+            weights=ResNet50_Weights.DEFAULT if pretrained else None
+        )
         self.in_features = self.custom_resnet50_model.fc.in_features
         self.custom_resnet50_model.fc = Linear(
             in_features=self.in_features, out_features=num_labels
@@ -111,3 +173,13 @@ class CustomResNet50Classifier(Module):
 
     def forward(self, image):
         return self.custom_resnet50_model(image)
+
+    def extract_features(self, image):
+        """Run every layer except the classifier head and return the 2048-d penultimate features."""
+        resnet = self.custom_resnet50_model
+        head = resnet.fc
+        resnet.fc = Identity()
+        try:
+            return resnet(image)
+        finally:
+            resnet.fc = head
@@ -0,0 +1,116 @@
+import os
+import random
+import socket
+import torch
+import torch.distributed as dist
+from typing import Any
+from pathlib import Path
+from contextlib import contextmanager
+from torch.utils.data import DataLoader, DistributedSampler
+from utils.logger import logging
+
+
+def is_distributed() -> bool:
+    """The function `is_distributed` returns `True` when running inside an initialized process group."""
+    return dist.is_available() and dist.is_initialized()
+
+
+def is_main_process() -> bool:
+    """
+    The function `is_main_process` returns `True` for the single process allowed to write the model,
+    the model card and the accuracy rows (rank 0, or the only process when not distributed).
+    """
+    return not is_distributed() or dist.get_rank() == 0
+
+
+def world_size() -> int:
+    """The function `world_size` returns the number of training processes, `1` when not distributed."""
+    return dist.get_world_size() if is_distributed() else 1
+
+
+def unpadded_size(dataloader: DataLoader) -> int:
+    """
+    The function `unpadded_size` returns the number of distinct samples the process evaluates.
+    `DistributedSampler` pads the shards to the same length with repeated samples, without shuffling
+    the repeats are the last samples of a shard and are left out of the metrics.
+    """
+    sampler = dataloader.sampler
+    if isinstance(sampler, DistributedSampler) and not sampler.shuffle:
+        return len(range(sampler.rank, len(sampler.dataset), sampler.num_replicas))
+    return len(sampler)
+
+
+def init_distributed() -> None:
+    """
+    The function `init_distributed` joins the gloo process group described by the `RANK`,
+    `WORLD_SIZE`, `MASTER_ADDR` and `MASTER_PORT` environment variables set by `torchrun`.
+    """
+    if is_distributed() or int(os.getenv("WORLD_SIZE", "1")) < 2:
+        return
+
+    dist.init_process_group(backend="gloo")
+    logging.info(
+        f"[init_distributed] Joined process group as rank {dist.get_rank()}/{dist.get_world_size()}."
+    )
+
+
+def cleanup_distributed() -> None:
+    if is_distributed():
+        dist.destroy_process_group()
+
+
+@contextmanager
+def local_main_first():
+    """
+    The function `local_main_first` lets the first process of every host run the block before the
+    other processes of the same host, e.g. to fill the on-disk image cache only once per host.
+    """
+    is_local_main = int(os.getenv("LOCAL_RANK", "0")) == 0
+    if is_distributed() and not is_local_main:
+        dist.barrier()
+    yield
+    if is_distributed() and is_local_main:
+        dist.barrier()
+
+
+def host_directory(directory: str | Path) -> Path:
+    """
+    The function `host_directory` returns the sub-directory of `directory` owned by the current host.
+    `local_main_first` lets one process per host write, hosts sharing a NAS directory would otherwise
+    write the same files.
+    """
+    return Path(directory) / socket.gethostname()
+
+
+def broadcast_object(obj: Any) -> Any:
+    """The function `broadcast_object` sends a picklable object from rank 0 to every process."""
+    if not is_distributed():
+        return obj
+    container = [obj if dist.get_rank() == 0 else None]
+    dist.broadcast_object_list(container, src=0)
+    return container[0]
+
+
+def shared_random_state() -> int | None:
+    """
+    The function `shared_random_state` returns a seed identical on every process, so the
+    train/validation/test split is the same on every rank. Returns `None` when not distributed.
+    """
+    if not is_distributed():
+        return None
+    return broadcast_object(random.randint(0, 2**31 - 1))
+
+
+def all_reduce_sum(values: list[float]) -> list[float]:
+    """The function `all_reduce_sum` sums `values` element-wise across every process."""
+    if not is_distributed():
+        return values
+    tensor = torch.tensor(values, dtype=torch.float64)
+    dist.all_reduce(tensor, op=dist.ReduceOp.SUM)
+    return tensor.tolist()
+
+
+def all_reduce_mean(values: list[float]) -> float:
+    """The function `all_reduce_mean` averages per-batch values across every process."""
+    total, count = all_reduce_sum([float(sum(values)), float(len(values))])
+    return total / max(count, 1)
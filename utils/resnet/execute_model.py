@@ -1,4 +1,5 @@
 import os
+import time
 import torch
 import numpy as np
 from uuid import uuid4
@@ -8,12 +9,49 @@ from typing import Literal
 from petname import generate
 from datetime import datetime
 from torch.optim import Adam
+from torch.optim.lr_scheduler import ReduceLROnPlateau
 from utils.logger import logging
-from torch.utils.data import DataLoader
+from src.secret import Config
+from torch.utils.data import DataLoader, DistributedSampler
 from torch.nn import BCEWithLogitsLoss
+from sklearn.model_selection import train_test_split
 from utils.query.model_accuracy import insert_test_accuracy
-from utils.helper import label_distribution
+from utils.query.model_telemetry import insert_training_telemetry
+from utils.helper import in_daemon_process, label_distribution
 from utils.resnet.custom_model import CustomDataLoader, CustomResNet50Classifier
+from utils.resnet.image_cache import PreprocessedImageCache
+from utils.resnet.profiler import (
+    StageProfiler,
+    allocator_stats,
+    peak_rss_mb,
+    stage,
+    timed_batches,
+)
+from utils.resnet.distributed import (
+    all_reduce_mean,
+    all_reduce_sum,
+    broadcast_object,
+    host_directory,
+    is_distributed,
+    is_main_process,
+    local_main_first,
+    shared_random_state,
+    unpadded_size,
+    world_size,
+)
+from utils.resnet.runtime import (
+    RuntimeSettings,
+    autocast,
+    optimize_model,
+    runtime_settings,
+    to_device,
+)
+from utils.resnet.feature_cache import (
+    BackboneFeatureCache,
+    FeatureDataset,
+    backbone_version,
+    extract_backbone_features,
+)
 from utils.query.image_tag import extract_image_tag_entries, update_image_tag_is_trained
 from utils.query.model_card import (
     insert_classification_model_card,
@@ -21,6 +59,15 @@ from utils.query.model_card import (
     update_model_card_entry,
 )
 
+config = Config()
+
+
+def image_cache() -> PreprocessedImageCache:
+    return PreprocessedImageCache(
+        cache_dir=host_directory(directory=config.IMAGE_CACHE_DIR),
+        max_bytes=config.IMAGE_CACHE_MAX_BYTES,
+    )
+
 
 def save_model(model: CustomResNet50Classifier, model_name: str) -> str:
     model_directory = Path("/home/dfactory/Project/DiVA/models")
@@ -37,51 +84,250 @@ def save_model(model: CustomResNet50Classifier, model_name: str) -> str:
     return str(model_path)
 
 
+def training_telemetry(
+    profiler: StageProfiler,
+    settings: RuntimeSettings,
+    device: Literal["cpu", "cuda"],
+    run_type: Literal["train", "fine_tune_full", "fine_tune_head"],
+    batch_size: int,
+    trained_image: int,
+) -> dict:
+    """
+    The function `training_telemetry` summarizes the epochs recorded by `profiler` into the
+    `ModelTrainingRun` columns persisted by `insert_training_telemetry`.
+    """
+    duration = sum(epoch["duration_seconds"] for epoch in profiler.epochs)
+    trained_images = sum(
+        epoch["images_per_sec"] * epoch["duration_seconds"] for epoch in profiler.epochs
+    )
+    return {
+        "run_id": str(uuid4()),
+        "run_type": run_type,
+        "device": device,
+        "world_size": world_size(),
+        "batch_size": batch_size,
+        "precision": settings.precision,
+        "intra_op_threads": settings.intra_op_threads,
+        "inter_op_threads": settings.inter_op_threads,
+        "trained_image": trained_image,
+        "epochs": len(profiler.epochs),
+        "duration_seconds": round(duration, 3),
+        "images_per_sec": round(trained_images / duration, 2) if duration else 0.0,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "peak_allocated_mb": allocator_stats().get("peak_allocated_mb"),
+    }
+
+
+def save_training_telemetry(unique_id: str, run: dict, epochs: list[dict]) -> None:
+    """
+    The function `save_training_telemetry` stores the telemetry of a finished run. A failed write is
+    only logged, the model and its images are already saved and must not be trained again.
+    """
+    try:
+        insert_training_telemetry(unique_id=unique_id, run=run, epochs=epochs)
+    except Exception as e:
+        logging.error(f"[save_training_telemetry] Telemetry of {unique_id} lost: {e}")
+
+
+def build_dataloaders(
+    dataset: CustomDataLoader, device: Literal["cpu", "cuda"]
+) -> dict[str, DataLoader]:
+    """
+    The function `build_dataloaders` creates one mini-batch `DataLoader` per phase, each bound to its
+    own partition of the dataset, configured from `TRAIN_BATCH_SIZE` and the `DATALOADER_*`
+    settings. Batches are loaded in the calling process when it is daemonic, such as a Celery task.
+
+    :param dataset: The `dataset` parameter is a `CustomDataLoader` that has already been split.
+    :type dataset: CustomDataLoader
+    :param device: The `device` parameter decides whether host memory should be pinned.
+    :type device: Literal["cpu", "cuda"]
+    :return: A dictionary with "train", "valid" and "test" dataloaders.
+    """
+    num_workers = config.DATALOADER_NUM_WORKERS
+    if num_workers > 0 and in_daemon_process():
+        # Celery prefork tasks are daemonic and cannot start the DataLoader worker processes.
+        logging.warning(
+            "[build_dataloaders] Loading batches in the training process, daemonic processes cannot start DataLoader workers."
+        )
+        num_workers = 0
+
+    workers_options = {}
+    if num_workers > 0:
+        workers_options = {
+            "prefetch_factor": config.DATALOADER_PREFETCH_FACTOR,
+            "persistent_workers": config.DATALOADER_PERSISTENT_WORKERS,
+        }
+
+    dataloaders = {}
+    for mode in ("train", "valid", "test"):
+        partition = dataset.partition(mode=mode)
+        sampler = None
+        if is_distributed():
+            # Every process only iterates over its own shard of the partition.
+            sampler = DistributedSampler(dataset=partition, shuffle=mode == "train")
+
+        dataloaders[mode] = DataLoader(
+            dataset=partition,
+            batch_size=config.TRAIN_BATCH_SIZE,
+            shuffle=mode == "train" and sampler is None,
+            sampler=sampler,
+            num_workers=num_workers,
+            pin_memory=config.DATALOADER_PIN_MEMORY and device == "cuda",
+            **workers_options,
+        )
+    return dataloaders
+
+
+def prepare_dataset(entries: list[dict]) -> CustomDataLoader:
+    """
+    The function `prepare_dataset` builds the lazy, cached and split dataset of a training run. In a
+    distributed run the image cache is filled once per host and every process gets the same split.
+    """
+    with local_main_first():
+        dataset = CustomDataLoader(
+            entries=entries,
+            lazy=True,
+            cache=image_cache(),
+            decode_workers=config.IMAGE_DECODE_WORKERS,
+        )
+    dataset.splitter(random_state=shared_random_state())
+    return dataset
+
+
 def train_validate_resnet(
     device: Literal["cpu", "cuda"],
-    dataset: CustomDataLoader,
-    dataloader: DataLoader,
+    train_dataloader: DataLoader,
+    val_dataloader: DataLoader,
     model: CustomResNet50Classifier,
     epochs: int,
     optimizer: optim,
+    patience: int = config.EARLY_STOPPING_PATIENCE,
+    min_delta: float = config.EARLY_STOPPING_MIN_DELTA,
+    settings: RuntimeSettings | None = None,
+    profiler: StageProfiler | None = None,
 ) -> CustomResNet50Classifier:
+    """
+    The function `train_validate_resnet` trains the model for at most `epochs` epochs, lowering the
+    learning rate whenever the validation loss plateaus and stopping once it has not improved by
+    `min_delta` for `patience` epochs. The weights of the best validation epoch are restored before
+    returning, so they are the ones persisted by `save_model`.
+
+    :param patience: The `patience` parameter is the number of epochs without improvement tolerated
+    before stopping, `0` disables early stopping.
+    :type patience: int
+    :param min_delta: The `min_delta` parameter is the minimum decrease of the validation loss
+    counted as an improvement.
+    :type min_delta: float
+    :param settings: The `settings` parameter enables bfloat16 autocast and channels_last inputs.
+    :type settings: RuntimeSettings | None
+    :param profiler: The `profiler` parameter records the batch loading and step time of each phase.
+    :type profiler: StageProfiler | None
+    :return: The model loaded with its best validation weights.
+    """
+    criterion = BCEWithLogitsLoss()
+    non_blocking = train_dataloader.pin_memory
+    scheduler = ReduceLROnPlateau(
+        optimizer=optimizer,
+        mode="min",
+        factor=config.LR_SCHEDULER_FACTOR,
+        patience=config.LR_SCHEDULER_PATIENCE,
+    )
+
+    best_loss = float("inf")
+    best_state = None
+    best_epoch = 0
+
     for epoch in range(epochs):
+        if isinstance(train_dataloader.sampler, DistributedSampler):
+            train_dataloader.sampler.set_epoch(epoch)
+
+        epoch_started_at = time.perf_counter()
         train_loss = []
         model.train()
-        for entry in dataloader:
-            optimizer.zero_grad()
-            image = entry["image"].to(device, dtype=torch.float)
-            labels = entry["labels"].to(device, dtype=torch.float)
-            y_hat = model(image)
-            error = BCEWithLogitsLoss()
-            loss = torch.sum(error(y_hat, labels))
-            loss.backward()
-            optimizer.step()
-            train_loss.append(loss.item())
+        for entry in timed_batches(train_dataloader, profiler, name="train_data"):
+            with stage(profiler, name="train_step", images=len(entry["labels"])):
+                optimizer.zero_grad()
+                image = to_device(
+                    entry["image"], device, settings=settings, non_blocking=non_blocking
+                )
+                labels = to_device(entry["labels"], device, non_blocking=non_blocking)
+                with autocast(device=device, settings=settings):
+                    y_hat = model(image)
+                loss = criterion(y_hat.float(), labels)
+                loss.backward()
+                optimizer.step()
+                train_loss.append(loss.item())
 
         val_loss = []
-        dataset.mode = "valid"
+        remaining = unpadded_size(dataloader=val_dataloader)
         model.eval()
         with torch.no_grad():
-            for data in dataloader:
-                image = data["image"].to(device, dtype=torch.float)
-                labels = data["labels"].to(device, dtype=torch.float)
-                y_hat = model(image)
-                error = BCEWithLogitsLoss()
-                loss = torch.sum(error(y_hat, labels))
-                val_loss.append(loss.item())
+            for data in timed_batches(val_dataloader, profiler, name="valid_data"):
+                with stage(profiler, name="valid_step", images=len(data["labels"])):
+                    image = to_device(
+                        data["image"],
+                        device,
+                        settings=settings,
+                        non_blocking=non_blocking,
+                    )
+                    labels = to_device(
+                        data["labels"], device, non_blocking=non_blocking
+                    )
+                    with autocast(device=device, settings=settings):
+                        y_hat = model(image)
+                    # Every rank runs the same batches, the padding repeats are not scored.
+                    kept = min(len(labels), remaining)
+                    remaining -= kept
+                    if kept:
+                        loss = criterion(y_hat[:kept].float(), labels[:kept])
+                        val_loss.append(loss.item())
+
+        # Averaged across processes so every rank takes the same early stopping decision
+        epoch_val_loss = all_reduce_mean(values=val_loss)
+        scheduler.step(epoch_val_loss)
 
         logging.info(
-            f"Epoch {epoch+1}\t train loss {np.mean(train_loss):.4}\t validation loss {np.mean(val_loss):.4}"
+            f"Epoch {epoch + 1}\t train loss {np.mean(train_loss):.4}\t validation loss {epoch_val_loss:.4}\t lr {optimizer.param_groups[0]['lr']:.2e}"
         )
 
+        if profiler is not None:
+            epoch_seconds = time.perf_counter() - epoch_started_at
+            # Every process trains on its own shard, so the sampler length is per process
+            trained_images = len(train_dataloader.sampler) * world_size()
+            profiler.record_epoch(
+                epoch=epoch + 1,
+                duration_seconds=round(epoch_seconds, 3),
+                images_per_sec=round(trained_images / epoch_seconds, 2),
+                train_loss=float(np.mean(train_loss)),
+                val_loss=epoch_val_loss,
+                learning_rate=optimizer.param_groups[0]["lr"],
+            )
+
+        if epoch_val_loss < best_loss - min_delta:
+            best_loss = epoch_val_loss
+            best_epoch = epoch
+            best_state = {
+                key: value.detach().clone() for key, value in model.state_dict().items()
+            }
+        elif patience and epoch - best_epoch >= patience:
+            logging.info(
+                f"[train_validate_resnet] Early stopping at epoch {epoch + 1}, no improvement since epoch {best_epoch + 1}."
+            )
+            break
+
+    if best_state is not None:
+        logging.info(
+            f"[train_validate_resnet] Restoring best weights from epoch {best_epoch + 1} (validation loss {best_loss:.4})."
+        )
+        model.load_state_dict(best_state)
+
     return model
 
 
 def load_resnet(
     num_labels: int, model_path: str, device: Literal["cuda", "gpu"]
 ) -> CustomResNet50Classifier:
-    loaded_model = CustomResNet50Classifier(num_labels=num_labels)
+    loaded_model = CustomResNet50Classifier(num_labels=num_labels, pretrained=False)
     loaded_model.load_state_dict(torch.load(model_path, weights_only=True))
     loaded_model = loaded_model.to(device)
     return loaded_model.eval()
@@ -89,27 +335,36 @@ def load_resnet(
 
 def predicting_resnet(
     device: Literal["cpu", "cuda"],
-    dataset: CustomDataLoader,
     dataloader: DataLoader,
     model: CustomResNet50Classifier,
+    settings: RuntimeSettings | None = None,
+    profiler: StageProfiler | None = None,
 ) -> float:
-    dataset.mode = "test"
     model.eval()
 
     correct_predictions = 0
     total_predictions = 0
+    remaining = unpadded_size(dataloader=dataloader)
 
     with torch.no_grad():
-        for data in dataloader:
-            image = data["image"].to(device, dtype=torch.float)
-            labels = data["labels"].to(device, dtype=torch.float)
-            y_hat = model(image)
-            y_prob = torch.sigmoid(y_hat)
-            y_pred = (y_prob > 0.5).float()
-
-            correct_predictions += (y_pred == labels).sum().item()
-            total_predictions += labels.numel()
-
+        for data in timed_batches(dataloader, profiler, name="test_data"):
+            with stage(profiler, name="test_step", images=len(data["labels"])):
+                image = to_device(data["image"], device, settings=settings)
+                labels = to_device(data["labels"], device)
+                with autocast(device=device, settings=settings):
+                    y_hat = model(image)
+                kept = min(len(labels), remaining)
+                remaining -= kept
+                y_hat, labels = y_hat[:kept], labels[:kept]
+                y_prob = torch.sigmoid(y_hat.float())
+                y_pred = (y_prob > 0.5).float()
+
+                correct_predictions += (y_pred == labels).sum().item()
+                total_predictions += labels.numel()
+
+    correct_predictions, total_predictions = all_reduce_sum(
+        values=[correct_predictions, total_predictions]
+    )
     test_accuracy = correct_predictions / total_predictions * 100
     logging.info(f"Test Accuracy: {test_accuracy:.2f}%")
     return float(f"{test_accuracy:.2f}")
@@ -120,15 +375,20 @@ def custom_resnet50_trainer(epochs: int = 250) -> None:
     model_path = f"/home/dfactory/Project/DiVA/models/{model_name}.pth"
 
     device = "cuda" if torch.cuda.is_available() else "cpu"
+    settings = runtime_settings(device=device)
 
     # Start task
     started_task_at = datetime.now()
 
     # Model unique id
     unique_id = str(uuid4())
+    profiler = StageProfiler()
 
-    # Data preparation
-    entries = extract_image_tag_entries()
+    # Data preparation, queried once and shared with every process
+    with profiler.stage(name="extract_entries"):
+        entries = broadcast_object(
+            extract_image_tag_entries() if is_main_process() else None
+        )
     if not entries:
         logging.info("[custom_resnet50_trainer] Skip training.")
     elif len(entries) < 10:
@@ -137,34 +397,46 @@ def custom_resnet50_trainer(epochs: int = 250) -> None:
         )
     else:
         label_distribution(entries=entries)
-        dataset = CustomDataLoader(entries=entries)
-        dataset.splitter()
+        with profiler.stage(name="prepare_dataset", images=len(entries)):
+            dataset = prepare_dataset(entries=entries)
         labels = dataset.label_details()
 
         # Prepare dataloaders
-        dataloader = DataLoader(dataset=dataset, shuffle=True)
+        dataloaders = build_dataloaders(dataset=dataset, device=device)
 
         # Initialize model
         model = CustomResNet50Classifier(num_labels=labels)
         model = model.to(device=device)
-        optimizer = Adam(params=model.parameters(), lr=1e-5)
+        optimized_model = optimize_model(model=model, settings=settings)
+        optimizer = Adam(params=model.parameters(), lr=config.TRAIN_LEARNING_RATE)
 
         # Training, Validation, and Testing (async)
-        trained_model = train_validate_resnet(
-            dataset=dataset,
+        train_validate_resnet(
             device=device,
-            dataloader=dataloader,
-            model=model,
+            train_dataloader=dataloaders["train"],
+            val_dataloader=dataloaders["valid"],
+            model=optimized_model,
             epochs=epochs,
             optimizer=optimizer,
+            settings=settings,
+            profiler=profiler,
         )
 
         test_accuracy = predicting_resnet(
-            device=device, dataset=dataset, dataloader=dataloader, model=trained_model
+            device=device,
+            dataloader=dataloaders["test"],
+            model=optimized_model,
+            settings=settings,
+            profiler=profiler,
         )
 
+        if not is_main_process():
+            return
+
         # Saving model into local project directory
-        model_path = save_model(model=trained_model, model_name=model_name)
+        with profiler.stage(name="save_model"):
+            model_path = save_model(model=model, model_name=model_name)
+        profiler.log(prefix="custom_resnet50_trainer")
 
         # Finished task
         finished_task_at = datetime.now()
@@ -177,16 +449,116 @@ def custom_resnet50_trainer(epochs: int = 250) -> None:
             model_name=model_name,
             model_path=model_path,
             trained_image=dataset.train_size,
+            runtime_settings=settings.model_dump(),
         )
 
         insert_test_accuracy(unique_id=unique_id, test_accuracy=test_accuracy)
         update_image_tag_is_trained(entries=entries)
+        save_training_telemetry(
+            unique_id=unique_id,
+            run=training_telemetry(
+                profiler=profiler,
+                settings=settings,
+                device=device,
+                run_type="train",
+                batch_size=config.TRAIN_BATCH_SIZE,
+                trained_image=dataset.train_size,
+            ),
+            epochs=profiler.epochs,
+        )
 
 
-def custom_resnet50_fine_tuner(epochs: int = 250) -> None:
-    cls_model = extract_models_card_entry(model_type="classification")
-    entries = extract_image_tag_entries()
+def fine_tune_resnet_head(
+    model: CustomResNet50Classifier,
+    entries: list[dict],
+    device: Literal["cpu", "cuda"],
+    epochs: int,
+    settings: RuntimeSettings | None = None,
+    profiler: StageProfiler | None = None,
+) -> tuple[CustomResNet50Classifier, float | None, int]:
+    """
+    The function `fine_tune_resnet_head` keeps the backbone frozen and only trains the `Linear` head
+    on cached penultimate features, computing features solely for images not seen before by the
+    current backbone version.
+
+    :param entries: The `entries` parameter is the list of every validated `ImageTag` row.
+    :type entries: list[dict]
+    :return: A tuple of the model with its updated head, the test accuracy and the number of
+    training images, `None` and `0` when no image could be decoded.
+    """
+    feature_cache = BackboneFeatureCache(
+        cache_dir=config.FEATURE_CACHE_DIR, version=backbone_version(model=model)
+    )
+    with stage(profiler, name="extract_features", images=len(entries)):
+        features = extract_backbone_features(
+            model=model,
+            settings=settings,
+            entries=entries,
+            feature_cache=feature_cache,
+            device=device,
+            batch_size=config.TRAIN_BATCH_SIZE,
+            decode_workers=config.IMAGE_DECODE_WORKERS,
+        )
+
+    entries = [entry for entry in entries if entry["id"] in features]
+    if not entries:
+        logging.warning("[fine_tune_resnet_head] No decodable image to train on.")
+        return model, None, 0
+    x = np.stack([features[entry["id"]] for entry in entries])
+    y = np.array([list(entry.values())[5:-2] for entry in entries])
+
+    x_train, x_test, y_train, y_test = train_test_split(x, y, test_size=0.1)
+    x_train, x_val, y_train, y_val = train_test_split(x_train, y_train, test_size=0.1)
+
+    dataloaders = {
+        mode: DataLoader(
+            dataset=FeatureDataset(features=x_split, labels=y_split),
+            batch_size=config.HEAD_BATCH_SIZE,
+            shuffle=mode == "train",
+        )
+        for mode, x_split, y_split in (
+            ("train", x_train, y_train),
+            ("valid", x_val, y_val),
+            ("test", x_test, y_test),
+        )
+    }
+
+    head = model.custom_resnet50_model.fc
+    optimizer = Adam(params=head.parameters(), lr=config.HEAD_LEARNING_RATE)
+    train_validate_resnet(
+        device=device,
+        train_dataloader=dataloaders["train"],
+        val_dataloader=dataloaders["valid"],
+        model=head,
+        epochs=epochs,
+        optimizer=optimizer,
+        settings=settings,
+        profiler=profiler,
+    )
+    test_accuracy = predicting_resnet(
+        device=device,
+        dataloader=dataloaders["test"],
+        model=head,
+        settings=settings,
+        profiler=profiler,
+    )
+    return model, test_accuracy, x_train.shape[0]
+
+
+def custom_resnet50_fine_tuner(
+    epochs: int = 250, mode: Literal["full", "head"] = config.FINE_TUNE_MODE
+) -> None:
+    cls_model, entries = broadcast_object(
+        (
+            extract_models_card_entry(model_type="classification"),
+            extract_image_tag_entries(),
+        )
+        if is_main_process()
+        else None
+    )
     device = "cuda" if torch.cuda.is_available() else "cpu"
+    settings = runtime_settings(device=device)
+    profiler = StageProfiler()
     if not entries:
         logging.info("[custom_resnet50_fine_tuner] No updated validated data.")
     elif len(entries) < 10:
@@ -202,36 +574,73 @@ def custom_resnet50_fine_tuner(epochs: int = 250) -> None:
 
         # Data preparation
         label_distribution(entries=entries)
-        dataset = CustomDataLoader(entries=entries)
-        dataset.splitter()
-        labels = dataset.label_details()
-        trained_image = dataset.train_size + cls_model.trained_image
-
-        # Prepare dataloaders
-        dataloader = DataLoader(dataset=dataset, shuffle=True)
+        labels = len(list(entries[0].values())[5:-2])
 
         # Load resnet model
         model = load_resnet(
             num_labels=labels, model_path=cls_model.model_path, device=device
         )
-        optimizer = Adam(params=model.parameters(), lr=1e-5)
-
-        # Training, Validation, and Testing (async)
-        trained_model = train_validate_resnet(
-            dataset=dataset,
-            device=device,
-            dataloader=dataloader,
-            model=model,
-            epochs=epochs,
-            optimizer=optimizer,
-        )
 
-        test_accuracy = predicting_resnet(
-            device=device, dataset=dataset, dataloader=dataloader, model=trained_model
-        )
+        if mode == "head" and is_distributed():
+            raise ValueError("Head only fine tuning must run in a single process.")
+        if mode == "head":
+            # Head only, trained on every validated image with cached backbone features
+            logging.info(
+                "[custom_resnet50_fine_tuner] Fine tuning classifier head only."
+            )
+            model, test_accuracy, trained_image = fine_tune_resnet_head(
+                model=model,
+                entries=extract_image_tag_entries(is_trained=None),
+                device=device,
+                epochs=epochs,
+                settings=settings,
+                profiler=profiler,
+            )
+            if not trained_image:
+                return None
+            batch_size = config.HEAD_BATCH_SIZE
+            run_trained_image = trained_image
+        else:
+            with profiler.stage(name="prepare_dataset", images=len(entries)):
+                dataset = prepare_dataset(entries=entries)
+            trained_image = dataset.train_size + cls_model.trained_image
+            batch_size = config.TRAIN_BATCH_SIZE
+            run_trained_image = dataset.train_size
+
+            # Prepare dataloaders
+            dataloaders = build_dataloaders(dataset=dataset, device=device)
+            optimized_model = optimize_model(model=model, settings=settings)
+            optimizer = Adam(
+                params=model.parameters(), lr=config.FINE_TUNE_LEARNING_RATE
+            )
+
+            # Training, Validation, and Testing (async)
+            train_validate_resnet(
+                device=device,
+                train_dataloader=dataloaders["train"],
+                val_dataloader=dataloaders["valid"],
+                model=optimized_model,
+                epochs=epochs,
+                optimizer=optimizer,
+                settings=settings,
+                profiler=profiler,
+            )
+
+            test_accuracy = predicting_resnet(
+                device=device,
+                dataloader=dataloaders["test"],
+                model=optimized_model,
+                settings=settings,
+                profiler=profiler,
+            )
+
+        if not is_main_process():
+            return
 
         # Updating model into local project directory
-        save_model(model=trained_model, model_name=cls_model.model_name)
+        with profiler.stage(name="save_model"):
+            save_model(model=model, model_name=cls_model.model_name)
+        profiler.log(prefix="custom_resnet50_fine_tuner")
 
         # Finished task
         finished_task_at = datetime.now()
@@ -242,8 +651,21 @@ def custom_resnet50_fine_tuner(epochs: int = 250) -> None:
             finished_task_at=finished_task_at,
             model_type="classification",
             trained_image=trained_image,
+            runtime_settings=settings.model_dump(),
         )
 
         insert_test_accuracy(unique_id=cls_model.unique_id, test_accuracy=test_accuracy)
         update_image_tag_is_trained(entries=entries)
+        save_training_telemetry(
+            unique_id=cls_model.unique_id,
+            run=training_telemetry(
+                profiler=profiler,
+                settings=settings,
+                device=device,
+                run_type=f"fine_tune_{mode}",
+                batch_size=batch_size,
+                trained_image=run_trained_image,
+            ),
+            epochs=profiler.epochs,
+        )
     return None
@@ -0,0 +1,180 @@
+import os
+import torch
+import shutil
+import hashlib
+import numpy as np
+from pathlib import Path
+from typing import Literal
+from utils.logger import logging
+from torch.utils.data import Dataset
+from utils.resnet.custom_model import CustomResNet50Classifier
+from utils.resnet.preprocessing import decode_images, normalize_image
+from utils.resnet.runtime import RuntimeSettings, autocast, to_device
+
+
+def backbone_version(model: CustomResNet50Classifier) -> str:
+    """
+    The function `backbone_version` fingerprints every backbone weight of the model, excluding the
+    classifier head, so cached features are invalidated as soon as the backbone changes.
+
+    :param model: The `model` parameter is the classifier whose backbone is fingerprinted.
+    :type model: CustomResNet50Classifier
+    :return: A short hexadecimal digest.
+    """
+    digest = hashlib.sha1()
+    for name, tensor in model.state_dict().items():
+        if name.startswith("custom_resnet50_model.fc."):
+            continue
+        digest.update(name.encode())
+        digest.update(tensor.detach().cpu().contiguous().numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+
+class BackboneFeatureCache:
+    """Penultimate ResNet50 features persisted per backbone version.
+
+    Features are stored in `<cache_dir>/<version>/features.npy` next to the matching
+    `ImageTag.id` values in `ids.npy`. Only the current version is kept, the directories of older
+    backbones are deleted when the cache is opened.
+    """
+
+    def __init__(self, cache_dir: str | Path, version: str) -> None:
+        self.directory = Path(cache_dir) / version
+        self.ids_path = self.directory / "ids.npy"
+        self.features_path = self.directory / "features.npy"
+        self.ids = np.empty(0, dtype=np.int64)
+        self.features = np.empty((0, 0), dtype=np.float32)
+
+        os.makedirs(name=self.directory, exist_ok=True)
+        for path in Path(cache_dir).iterdir():
+            if path.is_dir() and path != self.directory:
+                shutil.rmtree(path, ignore_errors=True)
+        if os.path.exists(self.ids_path) and os.path.exists(self.features_path):
+            self.ids = np.load(self.ids_path)
+            self.features = np.load(self.features_path, mmap_mode="r")
+
+    def lookup(self, image_ids: list[int]) -> tuple[dict[int, np.ndarray], list[int]]:
+        """
+        The function `lookup` returns the cached features of `image_ids` and the ids still missing.
+
+        :param image_ids: The `image_ids` parameter is a list of `ImageTag.id` values.
+        :type image_ids: list[int]
+        :return: A tuple of the cached features keyed by id and the list of missing ids.
+        """
+        positions = {image_id: idx for idx, image_id in enumerate(self.ids.tolist())}
+        cached = {
+            image_id: np.asarray(self.features[positions[image_id]])
+            for image_id in image_ids
+            if image_id in positions
+        }
+        missing = [image_id for image_id in image_ids if image_id not in cached]
+        return cached, missing
+
+    def update(self, image_ids: list[int], features: np.ndarray) -> None:
+        """
+        The function `update` appends newly computed features and atomically rewrites the cache files.
+
+        :param image_ids: The `image_ids` parameter is a list of `ImageTag.id` values.
+        :type image_ids: list[int]
+        :param features: The `features` parameter is a `float32` array aligned with `image_ids`.
+        :type features: np.ndarray
+        """
+        if not image_ids:
+            return
+
+        ids = np.concatenate([self.ids, np.asarray(image_ids, dtype=np.int64)])
+        if self.features.size:
+            features = np.concatenate([np.asarray(self.features), features])
+
+        for path, array in ((self.features_path, features), (self.ids_path, ids)):
+            tmp_path = path.with_suffix(".tmp.npy")
+            np.save(tmp_path, array)
+            os.replace(tmp_path, path)
+
+        self.ids = ids
+        self.features = np.load(self.features_path, mmap_mode="r")
+
+
+class FeatureDataset(Dataset):
+    def __init__(self, features: np.ndarray, labels: np.ndarray) -> None:
+        self.features = features
+        self.labels = labels
+
+    def __len__(self) -> int:
+        return self.features.shape[0]
+
+    def __getitem__(self, index) -> dict:
+        return {"image": self.features[index], "labels": self.labels[index]}
+
+
+def backbone_features(
+    model: CustomResNet50Classifier,
+    images: list[np.ndarray],
+    device: Literal["cpu", "cuda"],
+    settings: RuntimeSettings | None = None,
+) -> np.ndarray:
+    """The function `backbone_features` returns the `float32` penultimate features of normalized images."""
+    image = to_device(torch.from_numpy(np.stack(images)), device, settings=settings)
+    with torch.no_grad(), autocast(device=device, settings=settings):
+        features = model.extract_features(image)
+    return features.float().cpu().numpy()
+
+
+def extract_backbone_features(
+    model: CustomResNet50Classifier,
+    entries: list[dict],
+    feature_cache: BackboneFeatureCache,
+    device: Literal["cpu", "cuda"],
+    batch_size: int = 64,
+    decode_workers: int | None = None,
+    settings: RuntimeSettings | None = None,
+) -> dict[int, np.ndarray]:
+    """
+    The function `extract_backbone_features` returns the 2048-d penultimate features of the entries,
+    only decoding and running the backbone on the images missing from `feature_cache`.
+
+    :param entries: The `entries` parameter is the list of `ImageTag` rows.
+    :type entries: list[dict]
+    :return: The features keyed by `ImageTag.id`. Images that could not be decoded are left out.
+    """
+    cached, missing_ids = feature_cache.lookup(
+        image_ids=[entry["id"] for entry in entries]
+    )
+    logging.info(
+        f"[extract_backbone_features] {len(cached)} cached, {len(missing_ids)} to compute."
+    )
+    if not missing_ids:
+        return cached
+
+    missing = set(missing_ids)
+    filepath_ids = {
+        entry["filepath"]: entry["id"] for entry in entries if entry["id"] in missing
+    }
+
+    computed_ids, computed = [], []
+    batch_ids, batch = [], []
+
+    if settings is not None and settings.channels_last:
+        model = model.to(memory_format=torch.channels_last)
+
+    model.eval()
+    for filepath, image in decode_images(
+        filepaths=list(filepath_ids), max_workers=decode_workers
+    ):
+        if image is None:
+            continue
+        batch_ids.append(filepath_ids[filepath])
+        batch.append(normalize_image(image))
+        if len(batch) == batch_size:
+            computed.append(backbone_features(model, batch, device, settings))
+            computed_ids.extend(batch_ids)
+            batch_ids, batch = [], []
+    if batch:
+        computed.append(backbone_features(model, batch, device, settings))
+        computed_ids.extend(batch_ids)
+
+    if computed:
+        features = np.concatenate(computed)
+        feature_cache.update(image_ids=computed_ids, features=features)
+        cached.update(zip(computed_ids, features))
+    return cached
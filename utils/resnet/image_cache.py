@@ -0,0 +1,259 @@
+import os
+import json
+import time
+import fcntl
+import numpy as np
+from pathlib import Path
+from collections import deque
+from typing import Iterator
+from contextlib import contextmanager
+from utils.logger import logging
+from utils.resnet.preprocessing import decode_images
+
+IMAGE_SHAPE = (224, 224, 3)
+IMAGE_BYTES = int(np.prod(IMAGE_SHAPE))
+WRITE_BATCH = 256
+
+
+class PreprocessedImageCache:
+    """Persistent cache of decoded and resized `uint8` images.
+
+    Images are stored in fixed size memory-mapped shard files (`shard_00000.npy`, ...) and
+    located through `index.json`, which maps every filepath to its slot together with the
+    file `mtime_ns` and `size` used to detect stale entries. Once `max_bytes` is reached the
+    least recently warmed entries are evicted and their slots reused.
+
+    Writers, such as two training tasks on the same host, are serialized by an `fcntl` lock on
+    `index.lock`: slots are allocated and the index is saved under the lock, after merging the
+    index written by the other processes. `DataLoader` workers only read from the cache.
+    """
+
+    def __init__(
+        self, cache_dir: str | Path, max_bytes: int, shard_size: int = 1024
+    ) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.index_path = self.cache_dir / "index.json"
+        self.lock_path = self.cache_dir / "index.lock"
+        self.max_slots = max(max_bytes // IMAGE_BYTES, 1)
+        self.shard_size = shard_size
+        self.entries: dict[str, dict] = {}
+        self.next_slot = 0
+        self._shards: dict[int, np.memmap] = {}
+        self._eviction_queue: deque[str] = deque()
+
+        os.makedirs(name=self.cache_dir, exist_ok=True)
+        self._load_index()
+
+    def __getstate__(self) -> dict:
+        # Memory maps are reopened lazily in every DataLoader worker.
+        state = self.__dict__.copy()
+        state["_shards"] = {}
+        return state
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _read_index(self) -> dict | None:
+        if not os.path.exists(self.index_path):
+            return None
+
+        try:
+            with open(self.index_path, encoding="utf-8") as file:
+                index = json.load(file)
+        except (OSError, ValueError) as e:
+            logging.warning(f"[PreprocessedImageCache] Ignoring broken index: {e}")
+            return None
+
+        if index.get("shard_size") != self.shard_size:
+            logging.warning(
+                "[PreprocessedImageCache] Shard size changed, starting with an empty cache."
+            )
+            return None
+        return index
+
+    def _load_index(self) -> None:
+        index = self._read_index()
+        if index is not None:
+            self.entries = index["entries"]
+            self.next_slot = index["next_slot"]
+
+    def _merge_index(self) -> None:
+        index = self._read_index()
+        if index is None:
+            return
+
+        # The index on disk owns the slots, only the newer access times are kept from memory.
+        for filepath, entry in index["entries"].items():
+            local_entry = self.entries.get(filepath)
+            if local_entry and local_entry["slot"] == entry["slot"]:
+                entry["accessed"] = max(entry["accessed"], local_entry["accessed"])
+        self.entries = index["entries"]
+        self.next_slot = index["next_slot"]
+        self._eviction_queue.clear()
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        """
+        The function `locked` holds the cache writer lock, merges the index saved by other processes
+        on entry and flushes the shards and the index on exit.
+        """
+        with open(self.lock_path, mode="a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._merge_index()
+                yield
+                for shard in self._shards.values():
+                    shard.flush()
+                self.save_index()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def save_index(self) -> None:
+        """
+        The function `save_index` atomically persists the cache index next to the shards, it must be
+        called under `locked`.
+        """
+        index = {
+            "shard_size": self.shard_size,
+            "next_slot": self.next_slot,
+            "entries": self.entries,
+        }
+        tmp_path = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, mode="w", encoding="utf-8") as file:
+            json.dump(index, file)
+        os.replace(tmp_path, self.index_path)
+
+    def _shard(self, shard_id: int, writable: bool = False) -> np.memmap:
+        shard = self._shards.get(shard_id)
+        if shard is not None and (not writable or shard.mode != "r"):
+            return shard
+
+        shard_path = self.cache_dir / f"shard_{shard_id:05d}.npy"
+        if not os.path.exists(shard_path):
+            shard = np.lib.format.open_memmap(
+                shard_path,
+                mode="w+",
+                dtype=np.uint8,
+                shape=(self.shard_size, *IMAGE_SHAPE),
+            )
+        else:
+            shard = np.load(shard_path, mmap_mode="r+" if writable else "r")
+
+        self._shards[shard_id] = shard
+        return shard
+
+    def _allocate_slot(self) -> int:
+        if self.next_slot < self.max_slots:
+            self.next_slot += 1
+            return self.next_slot - 1
+
+        # Evict the least recently used entry and reuse its slot.
+        if not self._eviction_queue:
+            self._eviction_queue.extend(
+                sorted(self.entries, key=lambda key: self.entries[key]["accessed"])
+            )
+        return self.entries.pop(self._eviction_queue.popleft())["slot"]
+
+    @staticmethod
+    def _file_signature(filepath: str) -> tuple[int, int]:
+        stat = os.stat(filepath)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _is_fresh(self, filepath: str) -> bool:
+        entry = self.entries.get(filepath)
+        if entry is None:
+            return False
+        try:
+            mtime_ns, size = self._file_signature(filepath=filepath)
+        except OSError:
+            return False
+        return entry["mtime_ns"] == mtime_ns and entry["size"] == size
+
+    def get(self, filepath: str) -> np.ndarray | None:
+        """
+        The function `get` returns a zero-copy, read-only view of a cached image.
+
+        :param filepath: The `filepath` parameter is the original image path used as cache key.
+        :type filepath: str
+        :return: A `uint8` view with shape (224, 224, 3), or `None` when the entry is missing or
+        the file changed since it was cached.
+        """
+        if not self._is_fresh(filepath=filepath):
+            return None
+
+        slot = self.entries[filepath]["slot"]
+        shard = self._shard(shard_id=slot // self.shard_size)
+        return shard[slot % self.shard_size]
+
+    def put(self, filepath: str, image: np.ndarray) -> None:
+        """
+        The function `put` stores a decoded `uint8` image into the cache and persists the index.
+
+        :param filepath: The `filepath` parameter is the original image path used as cache key.
+        :type filepath: str
+        :param image: The `image` parameter is a `uint8` array with shape (224, 224, 3).
+        :type image: np.ndarray
+        """
+        with self.locked():
+            self._store(filepath=filepath, image=image)
+
+    def _store(self, filepath: str, image: np.ndarray) -> None:
+        mtime_ns, size = self._file_signature(filepath=filepath)
+        entry = self.entries.get(filepath)
+        slot = entry["slot"] if entry else self._allocate_slot()
+
+        shard = self._shard(shard_id=slot // self.shard_size, writable=True)
+        shard[slot % self.shard_size] = image
+
+        self.entries[filepath] = {
+            "slot": slot,
+            "mtime_ns": mtime_ns,
+            "size": size,
+            "accessed": time.time(),
+        }
+
+    def warm(self, filepaths: list[str], max_workers: int | None = None) -> list[str]:
+        """
+        The function `warm` decodes every image that is not cached yet on a process pool, refreshes
+        the access time of the ones already cached and persists the index.
+
+        :param filepaths: The `filepaths` parameter is the list of image paths used by the run.
+        :type filepaths: list[str]
+        :param max_workers: The `max_workers` parameter is the number of decoding processes.
+        :type max_workers: int | None
+        :return: The list of filepaths that could not be decoded.
+        """
+        now = time.time()
+        missing = []
+        failed = []
+        self._eviction_queue.clear()
+        for filepath in filepaths:
+            if self._is_fresh(filepath=filepath):
+                self.entries[filepath]["accessed"] = now
+            else:
+                missing.append(filepath)
+
+        logging.info(
+            f"[PreprocessedImageCache] {len(filepaths) - len(missing)} cached, {len(missing)} to decode."
+        )
+
+        batch = []
+        for filepath, image in decode_images(
+            filepaths=missing, max_workers=max_workers
+        ):
+            if image is None:
+                failed.append(filepath)
+                continue
+            batch.append((filepath, image))
+            if len(batch) == WRITE_BATCH:
+                self._store_batch(batch=batch)
+                batch = []
+
+        # Also persists the refreshed access times when every image was already cached.
+        self._store_batch(batch=batch)
+        return failed
+
+    def _store_batch(self, batch: list[tuple[str, np.ndarray]]) -> None:
+        with self.locked():
+            for filepath, image in batch:
+                self._store(filepath=filepath, image=image)
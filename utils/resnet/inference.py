@@ -0,0 +1,324 @@
+import os
+import time
+import torch
+import numpy as np
+from io import BytesIO
+from threading import Lock
+from typing import Callable, Literal
+from functools import lru_cache
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from src.secret import Config
+from utils.logger import logging
+from services.postgres.models import TRAINING_COLUMNS
+from utils.resnet.custom_model import CustomResNet50Classifier
+from utils.resnet.execute_model import load_resnet
+from utils.resnet.preprocessing import decode_images, normalize_image, safe_load_image
+from utils.query.model_card import extract_models_card_entry
+from utils.query.auto_tag import (
+    count_untagged_images,
+    extract_auto_tag_watermark,
+    extract_untagged_image_chunk,
+    reset_auto_tag_watermark,
+    update_predicted_labels,
+)
+from utils.resnet.runtime import RuntimeSettings, autocast, runtime_settings, to_device
+
+config = Config()
+
+# Classifier outputs in training order, see `list(record.values())[5:-2]` in `CustomDataLoader`.
+CLASSIFIER_OUTPUTS = [column.name for column in TRAINING_COLUMNS][5:-2]
+# `is_validated` is always true in the training data and is not a label.
+PREDICTED_LABELS = [label for label in CLASSIFIER_OUTPUTS if label != "is_validated"]
+
+# Pillow decoders and cv2.resize release the GIL, threads avoid a process pool per request.
+decode_executor = ThreadPoolExecutor(max_workers=config.INFERENCE_DECODE_THREADS)
+
+
+@lru_cache(maxsize=1)
+def inference_device() -> tuple[Literal["cpu", "cuda"], RuntimeSettings]:
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    return device, runtime_settings(device=device)
+
+
+class ModelCache:
+    """Process wide LRU cache of loaded classifiers.
+
+    Models are keyed by `ModelCard.model_name` and the `mtime_ns` of their weights, so a model
+    rewritten by a fine tuning run is reloaded on the next request while unchanged models are
+    loaded only once per process.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = max(capacity, 1)
+        self._models: OrderedDict[tuple[str, int], CustomResNet50Classifier] = (
+            OrderedDict()
+        )
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._models)
+
+    def get(self, model_name: str, model_path: str) -> CustomResNet50Classifier:
+        """
+        The function `get` returns the cached classifier, loading it when missing or outdated.
+
+        :param model_name: The `model_name` parameter is the `ModelCard.model_name` of the model.
+        :type model_name: str
+        :param model_path: The `model_path` parameter is the path of the saved state dict.
+        :type model_path: str
+        :return: The classifier in evaluation mode.
+        """
+        key = (model_name, os.stat(model_path).st_mtime_ns)
+        # Held while loading, so concurrent requests wait for a single load.
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+                return model
+
+            # Drop the outdated weights of a model rewritten by fine tuning.
+            for cached_key in [
+                cached for cached in self._models if cached[0] == model_name
+            ]:
+                del self._models[cached_key]
+
+            device, settings = inference_device()
+            model = load_resnet(
+                num_labels=len(CLASSIFIER_OUTPUTS), model_path=model_path, device=device
+            )
+            if settings.channels_last:
+                model = model.to(memory_format=torch.channels_last)
+            logging.info(f"[ModelCache] Loaded {model_name} from {model_path}.")
+
+            self._models[key] = model
+            while len(self._models) > self.capacity:
+                self._models.popitem(last=False)
+            return model
+
+
+model_cache = ModelCache(capacity=config.INFERENCE_MODEL_CACHE_SIZE)
+
+
+def predict_probabilities(
+    model: CustomResNet50Classifier,
+    images: list[np.ndarray],
+    device: Literal["cpu", "cuda"],
+    settings: RuntimeSettings | None = None,
+    batch_size: int = 64,
+) -> np.ndarray:
+    """
+    The function `predict_probabilities` runs the classifier on decoded images in mini-batches.
+
+    :param images: The `images` parameter is a list of `uint8` arrays with shape (224, 224, 3).
+    :type images: list[np.ndarray]
+    :return: A `float32` array of sigmoid probabilities with shape (len(images), outputs).
+    """
+    probabilities = []
+    with torch.inference_mode():
+        for start in range(0, len(images), batch_size):
+            batch = np.stack(
+                [normalize_image(image) for image in images[start : start + batch_size]]
+            )
+            image = to_device(torch.from_numpy(batch), device, settings=settings)
+            with autocast(device=device, settings=settings):
+                y_hat = model(image)
+            probabilities.append(torch.sigmoid(y_hat.float()).cpu().numpy())
+    return np.concatenate(probabilities)
+
+
+def classify_images(
+    sources: list[tuple[str, str | int, str | bytes]],
+    model_name: str,
+    model_path: str,
+    threshold: float = 0.5,
+) -> list[dict]:
+    """
+    The function `classify_images` decodes the images in parallel and classifies all of them with a
+    single cached model in batches of `INFERENCE_BATCH_SIZE`. Blocking, run it in a threadpool.
+
+    :param sources: The `sources` parameter is a list of `(source, key, content)` tuples, `content`
+    being either a filepath or the raw bytes of an uploaded image.
+    :type sources: list[tuple[str, str | int, str | bytes]]
+    :param threshold: The `threshold` parameter is the probability above which a label is predicted.
+    :type threshold: float
+    :return: One result per source, in the same order, with the probability of every label.
+    """
+    model = model_cache.get(model_name=model_name, model_path=model_path)
+    device, settings = inference_device()
+
+    contents = [
+        BytesIO(content) if isinstance(content, bytes) else content
+        for _, _, content in sources
+    ]
+    images = list(decode_executor.map(safe_load_image, contents))
+    decoded = [image for image in images if image is not None]
+
+    probabilities = iter([])
+    if decoded:
+        probabilities = iter(
+            predict_probabilities(
+                model=model,
+                images=decoded,
+                device=device,
+                settings=settings,
+                batch_size=config.INFERENCE_BATCH_SIZE,
+            )
+        )
+
+    results = []
+    for (source, key, _), image in zip(sources, images):
+        result = {"source": source, "key": key, "model_name": model_name}
+        if image is None:
+            result["error"] = "Image could not be decoded."
+        else:
+            scores = dict(zip(CLASSIFIER_OUTPUTS, next(probabilities).tolist()))
+            result["labels"] = {
+                label: round(scores[label], 4) for label in PREDICTED_LABELS
+            }
+            result["predicted_labels"] = [
+                label for label in PREDICTED_LABELS if scores[label] >= threshold
+            ]
+        results.append(result)
+    return results
+
+
+def prediction_entry(
+    image_id: int, probabilities: np.ndarray, threshold: float
+) -> dict:
+    """
+    The function `prediction_entry` turns the probabilities of one image into the label values
+    written by the auto-tagging task. The confidence is the mean of `max(p, 1 - p)` over every
+    label, so `1.0` means the model is certain about every label and `0.5` that it is guessing.
+    """
+    scores = dict(zip(CLASSIFIER_OUTPUTS, probabilities.tolist()))
+    certainty = [max(scores[label], 1 - scores[label]) for label in PREDICTED_LABELS]
+    return {
+        "id": image_id,
+        **{label: scores[label] >= threshold for label in PREDICTED_LABELS},
+        "confidence": round(sum(certainty) / len(certainty), 4),
+    }
+
+
+def predict_entries(
+    model: CustomResNet50Classifier,
+    images: list[np.ndarray],
+    image_ids: list[int],
+    device: Literal["cpu", "cuda"],
+    settings: RuntimeSettings,
+    threshold: float,
+) -> list[dict]:
+    """
+    The function `predict_entries` runs a batch of decoded images through the model and returns the
+    `prediction_entry` of every image, in the order of `image_ids`.
+    """
+    probabilities = predict_probabilities(
+        model=model,
+        images=images,
+        device=device,
+        settings=settings,
+        batch_size=config.INFERENCE_BATCH_SIZE,
+    )
+    return [
+        prediction_entry(image_id, scores, threshold)
+        for image_id, scores in zip(image_ids, probabilities)
+    ]
+
+
+def auto_tag_images(
+    restart: bool = False,
+    chunk_size: int = config.AUTO_TAG_CHUNK_SIZE,
+    threshold: float = config.INFERENCE_THRESHOLD,
+    on_progress: Callable[[dict], None] | None = None,
+) -> dict:
+    """
+    The function `auto_tag_images` pre-labels every unvalidated `ImageTag` entry with the latest
+    classification model. Entries are streamed by id in chunks of `chunk_size`, decoded in parallel
+    by `decode_images`, on threads inside a Celery worker, while the previous batches run through
+    the model, and every chunk is written back with a single bulk UPDATE together with the id
+    watermark of the model, so an interrupted run resumes after its last committed chunk. A new model starts again from the first entry.
+
+    :param restart: The `restart` parameter ignores the watermark and tags every entry again.
+    :type restart: bool
+    :param on_progress: The `on_progress` parameter is called with the progress after every chunk.
+    :type on_progress: Callable[[dict], None] | None
+    :return: The final progress of the run.
+    """
+    model_card = extract_models_card_entry(model_type="classification")
+    if model_card is None:
+        logging.info("[auto_tag_images] No classification model trained yet.")
+        return {"tagged_image": 0}
+
+    if restart:
+        reset_auto_tag_watermark(model_name=model_card.model_name)
+    model = model_cache.get(
+        model_name=model_card.model_name, model_path=model_card.model_path
+    )
+    device, settings = inference_device()
+
+    watermark = extract_auto_tag_watermark(model_name=model_card.model_name)
+    progress = {
+        "model_name": model_card.model_name,
+        "total_image": count_untagged_images(after_id=watermark),
+        "tagged_image": 0,
+        "skipped_image": 0,
+        "last_image_id": watermark,
+        "images_per_sec": 0.0,
+    }
+    logging.info(f"[auto_tag_images] Resuming after id {watermark}: {progress}")
+    started_at = time.perf_counter()
+
+    while entries := extract_untagged_image_chunk(after_id=watermark, limit=chunk_size):
+        filepath_ids = {entry["filepath"]: entry["id"] for entry in entries}
+        predictions = []
+        batch_ids, batch = [], []
+        for filepath, image in decode_images(
+            filepaths=list(filepath_ids), max_workers=config.IMAGE_DECODE_WORKERS
+        ):
+            if image is None:
+                progress["skipped_image"] += 1
+                continue
+            batch_ids.append(filepath_ids[filepath])
+            batch.append(image)
+            if len(batch) == config.INFERENCE_BATCH_SIZE:
+                predictions.extend(
+                    predict_entries(
+                        model=model,
+                        images=batch,
+                        image_ids=batch_ids,
+                        device=device,
+                        settings=settings,
+                        threshold=threshold,
+                    )
+                )
+                batch_ids, batch = [], []
+        if batch:
+            predictions.extend(
+                predict_entries(
+                    model=model,
+                    images=batch,
+                    image_ids=batch_ids,
+                    device=device,
+                    settings=settings,
+                    threshold=threshold,
+                )
+            )
+
+        watermark = entries[-1]["id"]
+        update_predicted_labels(
+            model_name=model_card.model_name,
+            predictions=predictions,
+            labels=PREDICTED_LABELS,
+            last_image_id=watermark,
+        )
+
+        progress["tagged_image"] += len(predictions)
+        progress["last_image_id"] = watermark
+        progress["images_per_sec"] = round(
+            progress["tagged_image"] / (time.perf_counter() - started_at), 2
+        )
+        logging.info(f"[auto_tag_images] {progress}")
+        if on_progress is not None:
+            on_progress(progress)
+
+    return progress
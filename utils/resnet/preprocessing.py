@@ -0,0 +1,95 @@
+import os
+import cv2
+import time
+import numpy as np
+from PIL import Image
+from tqdm.auto import tqdm
+from typing import BinaryIO, Iterator
+from utils.logger import logging
+from utils.helper import parallel_executor
+
+IMAGE_SIZE = (224, 224)
+# Modes supported by `Image.reduce`, palette, 1-bit and 16-bit images are converted first.
+REDUCE_MODES = {"RGB", "RGBA", "L", "LA", "CMYK", "I", "F"}
+
+
+def load_image(filepath: str | BinaryIO) -> np.ndarray:
+    """
+    The function `load_image` decodes a single image file into a resized `uint8` array ready to be
+    normalized by `normalize_image`. JPEG files are decoded at a reduced resolution through
+    `Image.draft`, other formats are shrunk with `Image.reduce`, so the final resize never has to
+    touch the full resolution render.
+
+    :param filepath: The `filepath` parameter is the absolute path of the image on the mounted NAS,
+    or an opened binary file such as an uploaded image.
+    :type filepath: str | BinaryIO
+    :return: A `uint8` array with shape (224, 224, 3).
+    """
+    with Image.open(filepath) as img:
+        img.draft("RGB", IMAGE_SIZE)
+        factor = min(img.width // IMAGE_SIZE[0], img.height // IMAGE_SIZE[1])
+        if factor > 1:
+            if img.mode not in REDUCE_MODES:
+                img = img.convert("RGB")
+            img = img.reduce(factor)
+        array = np.array(img.convert("RGB"))
+    return cv2.resize(array, IMAGE_SIZE)
+
+
+def normalize_image(image: np.ndarray) -> np.ndarray:
+    """
+    The function `normalize_image` reshapes a decoded `uint8` image into the layout expected by
+    `CustomResNet50Classifier` and scales it into [0, 1] as `float32`.
+
+    :param image: The `image` parameter is a `uint8` array with shape (224, 224, 3).
+    :type image: np.ndarray
+    :return: A `float32` array with shape (3, 224, 224).
+    """
+    return image.reshape((3, 224, 224)).astype(np.float32) / np.float32(255)
+
+
+def safe_load_image(filepath: str | BinaryIO) -> np.ndarray | None:
+    try:
+        return load_image(filepath=filepath)
+    except Exception as e:
+        logging.error(f"[safe_load_image] Skipping corrupt image {filepath}: {e}")
+    return None
+
+
+def decode_images(
+    filepaths: list[str], max_workers: int | None = None, chunksize: int = 16
+) -> Iterator[tuple[str, np.ndarray | None]]:
+    """
+    The function `decode_images` decodes images in parallel on a process pool, a thread pool in
+    daemonic processes such as Celery workers, and yields them in the same order as `filepaths`.
+    Corrupt or unreadable files are yielded with `None` instead of raising.
+
+    :param filepaths: The `filepaths` parameter is the list of image paths to decode.
+    :type filepaths: list[str]
+    :param max_workers: The `max_workers` parameter is the number of decoding workers, defaults to
+    the number of available cores.
+    :type max_workers: int | None
+    :param chunksize: The `chunksize` parameter is the number of images sent to a worker at once.
+    :type chunksize: int
+    :return: An iterator of `(filepath, image)` tuples.
+    """
+    if not filepaths:
+        return
+
+    max_workers = max_workers or os.cpu_count() or 1
+    started_at = time.perf_counter()
+    skipped = 0
+
+    with parallel_executor(max_workers=max_workers) as executor:
+        images = executor.map(safe_load_image, filepaths, chunksize=chunksize)
+        for filepath, image in tqdm(
+            zip(filepaths, images), total=len(filepaths), desc="Decoding images."
+        ):
+            if image is None:
+                skipped += 1
+            yield filepath, image
+
+    elapsed = time.perf_counter() - started_at
+    logging.info(
+        f"[decode_images] Decoded {len(filepaths) - skipped} images ({skipped} skipped) with {max_workers} workers in {elapsed:.2f}s, {len(filepaths) / elapsed:.1f} images/sec."
+    )
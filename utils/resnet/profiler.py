@@ -0,0 +1,130 @@
+import time
+import torch
+import resource
+from pathlib import Path
+from typing import Iterable, Iterator
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from utils.logger import logging
+
+
+def peak_rss_mb() -> float:
+    """The function `peak_rss_mb` returns the peak resident set size of the process in MiB."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def allocator_stats() -> dict:
+    """
+    The function `allocator_stats` returns the peak allocated and reserved memory of the CUDA caching
+    allocator, or an empty dictionary on CPU-only hosts.
+    """
+    if not torch.cuda.is_available():
+        return {}
+    stats = torch.cuda.memory_stats()
+    return {
+        "peak_allocated_mb": stats.get("allocated_bytes.all.peak", 0) / 1024**2,
+        "peak_reserved_mb": stats.get("reserved_bytes.all.peak", 0) / 1024**2,
+    }
+
+
+class StageProfiler:
+    """Accumulates wall time and processed images per named stage of a training run."""
+
+    def __init__(self) -> None:
+        self.durations = defaultdict(float)
+        self.images = defaultdict(int)
+        self.epochs: list[dict] = []
+
+    @contextmanager
+    def stage(self, name: str, images: int = 0):
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] += time.perf_counter() - started_at
+            self.images[name] += images
+
+    def add(self, name: str, seconds: float, images: int = 0) -> None:
+        self.durations[name] += seconds
+        self.images[name] += images
+
+    def record_epoch(self, **metrics) -> None:
+        """The function `record_epoch` stores the metrics of one epoch along with the current peak RSS."""
+        self.epochs.append({**metrics, "peak_rss_mb": round(peak_rss_mb(), 1)})
+
+    def throughput(self, name: str) -> float:
+        duration = self.durations.get(name, 0.0)
+        return self.images.get(name, 0) / duration if duration else 0.0
+
+    def summary(self) -> dict:
+        return {
+            "stages": {
+                name: {
+                    "seconds": round(seconds, 4),
+                    "images": self.images[name],
+                    "images_per_sec": round(self.throughput(name), 2),
+                }
+                for name, seconds in self.durations.items()
+            },
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            **allocator_stats(),
+        }
+
+    def log(self, prefix: str) -> None:
+        for name, stats in self.summary()["stages"].items():
+            logging.info(
+                f"[{prefix}] {name}: {stats['seconds']:.2f}s, {stats['images_per_sec']:.1f} images/sec"
+            )
+        logging.info(f"[{prefix}] Peak RSS {peak_rss_mb():.1f} MiB {allocator_stats()}")
+
+
+def stage(profiler: StageProfiler | None, name: str, images: int = 0):
+    """The function `stage` times a block when a profiler is given and is a no-op otherwise."""
+    if profiler is None:
+        return nullcontext()
+    return profiler.stage(name=name, images=images)
+
+
+def timed_batches(
+    dataloader: Iterable[dict], profiler: StageProfiler | None, name: str
+) -> Iterator[dict]:
+    """
+    The function `timed_batches` yields the batches of `dataloader` and records the time spent
+    waiting for each of them under `name`, i.e. the decoding and collation not hidden by workers.
+    """
+    if profiler is None:
+        yield from dataloader
+        return
+
+    iterator = iter(dataloader)
+    while True:
+        started_at = time.perf_counter()
+        try:
+            batch = next(iterator)
+        except StopIteration:
+            return
+        profiler.add(
+            name=name,
+            seconds=time.perf_counter() - started_at,
+            images=len(batch["labels"]),
+        )
+        yield batch
+
+
+def torch_trace(trace_dir: str | Path | None):
+    """
+    The function `torch_trace` records a `torch.profiler` trace into `trace_dir`, viewable with
+    TensorBoard or chrome://tracing, and is a no-op when `trace_dir` is `None`.
+    """
+    if trace_dir is None:
+        return nullcontext()
+
+    activities = [torch.profiler.ProfilerActivity.CPU]
+    if torch.cuda.is_available():
+        activities.append(torch.profiler.ProfilerActivity.CUDA)
+    return torch.profiler.profile(
+        activities=activities,
+        record_shapes=True,
+        profile_memory=True,
+        on_trace_ready=torch.profiler.tensorboard_trace_handler(str(trace_dir)),
+    )
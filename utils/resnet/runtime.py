@@ -0,0 +1,112 @@
+import torch
+from typing import Literal
+from pydantic import BaseModel
+from contextlib import nullcontext
+from src.secret import Config
+from utils.logger import logging
+from torch.nn import Module
+from torch.nn.parallel import DistributedDataParallel
+from utils.resnet.distributed import is_distributed
+
+config = Config()
+
+
+class RuntimeSettings(BaseModel):
+    precision: Literal["float32", "bfloat16"] = "float32"
+    channels_last: bool = False
+    compiled: bool = False
+    intra_op_threads: int | None = None
+    inter_op_threads: int | None = None
+
+
+def bf16_supported(device: Literal["cpu", "cuda"]) -> bool:
+    """
+    The function `bf16_supported` checks whether the device runs bfloat16 natively, CPUs need either
+    AVX512-BF16 or AMX for autocast to be faster than float32.
+    """
+    if device == "cuda":
+        return torch.cuda.is_bf16_supported()
+    # Private helpers of `torch.cpu`, missing from some releases.
+    return any(
+        getattr(torch.cpu, name, lambda: False)()
+        for name in ("_is_avx512_bf16_supported", "_is_amx_tile_supported")
+    )
+
+
+def apply_thread_settings() -> None:
+    """
+    The function `apply_thread_settings` applies the `TORCH_INTRA_OP_THREADS` and
+    `TORCH_INTER_OP_THREADS` counts to the whole process. Only call it from the entry point of a
+    training or worker process, never from the API.
+    """
+    if config.TORCH_INTRA_OP_THREADS > 0:
+        torch.set_num_threads(config.TORCH_INTRA_OP_THREADS)
+    if config.TORCH_INTER_OP_THREADS > 0:
+        try:
+            torch.set_num_interop_threads(config.TORCH_INTER_OP_THREADS)
+        except RuntimeError as e:
+            # Can only be set once, before any inter-op parallel work started.
+            logging.warning(f"[apply_thread_settings] Cannot set inter-op threads: {e}")
+
+
+def runtime_settings(device: Literal["cpu", "cuda"]) -> RuntimeSettings:
+    """
+    The function `runtime_settings` resolves the `TORCH_*` settings for the current device and
+    records the thread counts of the process, set by `apply_thread_settings`.
+
+    :param device: The `device` parameter is the device the model runs on.
+    :type device: Literal["cpu", "cuda"]
+    :return: The effective `RuntimeSettings`, recorded in the model card.
+    """
+    precision = "float32"
+    if config.TORCH_BF16_AUTOCAST:
+        if bf16_supported(device=device):
+            precision = "bfloat16"
+        else:
+            logging.warning(
+                f"[runtime_settings] bfloat16 is not supported on {device}, using float32."
+            )
+
+    settings = RuntimeSettings(
+        precision=precision,
+        channels_last=config.TORCH_CHANNELS_LAST,
+        compiled=config.TORCH_COMPILE,
+        intra_op_threads=torch.get_num_threads(),
+        inter_op_threads=torch.get_num_interop_threads(),
+    )
+    logging.info(f"[runtime_settings] {settings.model_dump()}")
+    return settings
+
+
+def optimize_model(model: Module, settings: RuntimeSettings) -> Module:
+    """
+    The function `optimize_model` converts the model to channels_last, wraps it into
+    `DistributedDataParallel` inside a process group and compiles it when enabled. The returned
+    module shares its parameters with `model`, which must still be the one passed to `save_model` so
+    the state dict keys are not prefixed.
+    """
+    if settings.channels_last:
+        model = model.to(memory_format=torch.channels_last)
+    if is_distributed():
+        model = DistributedDataParallel(model)
+    if settings.compiled:
+        model = torch.compile(model)
+    return model
+
+
+def autocast(device: Literal["cpu", "cuda"], settings: RuntimeSettings | None):
+    if settings is None or settings.precision == "float32":
+        return nullcontext()
+    return torch.autocast(device_type=device, dtype=torch.bfloat16)
+
+
+def to_device(
+    tensor: torch.Tensor,
+    device: Literal["cpu", "cuda"],
+    settings: RuntimeSettings | None = None,
+    non_blocking: bool = False,
+) -> torch.Tensor:
+    tensor = tensor.to(device, dtype=torch.float, non_blocking=non_blocking)
+    if settings is not None and settings.channels_last and tensor.dim() == 4:
+        tensor = tensor.contiguous(memory_format=torch.channels_last)
+    return tensor
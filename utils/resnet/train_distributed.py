@@ -0,0 +1,32 @@
+import sys
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from utils.resnet.distributed import init_distributed, cleanup_distributed
+from utils.resnet.execute_model import (
+    custom_resnet50_trainer,
+    custom_resnet50_fine_tuner,
+)
+from utils.resnet.runtime import apply_thread_settings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Data parallel ResNet50 training.")
+    parser.add_argument("task", choices=["train", "fine-tune"])
+    parser.add_argument("--epochs", type=int, default=250)
+    args = parser.parse_args()
+
+    apply_thread_settings()
+    init_distributed()
+    try:
+        if args.task == "train":
+            custom_resnet50_trainer(epochs=args.epochs)
+        else:
+            custom_resnet50_fine_tuner(epochs=args.epochs, mode="full")
+    finally:
+        cleanup_distributed()
+
+
+if __name__ == "__main__":
+    main()